@@ -0,0 +1,44 @@
+"""add ingest job table
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0004_add_ingest_job_table'
+down_revision = '0003_add_summary_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if "ingestjob" in inspector.get_table_names():
+        return
+    op.create_table(
+        "ingestjob",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("user.id"), nullable=True),
+        sa.Column("collection_name", sa.String(), nullable=False),
+        sa.Column("filename", sa.String(), nullable=False),
+        sa.Column("payload_path", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("progress", sa.Float(), nullable=False),
+        sa.Column("message", sa.String(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("max_attempts", sa.Integer(), nullable=False),
+        sa.Column("cancel_requested", sa.Boolean(), nullable=False),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("result", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_ingestjob_collection_name", "ingestjob", ["collection_name"])
+    op.create_index("ix_ingestjob_status", "ingestjob", ["status"])
+
+
+def downgrade():
+    op.drop_index("ix_ingestjob_status", table_name="ingestjob")
+    op.drop_index("ix_ingestjob_collection_name", table_name="ingestjob")
+    op.drop_table("ingestjob")
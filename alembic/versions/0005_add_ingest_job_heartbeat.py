@@ -0,0 +1,25 @@
+"""add heartbeat column to ingest job
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0005_add_ingest_job_heartbeat'
+down_revision = '0004_add_ingest_job_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {column["name"] for column in inspector.get_columns("ingestjob")}
+    if "heartbeat_at" in columns:
+        return
+    with op.batch_alter_table("ingestjob") as batch_op:
+        batch_op.add_column(sa.Column("heartbeat_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("ingestjob") as batch_op:
+        batch_op.drop_column("heartbeat_at")
@@ -2,7 +2,8 @@ import logging
 import streamlit as st
 
 from utils.app_state import init_app, get_collection_name
-from utils.ui import apply_global_styles, render_sidebar
+from utils.jobs import enqueue_bulk_ingest_job, enqueue_ingest_job
+from utils.ui import apply_global_styles, render_sidebar, render_ingest_jobs
 
 logger = logging.getLogger(__name__)
 
@@ -23,28 +24,35 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-uploaded_file = st.file_uploader(
+uploaded_files = st.file_uploader(
     "Dosya seç",
-    type=["pdf", "docx", "txt"],
-    help="Desteklenen formatlar: PDF, DOCX, TXT",
+    type=["pdf", "docx", "txt", "zip"],
+    accept_multiple_files=True,
+    help="Desteklenen formatlar: PDF, DOCX, TXT veya bunları içeren ZIP arşivi",
 )
 
-if uploaded_file is not None:
-    st.info(f"Seçilen dosya: {uploaded_file.name}")
+if uploaded_files:
+    st.info(f"Seçilen dosyalar: {', '.join(f.name for f in uploaded_files)}")
     if st.button("Dosyayı İşle ve Kaydet", type="primary"):
-        with st.spinner("Dosya işleniyor..."):
-            try:
-                documents = st.session_state.rag_processor.process_document(
-                    uploaded_file,
-                    uploaded_file.name,
+        try:
+            user = st.session_state.get("user")
+            user_id = user.get("id") if user else None
+            if len(uploaded_files) == 1:
+                enqueue_ingest_job(
+                    collection_name,
+                    uploaded_files[0].name,
+                    uploaded_files[0].getvalue(),
+                    user_id=user_id,
                 )
-                st.session_state.rag_processor.add_documents_to_vectorstore(
-                    documents,
-                    collection_name=collection_name,
+            else:
+                enqueue_bulk_ingest_job(
+                    collection_name,
+                    [(f.name, f) for f in uploaded_files],
+                    user_id=user_id,
                 )
-                st.success(f"{uploaded_file.name} başarıyla yüklendi ve işlendi.")
-                st.success(f"{len(documents)} metin parçası oluşturuldu.")
-                st.rerun()
-            except Exception:
-                logger.exception("Dosya isleme hatasi")
-                st.error("Dosya islenemedi. Lutfen tekrar deneyin.")
+            st.success(f"{len(uploaded_files)} dosya işleme kuyruğuna eklendi.")
+        except Exception:
+            logger.exception("Dosya isleme hatasi")
+            st.error("Dosya islenemedi. Lutfen tekrar deneyin.")
+
+render_ingest_jobs(collection_name)
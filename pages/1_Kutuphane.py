@@ -1,8 +1,10 @@
 import logging
 import streamlit as st
+from datetime import datetime
 
 from utils.app_state import init_app, get_collection_name
-from utils.ui import apply_global_styles, render_sidebar
+from utils.jobs import enqueue_bulk_ingest_job, enqueue_ingest_job
+from utils.ui import apply_global_styles, render_sidebar, render_ingest_jobs
 
 logger = logging.getLogger(__name__)
 
@@ -24,42 +26,77 @@ st.markdown(
 )
 
 st.subheader("Ders Notu Yükleme")
-uploaded_file = st.file_uploader(
+uploaded_files = st.file_uploader(
     "Dosya seç",
-    type=["pdf", "docx", "txt"],
-    help="Desteklenen formatlar: PDF, DOCX, TXT",
+    type=["pdf", "docx", "txt", "zip"],
+    accept_multiple_files=True,
+    help="Desteklenen formatlar: PDF, DOCX, TXT veya bunları içeren ZIP arşivi",
 )
 
-if uploaded_file is not None:
-    st.info(f"Seçilen dosya: {uploaded_file.name}")
+if uploaded_files:
+    st.info(f"Seçilen dosyalar: {', '.join(f.name for f in uploaded_files)}")
     if st.button("Dosyayı Yükle ve Kaydet", type="primary"):
-        with st.spinner("Dosya işleniyor..."):
-            try:
-                documents = st.session_state.rag_processor.process_document(
-                    uploaded_file,
-                    uploaded_file.name,
+        try:
+            user = st.session_state.get("user")
+            user_id = user.get("id") if user else None
+            if len(uploaded_files) == 1:
+                enqueue_ingest_job(
+                    collection_name,
+                    uploaded_files[0].name,
+                    uploaded_files[0].getvalue(),
+                    user_id=user_id,
                 )
-                st.session_state.rag_processor.add_documents_to_vectorstore(
-                    documents,
-                    collection_name=collection_name,
+            else:
+                enqueue_bulk_ingest_job(
+                    collection_name,
+                    [(f.name, f) for f in uploaded_files],
+                    user_id=user_id,
                 )
-                st.success(f"{uploaded_file.name} başarıyla yüklendi ve işlendi.")
-                st.success(f"{len(documents)} metin parçası oluşturuldu.")
-                st.rerun()
-            except Exception:
-                logger.exception("Dosya yukleme hatasi")
-                st.error("Dosya yuklenemedi. Lutfen tekrar deneyin.")
+            st.success(f"{len(uploaded_files)} dosya işleme kuyruğuna eklendi.")
+        except Exception:
+            logger.exception("Dosya yukleme hatasi")
+            st.error("Dosya yuklenemedi. Lutfen tekrar deneyin.")
+
+render_ingest_jobs(collection_name)
 
 st.markdown("---")
 
 col1, col2 = st.columns(2)
 with col1:
     st.subheader("Veritabanı Bilgileri")
-    sources = st.session_state.rag_processor.get_all_sources(collection_name)
-    st.metric("Yüklenen Dosya Sayısı", len(sources))
-    if sources:
-        for i, source in enumerate(sources, 1):
-            st.write(f"{i}. {source}")
+    source_stats = st.session_state.rag_processor.get_source_stats(collection_name)
+    metric_a, metric_b = st.columns(2)
+    metric_a.metric("Yüklenen Dosya Sayısı", len(source_stats))
+    metric_b.metric("Toplam Parça", sum(item["chunks"] for item in source_stats))
+    for i, item in enumerate(source_stats, 1):
+        ingested = datetime.fromtimestamp(item["ingested_at"]).strftime("%d.%m.%Y %H:%M")
+        col_left, col_right = st.columns([0.9, 0.1])
+        with col_left:
+            st.write(f"{i}. {item['source']}")
+            st.caption(
+                f"{item['chunks']} parça · {item['pages']} sayfa · "
+                f"{item['size_bytes'] / 1024:.1f} KB · {ingested}"
+            )
+        with col_right:
+            if st.button("\U0001F5D1", key=f"del_source_{i}", help="Bu dosyayı sil"):
+                st.session_state.pending_source_delete = item["source"]
+                st.rerun()
+        if st.session_state.get("pending_source_delete") == item["source"]:
+            st.warning(f"{item['source']} ve tüm parçaları silinecek. Bu işlem geri alınamaz.")
+            confirm_col, cancel_col = st.columns(2)
+            with confirm_col:
+                if st.button("Silmeyi onayla", key=f"confirm_del_source_{i}", type="primary"):
+                    st.session_state.pending_source_delete = None
+                    try:
+                        st.session_state.rag_processor.delete_source(collection_name, item["source"])
+                        st.rerun()
+                    except Exception:
+                        logger.exception("Kaynak silme hatasi")
+                        st.error("Dosya silinemedi. Lutfen tekrar deneyin.")
+            with cancel_col:
+                if st.button("Vazgeç", key=f"cancel_del_source_{i}"):
+                    st.session_state.pending_source_delete = None
+                    st.rerun()
 
 with col2:
     st.subheader("Tehlikeli İşlemler")
@@ -1,7 +1,7 @@
 import logging
 import streamlit as st
 
-from utils.app_state import init_app, get_collection_name
+from utils.app_state import init_app, get_collection_name, get_search_collections, get_search_sources
 from utils.ui import apply_global_styles, render_sidebar
 
 logger = logging.getLogger(__name__)
@@ -28,7 +28,8 @@ if st.session_state.groq_client is None:
     st.stop()
 
 
-sources = st.session_state.rag_processor.get_all_sources(collection_name)
+search_names = get_search_collections()
+sources = get_search_sources(search_names)
 if not sources:
     st.warning("Henüz dosya yüklenmedi. Önce dosya yükle sayfasına git.")
     st.stop()
@@ -52,10 +53,10 @@ if user_question:
     with st.spinner("Cevap hazırlanıyor..."):
         sources_count = len(selected_sources) if selected_sources else len(sources)
         k = st.session_state.rag_processor.get_dynamic_k(user_question, sources_count)
-        relevant_docs = st.session_state.rag_processor.search_documents(
+        relevant_docs = st.session_state.rag_processor.search_collections(
             user_question,
             k=k,
-            collection_name=collection_name,
+            collection_names=search_names,
             source_filter=selected_sources or None,
         )
         if relevant_docs:
@@ -3,7 +3,8 @@ import streamlit as st
 from datetime import datetime
 from xml.sax.saxutils import escape
 
-from utils.app_state import init_app, get_collection_name
+from utils.app_state import init_app, get_collection_name, get_search_collections, get_search_sources
+from utils.context_packing import pack_context
 from utils.ui import apply_global_styles, render_sidebar
 from utils.summaries import create_summary, get_summaries_for_user, delete_summary
 
@@ -43,7 +44,8 @@ if st.session_state.groq_client is None:
     st.error("Önce Groq API Key girmen gerekiyor.")
     st.stop()
 
-sources = st.session_state.rag_processor.get_all_sources(collection_name)
+search_names = get_search_collections()
+sources = get_search_sources(search_names)
 if not sources:
     st.warning("Henüz dosya yüklenmedi. Önce dosya yükle sayfasına git.")
     st.stop()
@@ -69,23 +71,23 @@ if st.button("Özet Oluştur", type="primary"):
             sources_count = len(selected_sources) if selected_sources else len(sources)
             if summary_topic:
                 k = st.session_state.rag_processor.get_dynamic_k(summary_topic, sources_count)
-                docs = st.session_state.rag_processor.search_documents(
+                docs = st.session_state.rag_processor.search_collections(
                     summary_topic,
                     k=k,
-                    collection_name=collection_name,
+                    collection_names=search_names,
                     source_filter=selected_sources or None,
                 )
             else:
                 k = st.session_state.rag_processor.get_dynamic_k("genel bilgi", sources_count)
-                docs = st.session_state.rag_processor.search_documents(
+                docs = st.session_state.rag_processor.search_collections(
                     "genel bilgi",
                     k=k,
-                    collection_name=collection_name,
+                    collection_names=search_names,
                     source_filter=selected_sources or None,
                 )
 
             if docs:
-                context = "\n\n".join([doc.page_content for doc in docs])
+                context = pack_context(docs)["context"]
                 summary = st.session_state.groq_client.generate_summary(
                     context,
                     detail_level,
@@ -2,7 +2,8 @@ import json
 import logging
 import streamlit as st
 
-from utils.app_state import init_app, get_collection_name
+from utils.app_state import init_app, get_collection_name, get_search_collections, get_search_sources
+from utils.context_packing import pack_context
 from utils.ui import apply_global_styles, render_sidebar
 from utils.classes import get_user_classes
 from utils.quiz import create_quiz
@@ -30,7 +31,8 @@ if st.session_state.groq_client is None:
     st.error("Önce Groq API Key girmen gerekiyor.")
     st.stop()
 
-sources = st.session_state.rag_processor.get_all_sources(collection_name)
+search_names = get_search_collections()
+sources = get_search_sources(search_names)
 if not sources:
     st.warning("Henüz dosya yüklenmedi. Önce dosya yükle sayfasına git.")
     st.stop()
@@ -71,23 +73,23 @@ if st.button("Quiz Oluştur", type="primary"):
             sources_count = len(selected_sources) if selected_sources else len(sources)
             if quiz_topic:
                 k = st.session_state.rag_processor.get_dynamic_k(quiz_topic, sources_count)
-                docs = st.session_state.rag_processor.search_documents(
+                docs = st.session_state.rag_processor.search_collections(
                     quiz_topic,
                     k=k,
-                    collection_name=collection_name,
+                    collection_names=search_names,
                     source_filter=selected_sources or None,
                 )
             else:
                 k = st.session_state.rag_processor.get_dynamic_k("genel bilgi", sources_count)
-                docs = st.session_state.rag_processor.search_documents(
+                docs = st.session_state.rag_processor.search_collections(
                     "genel bilgi",
                     k=k,
-                    collection_name=collection_name,
+                    collection_names=search_names,
                     source_filter=selected_sources or None,
                 )
 
             if docs:
-                context = "\n\n".join([doc.page_content for doc in docs])
+                context = pack_context(docs)["context"]
                 quiz_type_map = {
                     "Çoktan Seçmeli": "multiple_choice",
                     "Doğru/Yanlış": "true_false",
@@ -8,8 +8,9 @@ from datetime import datetime
 
 import streamlit as st
 
-from utils.app_state import init_app, get_collection_name
-from utils.ui import apply_global_styles, render_sidebar
+from utils.app_state import init_app, get_collection_name, get_class_collection_name
+from utils.jobs import enqueue_bulk_ingest_job, enqueue_ingest_job
+from utils.ui import apply_global_styles, render_sidebar, render_ingest_jobs
 from utils.classes import join_class_by_code, get_user_classes, delete_class, update_class
 from utils.quiz import (
     get_quizzes_for_class,
@@ -210,8 +211,8 @@ if show_class_detail and selected_class_id:
 
     else:
         quizzes = get_quizzes_for_class(active_class.id)
-        tab_quiz, tab_students, tab_attempts, tab_reports, tab_admin = st.tabs(
-            ["Quiz Yönetimi", "Öğrenciler", "Denemeler", "Raporlar", "Sınıf Yönetimi"]
+        tab_quiz, tab_students, tab_attempts, tab_reports, tab_notes, tab_admin = st.tabs(
+            ["Quiz Yönetimi", "Öğrenciler", "Denemeler", "Raporlar", "Ders Notları", "Sınıf Yönetimi"]
         )
 
         with tab_quiz:
@@ -615,6 +616,49 @@ if show_class_detail and selected_class_id:
             else:
                 st.info("Zaman trendi i\u00e7in yeterli veri yok.")
 
+        with tab_notes:
+            st.subheader("Sınıf Ders Notları")
+            st.caption(
+                "Buraya yüklenen notlar sınıftaki tüm öğrencilerin Soru-Cevap, Özet ve Quiz "
+                "aramalarına kendi notlarıyla birlikte dahil edilir."
+            )
+            class_collection = get_class_collection_name(active_class.id)
+            class_files = st.file_uploader(
+                "Dosya seç",
+                type=["pdf", "docx", "txt", "zip"],
+                accept_multiple_files=True,
+                key=f"class_notes_{active_class.id}",
+                help="Desteklenen formatlar: PDF, DOCX, TXT veya bunları içeren ZIP arşivi",
+            )
+            if class_files and st.button("Sınıfa Yükle", type="primary"):
+                try:
+                    if len(class_files) == 1:
+                        enqueue_ingest_job(
+                            class_collection,
+                            class_files[0].name,
+                            class_files[0].getvalue(),
+                            user_id=st.session_state.user.get("id"),
+                        )
+                    else:
+                        enqueue_bulk_ingest_job(
+                            class_collection,
+                            [(f.name, f) for f in class_files],
+                            user_id=st.session_state.user.get("id"),
+                        )
+                    st.success(f"{len(class_files)} dosya işleme kuyruğuna eklendi.")
+                except Exception:
+                    logger.exception("Sinif notu yukleme hatasi")
+                    st.error("Dosya yuklenemedi. Lutfen tekrar deneyin.")
+
+            render_ingest_jobs(class_collection)
+
+            class_sources = st.session_state.rag_processor.get_source_stats(class_collection)
+            if class_sources:
+                for item in class_sources:
+                    st.write(f"- {item['source']} ({item['chunks']} parça)")
+            else:
+                st.info("Henüz sınıf notu yok.")
+
         with tab_admin:
             st.subheader("Sınıf Yönetimi")
             if active_class.owner_id != st.session_state.user.get("id"):
@@ -641,6 +685,9 @@ if show_class_detail and selected_class_id:
                 else:
                     try:
                         delete_class(active_class.id, st.session_state.user.get("id"))
+                        st.session_state.rag_processor.delete_collection(
+                            collection_name=get_class_collection_name(active_class.id)
+                        )
                         st.success("Sınıf ve ilişkili veriler silindi.")
                         st.session_state.show_class_detail = False
                         st.session_state.selected_class_id = None
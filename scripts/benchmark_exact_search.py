@@ -0,0 +1,77 @@
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from langchain_core.documents import Document
+
+from utils.rag_processor import RAGProcessor
+
+
+def measure(rag: RAGProcessor, collection_name: str, queries: np.ndarray, k: int, exact: bool):
+    collection = rag.get_collection(collection_name)
+    version = rag.source_manifest.get_version(collection_name)
+    include = ["documents", "metadatas", "distances"]
+    # İlk çağrı kesin indeksi kurar; ölçüme dahil etme
+    rag._vector_query(collection, collection_name, version, [queries[0]], k, None, include, exact=exact)
+    latencies = []
+    ids = []
+    for query in queries:
+        started = time.perf_counter()
+        results = rag._vector_query(collection, collection_name, version, [query], k, None, include, exact=exact)
+        latencies.append((time.perf_counter() - started) * 1000)
+        ids.append(results["ids"][0])
+    latencies.sort()
+    return {
+        "mean_ms": statistics.mean(latencies),
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))],
+        "ids": ids,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark exact NumPy search against Chroma HNSW.")
+    parser.add_argument("--sizes", default="200,1000,2000,5000", help="Comma-separated collection sizes.")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension.")
+    parser.add_argument("--queries", type=int, default=100, help="Number of random queries per size.")
+    parser.add_argument("--k", type=int, default=10, help="Number of results per query.")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as persist_dir:
+        rag = RAGProcessor(persist_directory=persist_dir)
+        rag.exact_search_max = max(int(size) for size in args.sizes.split(","))
+        print(f"{'size':>7} {'exact ms':>10} {'exact p95':>10} {'chroma ms':>10} {'chroma p95':>11} {'recall':>8}")
+        for size in (int(value) for value in args.sizes.split(",")):
+            collection_name = f"bench_{size}"
+            vectors = rng.normal(size=(size, args.dim)).astype(np.float32)
+            docs = [
+                Document(page_content=f"parca {index}", metadata={"source": "bench.txt", "chunk_id": index})
+                for index in range(size)
+            ]
+            rag.add_documents_to_vectorstore(docs, collection_name=collection_name, embeddings=vectors.tolist())
+            queries = rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+            exact = measure(rag, collection_name, queries, args.k, exact=True)
+            approx = measure(rag, collection_name, queries, args.k, exact=False)
+            # Kesin sonuç referanstır; HNSW'nin ne kadarını bulduğunu ölç
+            recall = statistics.mean(
+                len(set(truth) & set(found)) / len(truth)
+                for truth, found in zip(exact["ids"], approx["ids"])
+            )
+            print(
+                f"{size:>7} {exact['mean_ms']:>10.2f} {exact['p95_ms']:>10.2f} "
+                f"{approx['mean_ms']:>10.2f} {approx['p95_ms']:>11.2f} {recall:>8.3f}"
+            )
+            rag.delete_collection(collection_name)
+
+
+if __name__ == "__main__":
+    main()
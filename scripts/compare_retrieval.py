@@ -0,0 +1,80 @@
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from utils.lexical_index import fold
+from utils.rag_processor import RAGProcessor
+
+
+def load_queries(path: str):
+    """JSONL: {"query": "...", "sources": ["a.pdf"], "contains": ["terim"]}"""
+    queries = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                queries.append(json.loads(line))
+    return queries
+
+
+def recall(item: dict, docs) -> float:
+    expected = [("source", s) for s in item.get("sources", [])]
+    expected += [("contains", fold(c)) for c in item.get("contains", [])]
+    if not expected:
+        return 0.0
+    found = 0
+    for kind, value in expected:
+        if kind == "source":
+            found += any(doc.metadata.get("source") == value for doc in docs)
+        else:
+            found += any(value in fold(doc.page_content) for doc in docs)
+    return found / len(expected)
+
+
+def run(rag: RAGProcessor, queries, collection: str, k: int, hybrid: bool) -> dict:
+    recalls = []
+    latencies = []
+    for item in queries:
+        # Önbellekler kapalıyken ölç: her sorgu embedding + arama maliyetini içersin
+        rag.result_cache.clear()
+        rag.query_cache.clear()
+        started = time.perf_counter()
+        docs = rag.search_documents(item["query"], k=k, collection_name=collection, hybrid=hybrid)
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(recall(item, docs))
+    latencies.sort()
+    return {
+        "recall": statistics.mean(recalls) if recalls else 0.0,
+        "mean_ms": statistics.mean(latencies) if latencies else 0.0,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare vector-only and hybrid (BM25 + RRF) retrieval.")
+    parser.add_argument("--queries", required=True, help="JSONL file with query and expected sources/terms.")
+    parser.add_argument("--collection", default="ders_notlari", help="Chroma collection name.")
+    parser.add_argument("--persist-dir", default="./chroma_db", help="Chroma persist directory.")
+    parser.add_argument("--k", type=int, default=4, help="Number of results per query.")
+    args = parser.parse_args()
+
+    rag = RAGProcessor(persist_directory=args.persist_dir)
+    queries = load_queries(args.queries)
+    # İlk hibrit arama indeksi kurabilir; ölçüme dahil etmemek için önce ısıt
+    rag.search_documents(queries[0]["query"], k=args.k, collection_name=args.collection, hybrid=True)
+
+    print(f"{'mode':<8} {'recall@' + str(args.k):>10} {'mean ms':>10} {'p95 ms':>10}")
+    for mode, hybrid in (("vector", False), ("hybrid", True)):
+        result = run(rag, queries, args.collection, args.k, hybrid)
+        print(f"{mode:<8} {result['recall']:>10.3f} {result['mean_ms']:>10.1f} {result['p95_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from utils.collection_gc import ANON_PREFIX, sweep_collections
+from utils.rag_processor import RAGProcessor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Drop expired anonymous Chroma collections and orphaned segments.")
+    parser.add_argument("--persist-dir", default="./chroma_db", help="Chroma persist directory.")
+    parser.add_argument("--ttl-hours", type=float, default=None, help="Idle time before deletion (RAG_ANON_TTL_HOURS).")
+    parser.add_argument("--prefix", default=ANON_PREFIX, help="Only collections with this name prefix are swept.")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted without deleting.")
+    parser.add_argument(
+        "--vacuum-chroma",
+        action="store_true",
+        help="Also VACUUM chroma.sqlite3. Run only while the app is stopped.",
+    )
+    args = parser.parse_args()
+
+    rag = RAGProcessor(persist_directory=args.persist_dir)
+    ttl_seconds = args.ttl_hours * 3600 if args.ttl_hours is not None else None
+    result = sweep_collections(
+        rag,
+        ttl_seconds=ttl_seconds,
+        prefix=args.prefix,
+        dry_run=args.dry_run,
+        vacuum_chroma=args.vacuum_chroma,
+    )
+
+    label = "would delete" if args.dry_run else "deleted"
+    for name in result["deleted"]:
+        print(f"{label}: {name}")
+    for name in result["orphan_segments"]:
+        print(f"orphan segment: {name}")
+    for name in result["orphan_exact_indexes"]:
+        print(f"orphan exact index: {name}")
+    print(f"unreferenced chunk texts: {result['unreferenced_chunks']}")
+    print(f"reclaimed: {result['reclaimed_bytes'] / (1024 * 1024):.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import os
+import time
+
+from langchain_core.documents import Document
+
+from utils.collection_gc import (
+    CollectionRegistry,
+    sweep_chunk_store,
+    sweep_collections,
+    vacuum_chroma_sqlite,
+    vacuum_side_stores,
+)
+from utils.rag_processor import RAGProcessor
+
+
+def test_registry_throttles_touches(tmp_path):
+    registry = CollectionRegistry(str(tmp_path / "registry.sqlite3"), touch_interval=60)
+    registry.touch("c", now=100.0)
+    registry.touch("c", now=130.0)
+    assert registry.last_access("c") == 100.0
+    registry.touch("c", now=200.0)
+    assert registry.last_access("c") == 200.0
+    registry.forget("c")
+    assert registry.last_access("c") is None
+
+
+def test_sweep_drops_expired_anon_collections_and_orphans(tmp_path):
+    persist = str(tmp_path / "chroma")
+    rag = RAGProcessor(persist_directory=persist)
+    docs = [Document(page_content="Parça " * 50, metadata={"source": "a.pdf", "chunk_id": 0})]
+    for name in ("ders_notlari_anon_old", "ders_notlari_anon_new", "ders_notlari_user_1"):
+        rag.add_documents_to_vectorstore(docs, collection_name=name)
+    rag.collection_registry.forget("ders_notlari_anon_old")
+    rag.collection_registry.touch("ders_notlari_anon_old", now=time.time() - 7200)
+    rag.collection_registry.touch("ders_notlari_user_1", now=time.time() - 7200)
+
+    preview = sweep_collections(rag, ttl_seconds=3600, dry_run=True)
+    assert preview["deleted"] == ["ders_notlari_anon_old"]
+    assert len(rag.chroma_client.list_collections()) == 3
+
+    result = sweep_collections(rag, ttl_seconds=3600)
+    assert result["deleted"] == ["ders_notlari_anon_old"]
+    assert len(result["orphan_segments"]) == 1
+    assert result["reclaimed_bytes"] > 0
+    assert rag.get_collection("ders_notlari_anon_old") is None
+    assert rag.get_collection("ders_notlari_anon_new") is not None
+    assert rag.get_collection("ders_notlari_user_1") is not None
+    assert not any(name in result["orphan_segments"] for name in os.listdir(persist))
+    assert result["vacuumed"] is True
+    assert preview["vacuumed"] is False
+    assert sweep_collections(rag, ttl_seconds=3600)["vacuumed"] is False
+
+
+def test_vacuum_shrinks_side_store_after_deletes(tmp_path):
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    registry = rag.collection_registry
+    for index in range(500):
+        registry.touch(f"ders_notlari_anon_{index:05d}_{'x' * 400}")
+    for index in range(500):
+        registry.forget(f"ders_notlari_anon_{index:05d}_{'x' * 400}")
+    before = os.path.getsize(registry.path)
+    vacuum_side_stores(rag)
+    assert os.path.getsize(registry.path) < before
+
+
+def test_chroma_sqlite_vacuum_is_opt_in(tmp_path):
+    persist = str(tmp_path / "chroma")
+    rag = RAGProcessor(persist_directory=persist)
+    docs = [
+        Document(page_content=f"Parça {i} " * 40, metadata={"source": "a.pdf", "chunk_id": i})
+        for i in range(200)
+    ]
+    rag.add_documents_to_vectorstore(docs, collection_name="ders_notlari_anon_old")
+    rag.add_documents_to_vectorstore(docs[:1], collection_name="ders_notlari_user_1")
+    rag.collection_registry.forget("ders_notlari_anon_old")
+    rag.collection_registry.touch("ders_notlari_anon_old", now=time.time() - 7200)
+    db_path = os.path.join(persist, "chroma.sqlite3")
+
+    before = os.path.getsize(db_path)
+    result = sweep_collections(rag, ttl_seconds=3600, vacuum_chroma=True)
+    assert result["deleted"] == ["ders_notlari_anon_old"]
+    assert result["vacuumed"] is True
+    assert os.path.getsize(db_path) < before
+    assert len(rag.search_documents("Parça", k=1, collection_name="ders_notlari_user_1")) == 1
+    assert vacuum_chroma_sqlite(str(tmp_path / "yok")) is False
+
+
+def test_sweep_drops_exact_indexes_of_missing_collections(tmp_path):
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    docs = [Document(page_content="Parça", metadata={"source": "a.pdf", "chunk_id": 0})]
+    for name in ("ders_notlari_user_1", "ders_notlari_user_2"):
+        rag.add_documents_to_vectorstore(docs, collection_name=name)
+        rag.search_documents("Parça", k=1, collection_name=name)
+    assert rag.exact_index.loaded_names() == ["ders_notlari_user_1", "ders_notlari_user_2"]
+    # Başka bir süreç koleksiyonu silmiş; bu süreçteki indeks yetim kalır
+    rag.chroma_client.delete_collection("ders_notlari_user_2")
+
+    result = sweep_collections(rag, ttl_seconds=3600)
+    assert result["orphan_exact_indexes"] == ["ders_notlari_user_2"]
+    assert rag.exact_index.loaded_names() == ["ders_notlari_user_1"]
+    assert rag.exact_index.names() == ["ders_notlari_user_1"]
+
+
+def test_chunk_store_sweep_removes_unreferenced_texts(tmp_path, monkeypatch):
+    monkeypatch.setenv("RAG_SHARED_CHUNKS", "1")
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    shared = Document(page_content="Ortak parça", metadata={"source": "a.pdf", "chunk_id": 0})
+    only = Document(page_content="Yalnız silinen koleksiyonda", metadata={"source": "b.pdf", "chunk_id": 0})
+    rag.add_documents_to_vectorstore([shared], collection_name="ders_notlari_user_1")
+    rag.add_documents_to_vectorstore([shared, only], collection_name="ders_notlari_user_2")
+    assert rag.chunk_store.stats()["entries"] == 2
+    rag.delete_collection("ders_notlari_user_2")
+    names = [getattr(item, "name", item) for item in rag.chroma_client.list_collections()]
+
+    assert sweep_chunk_store(rag, names) == 0
+    assert sweep_chunk_store(rag, names, dry_run=True, grace_seconds=-1) == 1
+    assert rag.chunk_store.stats()["entries"] == 2
+    assert sweep_chunk_store(rag, names, grace_seconds=-1) == 1
+    assert rag.chunk_store.stats()["entries"] == 1
+    assert rag.search_documents("Ortak", k=1, collection_name="ders_notlari_user_1")[0].page_content == "Ortak parça"
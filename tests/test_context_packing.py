@@ -0,0 +1,50 @@
+from langchain_core.documents import Document
+
+from utils.context_packing import pack_context
+
+
+def _doc(text, source, chunk_id):
+    return Document(
+        page_content=text,
+        metadata={"source": source, "chunk_id": chunk_id, "token_count": len(text.split())},
+    )
+
+
+def test_adjacent_chunks_merged_without_overlap():
+    docs = [
+        _doc("kuvvet kütle ile ivmenin çarpımıdır", "fizik.txt", 1),
+        _doc("newton yasaları hareketi açıklar kuvvet kütle ile", "fizik.txt", 0),
+        _doc("hücre canlının en küçük birimidir", "biyoloji.txt", 0),
+    ]
+    packed = pack_context(docs, token_budget=100)
+    assert packed["context"] == (
+        "hücre canlının en küçük birimidir\n\n"
+        "newton yasaları hareketi açıklar kuvvet kütle ile ivmenin çarpımıdır"
+    )
+    assert packed["blocks"] == 2
+    assert packed["saved_tokens"] > 0
+
+
+def test_budget_filled_by_relevance():
+    docs = [
+        _doc("bir iki üç dört", "a.txt", 0),
+        _doc("beş altı yedi sekiz dokuz on", "b.txt", 0),
+        _doc("on bir", "c.txt", 0),
+    ]
+    packed = pack_context(docs, token_budget=6)
+    assert packed["context"] == "bir iki üç dört\n\non bir"
+    assert packed["dropped_blocks"] == 1
+    assert packed["tokens"] == 6
+
+
+def test_same_source_in_two_collections_not_merged():
+    first = _doc("fotosentez ışık enerjisini kullanır", "notlar.txt", 0)
+    second = _doc("hücre zarı seçici geçirgendir", "notlar.txt", 1)
+    duplicate = _doc("mitoz bölünme iki hücre oluşturur", "notlar.txt", 0)
+    first.metadata["collection"] = "ders_notlari_user_1"
+    second.metadata["collection"] = "ders_notlari_class_7"
+    duplicate.metadata["collection"] = "ders_notlari_class_7"
+    packed = pack_context([first, second, duplicate], token_budget=100)
+    assert packed["blocks"] == 2
+    assert "fotosentez ışık enerjisini kullanır" in packed["context"]
+    assert "mitoz bölünme iki hücre oluşturur\n\nhücre zarı seçici geçirgendir" in packed["context"]
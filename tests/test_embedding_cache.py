@@ -0,0 +1,75 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from utils import embedding_cache
+from utils.embedding_cache import EmbeddingCache, chunk_hash
+from utils.rag_processor import RAGProcessor
+
+
+def test_put_and_get_roundtrip(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model-a")
+    cache.put_many(["h1", "h2"], [[1.0, 0.0], [0.0, 1.0]])
+    found = cache.get_many(["h2", "h3"])
+    assert list(found) == ["h2"]
+    assert found["h2"].tolist() == [0.0, 1.0]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_persists_and_is_scoped_by_model(tmp_path):
+    EmbeddingCache(str(tmp_path), "model-a").put_many(["h1"], [[0.5, 0.5]])
+    reopened = EmbeddingCache(str(tmp_path), "model-a")
+    assert reopened.get_many(["h1"])["h1"].tolist() == pytest.approx([0.5, 0.5])
+    other = EmbeddingCache(str(tmp_path), "model-b")
+    assert other.get_many(["h1"]) == {}
+
+
+def test_duplicate_hashes_stored_once(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model-a")
+    cache.put_many(["h1", "h1"], [[1.0, 2.0], [1.0, 2.0]])
+    cache.put_many(["h1"], [[1.0, 2.0]])
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] == 8
+
+
+def _put_rows(directory, prefix, value):
+    cache = EmbeddingCache(directory, "model-a")
+    for i in range(20):
+        cache.put_many([f"{prefix}{i}"], [[value, float(i)]])
+
+
+@pytest.mark.skipif(embedding_cache.fcntl is None, reason="fcntl yok")
+def test_concurrent_processes_append_without_overlap(tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=_put_rows, args=(str(tmp_path), prefix, value))
+        for prefix, value in (("a", 1.0), ("b", 2.0))
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    cache = EmbeddingCache(str(tmp_path), "model-a")
+    found = cache.get_many([f"{prefix}{i}" for prefix in "ab" for i in range(20)])
+    assert len(found) == 40
+    for hash_value, vector in found.items():
+        assert vector.tolist() == [1.0 if hash_value[0] == "a" else 2.0, float(hash_value[1:])]
+    assert cache.stats()["bytes"] == 40 * 2 * 4
+
+
+def test_embed_texts_only_embeds_misses(monkeypatch, tmp_path):
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    rag.embedding_cache.put_many([chunk_hash("bilinen")], [np.ones(3, dtype=np.float32)])
+    seen = []
+
+    def fake_model(texts):
+        seen.extend(texts)
+        return [np.zeros(3, dtype=np.float32) for _ in texts]
+
+    monkeypatch.setattr(rag, "embedding_function", fake_model)
+    vectors = rag._embed_texts(["bilinen", "yeni", "yeni"])
+    assert seen == ["yeni"]
+    assert vectors[0].tolist() == [1.0, 1.0, 1.0]
+    assert vectors[2].tolist() == [0.0, 0.0, 0.0]
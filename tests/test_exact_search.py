@@ -0,0 +1,92 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from utils.exact_search import ExactSearchIndex
+from utils.rag_processor import RAGProcessor
+
+
+def test_exact_index_matches_brute_force_and_filters(tmp_path):
+    index = ExactSearchIndex(str(tmp_path / "exact"))
+    rng = np.random.default_rng(0)
+    matrix = rng.normal(size=(50, 8)).astype(np.float32)
+    ids = [f"id{i}" for i in range(50)]
+    sources = ["a.pdf" if i % 2 else "b.pdf" for i in range(50)]
+    index.build("col", 3, ids, matrix, sources)
+    entry = ExactSearchIndex(str(tmp_path / "exact")).get("col", 3)
+    assert entry is not None and isinstance(entry["matrix"], np.memmap)
+
+    query = rng.normal(size=8).astype(np.float32)
+    expected = np.argsort(((matrix - query) ** 2).sum(axis=1))[:5]
+    hits = ExactSearchIndex.search(entry, query, 5)
+    assert [doc_id for doc_id, _ in hits] == [ids[i] for i in expected]
+    filtered = ExactSearchIndex.search(entry, query, 5, source_filter=["a.pdf"])
+    assert all(int(doc_id[2:]) % 2 for doc_id, _ in filtered)
+    assert index.get("col", 4) is None
+
+
+def test_loaded_indexes_are_bounded_lru(tmp_path):
+    index = ExactSearchIndex(str(tmp_path / "exact"), max_loaded=2)
+    matrix = np.ones((2, 4), dtype=np.float32)
+    for name in ("a", "b", "c"):
+        index.build(name, 1, ["x", "y"], matrix, ["s", "s"])
+    assert index.loaded_names() == ["b", "c"]
+    assert index.get("b", 1) is not None
+    assert index.get("a", 1) is not None
+    assert index.loaded_names() == ["b", "a"]
+    index.drop("b")
+    assert index.loaded_names() == ["a"]
+    assert index.names() == ["a", "c"]
+
+
+def test_search_uses_exact_path_and_matches_chroma(tmp_path):
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    docs = [
+        Document(page_content=f"Konu {i} hakkında not", metadata={"source": f"s{i % 3}.pdf", "chunk_id": i})
+        for i in range(12)
+    ]
+    rag.add_documents_to_vectorstore(docs, collection_name="exact_docs")
+    collection = rag.get_collection("exact_docs")
+    version = rag.source_manifest.get_version("exact_docs")
+    query = rag.embed_query("Konu 5")
+    include = ["documents", "metadatas", "distances"]
+    exact = rag._vector_query(collection, "exact_docs", version, [query], 4, None, include, exact=True)
+    approx = rag._vector_query(collection, "exact_docs", version, [query], 4, None, include, exact=False)
+    assert exact["ids"][0][0] == approx["ids"][0][0]
+    assert np.allclose(exact["distances"][0], approx["distances"][0], atol=1e-3)
+
+    rag.add_documents_to_vectorstore(
+        [Document(page_content="Yeni not", metadata={"source": "yeni.pdf", "chunk_id": 0})],
+        collection_name="exact_docs",
+    )
+    results = rag.search_documents("Yeni not", k=1, collection_name="exact_docs")
+    assert results[0].metadata["source"] == "yeni.pdf"
+
+
+def test_large_collection_falls_back_to_chroma(tmp_path, monkeypatch):
+    monkeypatch.setenv("RAG_EXACT_SEARCH_MAX", "2")
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    docs = [Document(page_content=f"not {i}", metadata={"source": "a.pdf", "chunk_id": i}) for i in range(3)]
+    rag.add_documents_to_vectorstore(docs, collection_name="big_docs")
+    assert len(rag.search_documents("not 1", k=2, collection_name="big_docs")) == 2
+    version = rag.source_manifest.get_version("big_docs")
+    assert rag.exact_index.get("big_docs", version)["large"] is True
+
+
+def test_empty_collection_builds_empty_index(tmp_path):
+    index = ExactSearchIndex(str(tmp_path / "exact"))
+    entry = index.build("bos", 1, [], [], [])
+    assert entry["count"] == 0
+    assert ExactSearchIndex.search(entry, [0.1, 0.2], 3) == []
+
+
+def test_source_filter_without_matches_returns_empty(tmp_path):
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    docs = [Document(page_content=f"not {i}", metadata={"source": "a.pdf", "chunk_id": i}) for i in range(3)]
+    rag.add_documents_to_vectorstore(docs, collection_name="filter_docs")
+    collection = rag.get_collection("filter_docs")
+    version = rag.source_manifest.get_version("filter_docs")
+    query = rag.embed_query("not 1")
+    include = ["documents", "metadatas", "distances"]
+    results = rag._vector_query(collection, "filter_docs", version, [query], 2, ["yok.pdf"], include, exact=True)
+    assert results == {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+    assert rag.search_documents("not 1", k=2, collection_name="filter_docs", source_filter=["yok.pdf"]) == []
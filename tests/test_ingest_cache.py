@@ -0,0 +1,110 @@
+import io
+
+import pytest
+
+from langchain_core.documents import Document
+
+from utils.ingest_cache import IngestCache, file_digest
+from utils.rag_processor import RAGProcessor
+
+
+def _docs(n):
+    return [
+        Document(page_content=f"parca {i}", metadata={"source": "a.txt", "chunk_id": i})
+        for i in range(n)
+    ]
+
+
+def test_put_get_roundtrip_and_counters(tmp_path):
+    cache = IngestCache(str(tmp_path / "cache.sqlite3"), max_bytes=1024 * 1024)
+    key = IngestCache.make_key("digest", "ayarlar")
+    assert cache.get(key) is None
+    cache.put(key, "metin", _docs(2), [[0.1, 0.2], [0.3, 0.4]])
+    entry = cache.get(key)
+    assert entry["text"] == "metin"
+    assert [d.page_content for d in entry["documents"]] == ["parca 0", "parca 1"]
+    assert entry["embeddings"][1].tolist() == pytest.approx([0.3, 0.4])
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["entries"] == 1
+
+
+def test_key_depends_on_settings():
+    assert IngestCache.make_key("x", "1000|200") != IngestCache.make_key("x", "500|50")
+
+
+def test_lru_eviction(tmp_path):
+    cache = IngestCache(str(tmp_path / "cache.sqlite3"), max_bytes=150)
+    cache.put("a", "x" * 60, [])
+    cache.put("b", "y" * 60, [])
+    cache.get("a")
+    cache.put("c", "z" * 60, [])
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_concurrent_writers_on_same_key_do_not_clash(tmp_path):
+    cache = IngestCache(str(tmp_path / "cache.sqlite3"), max_bytes=1024 * 1024)
+    first = cache.writer("k")
+    second = cache.writer("k")
+    first.add_chunks(_docs(2))
+    second.add_chunks(_docs(3))
+    second.commit()
+    first.abort()
+    assert [d.page_content for d in cache.get("k")["documents"]] == ["parca 0", "parca 1", "parca 2"]
+
+    third = cache.writer("k")
+    third.add_chunks(_docs(1))
+    third.commit()
+    assert len(cache.get("k")["documents"]) == 1
+
+
+def test_snapshot_is_not_affected_by_replace_or_eviction(tmp_path):
+    cache = IngestCache(str(tmp_path / "cache.sqlite3"), max_bytes=1024 * 1024)
+    cache.put("k", "eski", _docs(3))
+    with cache.snapshot("k") as cached:
+        batches = cached.iter_batches(1)
+        assert [d.page_content for d in next(batches)[0]] == ["parca 0"]
+        cache.put("k", "yeni", _docs(1))
+        cache.max_bytes = 0
+        cache._evict()
+        assert [d.page_content for docs, _ in batches for d in docs] == ["parca 1", "parca 2"]
+    assert cache.get("k") is None
+
+
+def test_stale_staging_rows_are_removed_on_open(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = IngestCache(path, max_bytes=1024 * 1024)
+    fresh = cache.writer("k")
+    fresh.add_chunks(_docs(2))
+    stale = cache.writer("k")
+    stale.staging_key = "k.tmp.0.abcd"
+    stale.add_chunks(_docs(1))
+    cache.close()
+    reopened = IngestCache(path, max_bytes=1024 * 1024)
+    keys = {key for (key,) in reopened._conn.execute("SELECT DISTINCT key FROM ingest_chunk")}
+    assert keys == {fresh.staging_key}
+
+
+def test_ingest_document_reuses_cache(monkeypatch, tmp_path):
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    data = b"Tekrar yuklenen ders notu"
+    rag.ingest_document(io.BytesIO(data), "ilk.txt", collection_name="cache_test")
+
+    def fail_extract(*_args, **_kwargs):
+        raise AssertionError("onbellek isabetinde dosya tekrar islenmemeli")
+
+    monkeypatch.setattr(rag, "iter_pages", fail_extract)
+    result = rag.ingest_document(io.BytesIO(data), "ikinci.txt", collection_name="cache_test")
+    assert result["source"] == "ikinci.txt"
+    assert result["cached"] is True
+    assert result["added"] == 1
+    assert rag.ingest_cache.stats()["hits"] == 1
+    assert rag.get_all_sources("cache_test") == ["ikinci.txt", "ilk.txt"]
+
+
+def test_file_digest_rewinds():
+    buf = io.BytesIO(b"abc")
+    digest = file_digest(buf)
+    assert len(digest) == 64
+    assert buf.read() == b"abc"
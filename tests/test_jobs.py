@@ -0,0 +1,130 @@
+from io import BytesIO
+from datetime import timedelta
+
+import pytest
+
+from utils.jobs import (
+    cancel_job,
+    enqueue_bulk_ingest_job,
+    enqueue_ingest_job,
+    get_job,
+    get_jobs_for_collection,
+    process_next_job,
+    recover_interrupted_jobs,
+    retry_job,
+)
+from utils.db import get_session
+from utils.models import IngestJob, now_utc
+from utils.rag_processor import open_upload
+
+
+class _FakeRag:
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    def ingest_document(self, file, filename, collection_name, progress_callback=None):
+        self.calls.append((file.read(), filename, collection_name))
+        if progress_callback:
+            progress_callback(0.5, "1/2 sayfa")
+        if self.error:
+            raise self.error
+        return {"source": filename, "chunks": 3, "cached": False}
+
+    def ingest_files(self, files, collection_name, progress_callback=None):
+        contents = []
+        for name, data in files:
+            with open_upload(data) as fh:
+                contents.append((name, fh.read()))
+        self.calls.append((contents, collection_name))
+        return [
+            {"source": name, "status": "ok", "chunks": 1, "added": 1, "kept": 0, "removed": 0}
+            if name.endswith(".txt")
+            else {"source": name, "status": "error", "error": "desteklenmiyor"}
+            for name, _ in files
+        ]
+
+
+@pytest.fixture(autouse=True)
+def job_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv("INGEST_JOB_DIR", str(tmp_path / "jobs"))
+
+
+def test_enqueue_and_process_job():
+    job = enqueue_ingest_job("jobs_ok", "notlar.txt", b"icerik")
+    rag = _FakeRag()
+    assert process_next_job(rag) is True
+    assert rag.calls == [(b"icerik", "notlar.txt", "jobs_ok")]
+    done = get_job(job.id)
+    assert done.status == "done"
+    assert done.progress == 1.0
+    assert get_jobs_for_collection("jobs_ok")[0].id == job.id
+    assert process_next_job(rag) is False
+
+
+def test_failed_job_is_retried_then_marked_failed():
+    job = enqueue_ingest_job("jobs_fail", "bozuk.pdf", b"x", max_attempts=2)
+    rag = _FakeRag(error=RuntimeError("bozuk"))
+    process_next_job(rag)
+    assert get_job(job.id).status == "queued"
+    process_next_job(rag)
+    failed = get_job(job.id)
+    assert failed.status == "failed"
+    assert failed.attempts == 2
+    assert "bozuk" in failed.error
+
+    retry_job(job.id)
+    process_next_job(_FakeRag())
+    assert get_job(job.id).status == "done"
+
+
+def test_cancel_queued_job():
+    job = enqueue_ingest_job("jobs_cancel", "iptal.txt", b"x")
+    assert cancel_job(job.id).status == "cancelled"
+    assert process_next_job(_FakeRag()) is False
+
+
+def test_cancel_running_job_stops_at_progress():
+    job = enqueue_ingest_job("jobs_cancel_running", "uzun.txt", b"x")
+
+    class _CancellingRag(_FakeRag):
+        def ingest_document(self, file, filename, collection_name, progress_callback=None):
+            cancel_job(job.id)
+            progress_callback(0.5, "1/2 sayfa")
+            raise AssertionError("iptal edilen is devam etmemeli")
+
+    process_next_job(_CancellingRag())
+    assert get_job(job.id).status == "cancelled"
+
+
+def test_bulk_job_reports_per_file_summary():
+    job = enqueue_bulk_ingest_job("jobs_bulk", [("a.txt", b"a"), ("b.txt", b"b"), ("c.pdf", b"c")])
+    rag = _FakeRag()
+    process_next_job(rag)
+    assert rag.calls == [([("a.txt", b"a"), ("b.txt", b"b"), ("c.pdf", b"c")], "jobs_bulk")]
+    done = get_job(job.id)
+    assert done.status == "done"
+    assert done.message.startswith("2/3 dosya")
+    assert "desteklenmiyor" in done.result
+
+
+def test_bulk_job_keeps_files_with_same_name():
+    enqueue_bulk_ingest_job("jobs_same", [("dir1/notlar.txt", b"bir"), ("dir2/notlar.txt", BytesIO(b"iki"))])
+    rag = _FakeRag()
+    process_next_job(rag)
+    assert rag.calls == [([("notlar (2).txt", b"iki"), ("notlar.txt", b"bir")], "jobs_same")]
+
+
+def test_recovery_skips_jobs_with_fresh_heartbeat():
+    stale = enqueue_ingest_job("jobs_lease", "eski.txt", b"x")
+    live = enqueue_ingest_job("jobs_lease", "canli.txt", b"x")
+    with get_session() as session:
+        for job_id, age in ((stale.id, 600), (live.id, 0)):
+            job = session.get(IngestJob, job_id)
+            job.status = "running"
+            job.heartbeat_at = now_utc() - timedelta(seconds=age)
+            session.add(job)
+        session.commit()
+    assert recover_interrupted_jobs(lease_seconds=120) == 1
+    assert get_job(stale.id).status == "queued"
+    assert get_job(live.id).status == "running"
@@ -0,0 +1,41 @@
+from langchain_core.documents import Document
+
+from utils.lexical_index import LexicalIndex, fold, reciprocal_rank_fusion, tokenize
+from utils.rag_processor import RAGProcessor
+
+
+def test_tokenize_folds_diacritics_and_suffixes():
+    assert fold("İSTANBUL Işık ğüşöç") == "istanbul isik gusoc"
+    assert tokenize("Veritabanları") == tokenize("veritabanı")
+    assert tokenize("Türevlerinden") == tokenize("türev")
+
+
+def test_bm25_ranks_exact_term_first(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lex.sqlite3"))
+    index.add(
+        "ders",
+        ["a", "b", "c"],
+        ["Türev ve integral", "Matrislerin determinantı", "Olasılık dağılımları"],
+        ["m.txt", "m.txt", "o.txt"],
+    )
+    assert index.search("ders", "determinant nedir")[0][0] == "b"
+    assert index.search("ders", "olasılık", source_filter=["m.txt"]) == []
+    index.remove("ders", ["b"])
+    assert index.search("ders", "determinant") == []
+
+
+def test_reciprocal_rank_fusion_prefers_agreement():
+    assert reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]])[0] == "b"
+
+
+def test_hybrid_search_surfaces_lexical_match(monkeypatch, tmp_path):
+    monkeypatch.setenv("RAG_HYBRID_SEARCH", "1")
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    docs = [
+        Document(page_content=f"genel konu anlatımı {i}", metadata={"source": "g.txt", "chunk_id": i})
+        for i in range(12)
+    ]
+    docs.append(Document(page_content="Özdeğer ayrışımı", metadata={"source": "o.txt", "chunk_id": 0}))
+    rag.add_documents_to_vectorstore(docs, collection_name="hybrid_docs")
+    results = rag.search_documents("özdeğerler", k=2, collection_name="hybrid_docs")
+    assert "Özdeğer ayrışımı" in [doc.page_content for doc in results]
@@ -0,0 +1,71 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from utils import query_cache
+from utils.query_cache import QueryEmbeddingCache
+from utils.rag_processor import RAGProcessor
+
+
+def test_lru_evicts_by_memory():
+    vector = np.zeros(16, dtype=np.float32)
+    entry_size = QueryEmbeddingCache._entry_size("q1", vector)
+    cache = QueryEmbeddingCache(max_bytes=entry_size * 2, ttl_seconds=0)
+    cache.put("q1", vector)
+    cache.put("q2", vector)
+    assert cache.get("q1") is not None
+    cache.put("q3", vector)
+    assert cache.get("q2") is None
+    assert cache.get("q1") is not None
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 2
+    assert stats["bytes"] <= stats["max_bytes"]
+
+
+def test_ttl_expires_entries(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(query_cache.time, "monotonic", lambda: now[0])
+    cache = QueryEmbeddingCache(max_bytes=1024 * 1024, ttl_seconds=60)
+    cache.put("genel bilgi", [1.0, 2.0])
+    now[0] += 30
+    assert cache.get("genel bilgi") is not None
+    now[0] += 31
+    assert cache.get("genel bilgi") is None
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_search_reuses_query_embedding(tmp_path):
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    rag.add_documents_to_vectorstore(
+        [Document(page_content="Alpha beta gamma", metadata={"source": "a.txt", "chunk_id": 0})],
+        collection_name="query_cache_test",
+    )
+    rag.query_cache.clear()
+    before = rag.query_cache.stats()
+    rag.search_documents("genel bilgi", k=1, collection_name="query_cache_test")
+    rag.result_cache.clear()
+    rag.search_documents("  genel   bilgi ", k=1, collection_name="query_cache_test")
+    after = rag.query_cache.stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+
+def test_result_cache_invalidated_on_write(tmp_path):
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    rag.add_documents_to_vectorstore(
+        [Document(page_content="Alpha beta gamma", metadata={"source": "a.txt", "chunk_id": 0})],
+        collection_name="result_cache_test",
+    )
+    first = rag.search_documents("alpha", k=2, collection_name="result_cache_test")
+    hits = rag.result_cache.stats()["hits"]
+    assert rag.search_documents("alpha", k=2, collection_name="result_cache_test") == first
+    assert rag.result_cache.stats()["hits"] == hits + 1
+
+    rag.add_documents_to_vectorstore(
+        [Document(page_content="Alpha delta", metadata={"source": "b.txt", "chunk_id": 0})],
+        collection_name="result_cache_test",
+    )
+    assert len(rag.search_documents("alpha", k=2, collection_name="result_cache_test")) == 2
+
+    rag.delete_collection("result_cache_test")
+    assert rag.search_documents("alpha", k=2, collection_name="result_cache_test") == []
@@ -1,4 +1,6 @@
 import io
+import os
+import shutil
 
 import pytest
 from docx import Document as DocxDocument
@@ -46,3 +48,97 @@ def test_process_document_chunking(monkeypatch, tmp_path):
     assert len(docs) == 3
     assert docs[0].metadata.get("source") == "sample.txt"
     assert [d.metadata.get("chunk_id") for d in docs] == [0, 1, 2]
+
+
+def test_ocr_worker_count(monkeypatch, tmp_path):
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    monkeypatch.setenv("OCR_WORKERS", "4")
+    assert rag._get_ocr_workers(10) == 4
+    assert rag._get_ocr_workers(2) == 2
+    monkeypatch.setenv("OCR_WORKERS", "1")
+    assert rag._get_ocr_workers(10) == 1
+
+
+def test_ocr_pages_keeps_order(monkeypatch, tmp_path):
+    fitz = pytest.importorskip("fitz")
+    pytest.importorskip("pytesseract")
+    if shutil.which("tesseract") is None:
+        pytest.skip("tesseract kurulu degil")
+    monkeypatch.setenv("OCR_WORKERS", "2")
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    doc = fitz.open()
+    for label in ("FIRST", "SECOND", "THIRD"):
+        page = doc.new_page()
+        page.insert_text((72, 72), label, fontsize=32)
+    pdf_path = tmp_path / "taranmis.pdf"
+    pdf_path.write_bytes(doc.write())
+    pages = rag._ocr_pdf_pages(str(pdf_path))
+    assert [p["page"] for p in pages] == [1, 2, 3]
+    assert "FIRST" in pages[0]["text"]
+    assert all(p["seconds"] >= 0 for p in pages)
+
+
+def test_only_image_pages_are_ocrd(monkeypatch, tmp_path):
+    fitz = pytest.importorskip("fitz")
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), "Birinci sayfa metin katmani iceriyor")
+    doc.new_page()
+    pdf_bytes = doc.write()
+
+    calls = []
+
+    def fake_ocr(_pdf_path, page_indexes=None):
+        calls.append(page_indexes)
+        return [{"page": i + 1, "text": "Taranmis sayfa", "seconds": 0.5} for i in page_indexes]
+
+    monkeypatch.setattr(rag, "_ocr_pdf_pages", fake_ocr)
+    docs = rag.process_document(io.BytesIO(pdf_bytes), "karma.pdf")
+    assert calls == [[1]]
+    assert [d.metadata["page"] for d in docs] == [1, 2]
+    assert [d.metadata["extraction_method"] for d in docs] == ["text", "ocr"]
+    assert docs[1].metadata["extraction_seconds"] >= 0.5
+    assert [d.metadata["chunk_id"] for d in docs] == [0, 1]
+
+
+def test_pdf_upload_streamed_to_one_file(monkeypatch, tmp_path):
+    fitz = pytest.importorskip("fitz")
+    monkeypatch.setenv("RAG_PAGE_WINDOW", "1")
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    doc = fitz.open()
+    doc.new_page()
+    doc.new_page()
+
+    class _Upload(io.BytesIO):
+        def read(self, size=-1):
+            assert size != -1, "PDF tek parça okunmamali"
+            return super().read(size)
+
+    paths = []
+
+    def fake_ocr(pdf_path, page_indexes=None):
+        paths.append(pdf_path)
+        return [{"page": i + 1, "text": "Taranmis sayfa", "seconds": 0.1} for i in page_indexes]
+
+    monkeypatch.setattr(rag, "_ocr_pdf_pages", fake_ocr)
+    pages = list(rag.iter_pages(_Upload(doc.write()), "tarama.pdf"))
+    assert [p["method"] for p in pages] == ["ocr", "ocr"]
+    assert len(paths) == 2 and paths[0] == paths[1]
+    assert not os.path.exists(paths[0])
+
+    on_disk = tmp_path / "is.pdf"
+    on_disk.write_bytes(doc.write())
+    with open(on_disk, "rb") as fh:
+        list(rag.iter_pages(fh, "is.pdf"))
+    assert paths[-1] == str(on_disk)
+
+
+def test_ocr_executor_is_created_once(tmp_path):
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    executor = rag._get_ocr_executor(None)
+    try:
+        assert rag._get_ocr_executor(None) is executor
+    finally:
+        rag.close_ocr_executor()
+    assert rag._ocr_executor is None
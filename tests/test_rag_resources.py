@@ -0,0 +1,85 @@
+import io
+
+from utils import rag_resources
+from utils.rag_processor import RAGProcessor
+from utils.rag_resources import (
+    get_embedding_function,
+    get_rag_processor,
+    get_text_splitter,
+    register_shutdown_hook,
+    reset_resources,
+)
+
+
+def test_processors_share_model_and_client(tmp_path):
+    first = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    second = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    assert first.embedding_function is second.embedding_function
+    assert first.chroma_client is second.chroma_client
+
+
+def test_get_rag_processor_returns_singleton(tmp_path):
+    path = str(tmp_path / "chroma")
+    assert get_rag_processor(path) is get_rag_processor(path)
+
+
+def test_text_splitter_cached_by_settings():
+    assert get_text_splitter(100, 10) is get_text_splitter(100, 10)
+    assert get_text_splitter(100, 10) is not get_text_splitter(200, 10)
+
+
+def test_reset_resources_runs_hooks():
+    calls = []
+    before = get_embedding_function()
+    register_shutdown_hook(lambda: calls.append(True))
+    reset_resources()
+    assert calls == [True]
+    assert get_embedding_function() is not before
+
+
+class _WordEncoder:
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+
+def test_token_chunking_stores_token_count(monkeypatch, tmp_path):
+    monkeypatch.setattr(rag_resources, "_token_encoders", {"fake": _WordEncoder()})
+    monkeypatch.setattr(rag_resources, "_text_splitters", {})
+    monkeypatch.setenv("RAG_TOKEN_ENCODING", "fake")
+    monkeypatch.setenv("RAG_CHUNK_UNIT", "tokens")
+    monkeypatch.setenv("RAG_CHUNK_SIZE", "3")
+    monkeypatch.setenv("RAG_CHUNK_OVERLAP", "0")
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    assert rag.chunk_unit == "tokens"
+    docs = rag.process_document(io.BytesIO("bir iki üç dört beş altı yedi".encode("utf-8")), "t.txt")
+    assert [doc.metadata["token_count"] for doc in docs] == [3, 3, 1]
+
+
+def test_token_chunking_falls_back_without_encoder(monkeypatch, tmp_path):
+    monkeypatch.setattr(rag_resources, "_token_encoders", {"missing": None})
+    monkeypatch.setenv("RAG_TOKEN_ENCODING", "missing")
+    monkeypatch.setenv("RAG_CHUNK_UNIT", "tokens")
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    assert rag.chunk_unit == "chars"
+    docs = rag.process_document(io.BytesIO(b"kisa metin"), "t.txt")
+    assert "token_count" not in docs[0].metadata
+
+
+def test_embedding_function_reuses_model_instance(monkeypatch):
+    from chromadb.utils.embedding_functions import onnx_mini_lm_l6_v2
+
+    created = []
+
+    class _CountingModel:
+        def __init__(self):
+            created.append(self)
+
+        def __call__(self, input):
+            return [[float(len(text))] for text in input]
+
+    monkeypatch.setattr(onnx_mini_lm_l6_v2, "ONNXMiniLM_L6_V2", _CountingModel)
+    embedding_function = rag_resources.SharedMiniLMEmbeddingFunction()
+    embedding_function(["ilk"])
+    embedding_function(["ikinci", "çağrı"])
+    assert len(created) == 1
+    assert embedding_function.model is created[0]
@@ -1,3 +1,4 @@
+import numpy as np
 from langchain_core.documents import Document
 
 from utils.rag_processor import RAGProcessor
@@ -13,3 +14,69 @@ def test_search_documents_deterministic(tmp_path):
     results = rag.search_documents("alpha", k=1, collection_name="search_test")
     assert len(results) == 1
     assert "Alpha" in results[0].page_content or "alpha" in results[0].page_content
+
+
+def test_search_documents_batch_embeds_once(tmp_path, monkeypatch):
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    docs = [
+        Document(page_content="Alpha beta gamma", metadata={"source": "a.txt", "chunk_id": 0}),
+        Document(page_content="Delta epsilon zeta", metadata={"source": "b.txt", "chunk_id": 0}),
+    ]
+    rag.add_documents_to_vectorstore(docs, collection_name="batch_test")
+    calls = []
+    original = rag.embed_queries.__func__
+
+    def counting(self, queries):
+        calls.append(list(queries))
+        return original(self, queries)
+
+    monkeypatch.setattr(RAGProcessor, "embed_queries", counting)
+    results = rag.search_documents_batch(
+        ["Alpha beta gamma", "Delta epsilon zeta", "Alpha beta gamma"], k=1, collection_name="batch_test"
+    )
+    assert calls == [["Alpha beta gamma", "Delta epsilon zeta"]]
+    assert [docs[0].metadata["source"] for docs in results] == ["a.txt", "b.txt", "a.txt"]
+    assert all("distance" in docs[0].metadata for docs in results)
+    single = rag.search_documents("Delta epsilon zeta", k=1, collection_name="batch_test", hybrid=False, mmr=False)
+    assert single[0].metadata == results[1][0].metadata
+
+
+def test_search_collections_merges_by_distance(tmp_path):
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    shared = Document(page_content="Ohm yasası V=IR", metadata={"source": "ohm.pdf", "chunk_id": 0})
+    rag.add_documents_to_vectorstore(
+        [shared, Document(page_content="Tarih notları", metadata={"source": "tarih.pdf", "chunk_id": 0})],
+        collection_name="ders_notlari_user_1",
+    )
+    rag.add_documents_to_vectorstore(
+        [shared, Document(page_content="Ohm yasası direnç", metadata={"source": "sinif.pdf", "chunk_id": 0})],
+        collection_name="ders_notlari_class_1",
+    )
+    results = rag.search_collections(
+        "Ohm yasası V=IR", k=3, collection_names=["ders_notlari_user_1", "ders_notlari_class_1", "yok_koleksiyon"]
+    )
+    distances = [doc.metadata["distance"] for doc in results]
+    assert distances == sorted(distances)
+    assert [doc.page_content for doc in results].count("Ohm yasası V=IR") == 1
+    assert {doc.metadata["collection"] for doc in results} == {"ders_notlari_user_1", "ders_notlari_class_1"}
+
+
+def test_mmr_draws_from_wider_candidate_pool(tmp_path, monkeypatch):
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    duplicates = [[1.0, 0.001 * i, 0.0] for i in range(12)]
+    distinct = [[0.8, 0.6, 0.0], [0.8, 0.0, 0.6], [0.7, -0.7, 0.1]]
+    docs = [
+        Document(page_content=f"kopya {i}", metadata={"source": "kopya.txt", "chunk_id": i})
+        for i in range(len(duplicates))
+    ] + [
+        Document(page_content=f"farkli {i}", metadata={"source": "farkli.txt", "chunk_id": i})
+        for i in range(len(distinct))
+    ]
+    rag.add_documents_to_vectorstore(docs, collection_name="mmr_docs", embeddings=duplicates + distinct)
+    monkeypatch.setattr(rag, "embed_query", lambda query: np.asarray([1.0, 0.0, 0.0], dtype=np.float32))
+
+    plain = rag.search_documents("soru", k=3, collection_name="mmr_docs", hybrid=False, mmr=False)
+    diverse = rag.search_documents("soru", k=3, collection_name="mmr_docs", hybrid=False, mmr=True)
+    assert all(doc.page_content.startswith("kopya") for doc in plain)
+    assert len(diverse) == 3
+    assert sum(doc.page_content.startswith("farkli") for doc in diverse) == 2
@@ -1,6 +1,11 @@
+import io
+import zipfile
+
+import pytest
+
 from langchain_core.documents import Document
 
-from utils.rag_processor import RAGProcessor
+from utils.rag_processor import RAGProcessor, expand_uploads
 
 
 def test_add_documents_to_vectorstore_smoke(tmp_path):
@@ -26,3 +31,304 @@ def test_add_documents_upsert_dedup(tmp_path):
     rag.add_documents_to_vectorstore(docs, collection_name="test_docs")
     data = rag.get_collection("test_docs").get()
     assert len(data["documents"]) == 2
+
+
+def test_ingest_document_streams_in_batches(monkeypatch, tmp_path):
+    monkeypatch.setenv("RAG_CHUNK_SIZE", "10")
+    monkeypatch.setenv("RAG_CHUNK_OVERLAP", "0")
+    monkeypatch.setenv("RAG_EMBED_BATCH_SIZE", "4")
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    upserts = []
+    original = rag.add_documents_to_vectorstore
+
+    def spy(documents, collection_name="ders_notlari", embeddings=None, **kwargs):
+        upserts.append(len(documents))
+        return original(documents, collection_name=collection_name, embeddings=embeddings, **kwargs)
+
+    monkeypatch.setattr(rag, "add_documents_to_vectorstore", spy)
+    progress = []
+    data = ("abcdefghijklmnopqrstuvwxyz" * 2).encode("utf-8")
+    result = rag.ingest_document(
+        io.BytesIO(data),
+        "akis.txt",
+        collection_name="stream_docs",
+        progress_callback=lambda fraction, message: progress.append(fraction),
+    )
+    assert result["chunks"] == 6
+    assert upserts == [4, 2]
+    assert progress[-1] == 1.0
+    assert len(rag.get_collection("stream_docs").get()["ids"]) == 6
+
+
+def test_reingest_diffs_chunks_and_removes_stale(monkeypatch, tmp_path):
+    monkeypatch.setenv("RAG_CHUNK_SIZE", "12")
+    monkeypatch.setenv("RAG_CHUNK_OVERLAP", "0")
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    first = rag.ingest_document(
+        io.BytesIO(b"aaaaaaaaaa\n\nbbbbbbbbbb\n\ncccccccccc"),
+        "notlar.txt",
+        collection_name="reingest_docs",
+    )
+    assert (first["added"], first["kept"], first["removed"]) == (3, 0, 0)
+
+    second = rag.ingest_document(
+        io.BytesIO(b"aaaaaaaaaa\n\nbbbbbbbbbb\n\ndddddddddd"),
+        "notlar.txt",
+        collection_name="reingest_docs",
+    )
+    assert (second["added"], second["kept"], second["removed"]) == (1, 2, 1)
+    data = rag.get_collection("reingest_docs").get()
+    assert sorted(data["documents"]) == ["aaaaaaaaaa", "bbbbbbbbbb", "dddddddddd"]
+
+
+def test_reingest_after_inserting_at_top_keeps_chunks(monkeypatch, tmp_path):
+    monkeypatch.setenv("RAG_CHUNK_SIZE", "12")
+    monkeypatch.setenv("RAG_CHUNK_OVERLAP", "0")
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    paragraphs = [ch * 10 for ch in "abcdefghij"] + ["aaaaaaaaaa"]
+    rag.ingest_document(io.BytesIO("\n\n".join(paragraphs).encode()), "notlar.txt", "shift_docs")
+
+    second = rag.ingest_document(
+        io.BytesIO("\n\n".join(["zzzzzzzzzz"] + paragraphs).encode()), "notlar.txt", "shift_docs"
+    )
+    assert (second["added"], second["kept"], second["removed"]) == (1, 11, 0)
+    data = rag.get_collection("shift_docs").get(include=["documents", "metadatas"])
+    positions = sorted((meta["chunk_id"], text) for text, meta in zip(data["documents"], data["metadatas"]))
+    assert positions == list(enumerate(["zzzzzzzzzz"] + paragraphs))
+
+
+def test_ingest_files_expands_zip_and_reports_per_file(monkeypatch, tmp_path):
+    monkeypatch.setenv("RAG_CHUNK_SIZE", "12")
+    monkeypatch.setenv("RAG_CHUNK_OVERLAP", "0")
+    monkeypatch.setenv("RAG_EMBED_BATCH_SIZE", "2")
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("hafta1/a.txt", "aaaaaaaaaa\n\nbbbbbbbbbb")
+        zf.writestr("hafta1/resim.png", b"png")
+    files = expand_uploads([
+        ("arsiv.zip", archive.getvalue()),
+        ("c.txt", b"cccccccccc"),
+        ("bozuk.xls", b"x"),
+    ])
+    assert [name for name, _ in files] == ["hafta1/a.txt", "c.txt", "bozuk.xls"]
+
+    summary = rag.ingest_files(files, collection_name="bulk_docs", max_workers=2)
+    by_source = {item["source"]: item for item in summary}
+    assert by_source["hafta1/a.txt"]["status"] == "ok"
+    assert by_source["hafta1/a.txt"]["added"] == 2
+    assert by_source["c.txt"]["added"] == 1
+    assert by_source["bozuk.xls"]["status"] == "error"
+    data = rag.get_collection("bulk_docs").get()
+    assert sorted(data["documents"]) == ["aaaaaaaaaa", "bbbbbbbbbb", "cccccccccc"]
+
+    again = rag.ingest_files(files[:2], collection_name="bulk_docs")
+    assert [item["kept"] for item in again] == [2, 1]
+    assert all(item["cached"] for item in again)
+
+
+def test_ingest_files_renames_duplicate_names(monkeypatch, tmp_path):
+    monkeypatch.setenv("RAG_CHUNK_SIZE", "12")
+    monkeypatch.setenv("RAG_CHUNK_OVERLAP", "0")
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    files = [("a.txt", b"aaaaaaaaaa"), ("a.txt", b"bbbbbbbbbb"), ("a (2).txt", b"cccccccccc")]
+    summary = rag.ingest_files(files, collection_name="dup_docs")
+    assert [item["source"] for item in summary] == ["a.txt", "a (3).txt", "a (2).txt"]
+    assert all(item["status"] == "ok" for item in summary)
+    assert len(rag.get_collection("dup_docs").get()["ids"]) == 3
+
+
+def test_ingest_files_shares_embedding_batches_across_files(monkeypatch, tmp_path):
+    monkeypatch.setenv("RAG_CHUNK_SIZE", "12")
+    monkeypatch.setenv("RAG_CHUNK_OVERLAP", "0")
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    files = []
+    for name, text in (("a.txt", b"aaaaaaaaaa"), ("b.txt", b"bbbbbbbbbb"), ("c.txt", b"cccccccccc")):
+        (tmp_path / name).write_bytes(text)
+        files.append((name, str(tmp_path / name)))
+    batches = []
+    embed = rag._embed_texts
+
+    def counting(texts):
+        batches.append(len(texts))
+        return embed(texts)
+
+    monkeypatch.setattr(rag, "_embed_texts", counting)
+    summary = rag.ingest_files(files, collection_name="shared_docs", max_workers=1)
+    assert all(item["status"] == "ok" for item in summary)
+    assert batches == [3]
+    assert len(rag.get_collection("shared_docs").get()["ids"]) == 3
+
+
+def test_ingest_files_stores_new_chunks_before_deleting_old(monkeypatch, tmp_path):
+    monkeypatch.setenv("RAG_CHUNK_SIZE", "12")
+    monkeypatch.setenv("RAG_CHUNK_OVERLAP", "0")
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    rag.ingest_files([("a.txt", b"aaaaaaaaaa")], collection_name="swap_docs")
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("upsert hatasi")
+
+    monkeypatch.setattr(rag, "add_documents_to_vectorstore", broken)
+    summary = rag.ingest_files([("a.txt", b"bbbbbbbbbb")], collection_name="swap_docs")
+    assert summary[0]["status"] == "error"
+    assert rag.get_collection("swap_docs").get()["documents"] == ["aaaaaaaaaa"]
+
+
+def test_source_manifest_tracks_ingest_and_delete(monkeypatch, tmp_path):
+    monkeypatch.setenv("RAG_CHUNK_SIZE", "12")
+    monkeypatch.setenv("RAG_CHUNK_OVERLAP", "0")
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    data = b"aaaaaaaaaa\n\nbbbbbbbbbb"
+    rag.ingest_document(io.BytesIO(data), "b.txt", collection_name="manifest_docs")
+    rag.add_documents_to_vectorstore(
+        [Document(page_content="alpha", metadata={"source": "a.txt", "chunk_id": 0})],
+        collection_name="manifest_docs",
+    )
+    monkeypatch.setattr(rag, "rebuild_source_manifest", lambda *args: pytest.fail("koleksiyon taranmamali"))
+    stats = {item["source"]: item for item in rag.get_source_stats("manifest_docs")}
+    assert rag.get_all_sources("manifest_docs") == ["a.txt", "b.txt"]
+    assert (stats["b.txt"]["chunks"], stats["b.txt"]["size_bytes"]) == (2, len(data))
+    assert stats["a.txt"]["chunks"] == 1
+
+
+def test_manifest_keeps_file_size_on_rebuild_and_refresh(monkeypatch, tmp_path):
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    data = b"dosya icerigi" + b" " * 100
+    rag.ingest_document(io.BytesIO(data), "a.txt", collection_name="size_docs")
+    assert rag.get_source_stats("size_docs")[0]["size_bytes"] == len(data)
+
+    rag.rebuild_source_manifest("size_docs")
+    assert rag.get_source_stats("size_docs")[0]["size_bytes"] == len(data)
+    rag._refresh_manifest_sources(rag.get_collection("size_docs"), "size_docs", {"a.txt"})
+    assert rag.get_source_stats("size_docs")[0]["size_bytes"] == len(data)
+
+
+def test_source_manifest_backfills_existing_collection(tmp_path):
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    rag.add_documents_to_vectorstore(
+        [Document(page_content="alpha", metadata={"source": "a.txt", "chunk_id": 0, "page": 3})],
+        collection_name="legacy_docs",
+    )
+    rag.source_manifest.drop_collection("legacy_docs")
+    assert rag.get_source_stats("legacy_docs")[0]["pages"] == 3
+    assert rag.delete_collection("legacy_docs")
+    assert rag.get_all_sources("legacy_docs") == []
+
+
+def test_collection_handles_are_cached_and_dropped_on_delete(tmp_path, monkeypatch):
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    docs = [Document(page_content="Alpha", metadata={"source": "a.txt", "chunk_id": 0})]
+    rag.add_documents_to_vectorstore(docs, collection_name="handle_test")
+    calls = []
+    original = rag.chroma_client.get_collection
+
+    def counting(*args, **kwargs):
+        calls.append(kwargs.get("name"))
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(rag.chroma_client, "get_collection", counting)
+    first = rag.get_collection("handle_test")
+    assert rag.get_collection("handle_test") is first
+    assert calls == []
+
+    assert rag.delete_collection("handle_test")
+    assert rag.get_collection("handle_test") is None
+    rag.add_documents_to_vectorstore(docs, collection_name="handle_test")
+    assert rag.get_collection("handle_test") is not first
+    assert rag.search_documents("Alpha", k=1, collection_name="handle_test")[0].page_content == "Alpha"
+
+
+def test_write_after_external_delete_uses_fresh_handle(tmp_path):
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    docs = [Document(page_content="Alpha", metadata={"source": "a.txt", "chunk_id": 0})]
+    stale = rag.add_documents_to_vectorstore(docs, collection_name="stale_handle")
+    # Başka bir süreç koleksiyonu siler; bu işlemcinin önbelleğindeki tutamaç eskir
+    rag.chroma_client.delete_collection("stale_handle")
+    more = [Document(page_content="Beta", metadata={"source": "b.txt", "chunk_id": 0})]
+    fresh = rag.add_documents_to_vectorstore(more, collection_name="stale_handle")
+    assert fresh is not stale
+    assert rag.get_collection("stale_handle").get()["documents"] == ["Beta"]
+
+
+def test_migrate_anon_collection_copies_embeddings(tmp_path, monkeypatch):
+    from utils.app_state import migrate_anon_collection_to_user
+
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    docs = [
+        Document(page_content=f"Parça {i}", metadata={"source": "a.pdf", "chunk_id": i})
+        for i in range(5)
+    ]
+    rag.add_documents_to_vectorstore(docs, collection_name="ders_notlari_anon_x")
+
+    def fail(texts):
+        raise AssertionError("migration must not re-embed")
+
+    monkeypatch.setattr(rag, "_embed_texts", fail)
+    assert migrate_anon_collection_to_user(rag, "ders_notlari_anon_x", "ders_notlari_user_1", batch_size=2) == 5
+    assert rag.get_collection("ders_notlari_anon_x") is None
+    target = rag.get_collection("ders_notlari_user_1").get()
+    assert sorted(target["ids"]) == sorted(rag._document_ids(docs))
+    assert rag.get_source_stats("ders_notlari_user_1")[0]["chunks"] == 5
+
+
+def test_shared_chunk_store_keeps_one_copy_and_resolves_on_search(tmp_path, monkeypatch):
+    monkeypatch.setenv("RAG_SHARED_CHUNKS", "1")
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    docs = [
+        Document(page_content="Ohm yasası gerilim ve akım", metadata={"source": "kitap.pdf", "chunk_id": 0}),
+        Document(page_content="Kirchhoff düğüm kuralı", metadata={"source": "kitap.pdf", "chunk_id": 1}),
+    ]
+    for user_id in (1, 2):
+        rag.add_documents_to_vectorstore(docs, collection_name=f"ders_notlari_user_{user_id}")
+
+    assert rag.chunk_store.stats()["entries"] == 2
+    stored = rag.get_collection("ders_notlari_user_1").get(include=["documents", "metadatas"])
+    assert not any(stored["documents"])
+    assert all("chunk_hash" in meta for meta in stored["metadatas"])
+
+    results = rag.search_documents("Ohm yasası", k=1, collection_name="ders_notlari_user_2", hybrid=True)
+    assert results[0].page_content == "Ohm yasası gerilim ve akım"
+    stats = rag.get_source_stats("ders_notlari_user_1")
+    assert stats[0]["size_bytes"] == sum(len(doc.page_content.encode("utf-8")) for doc in docs)
+
+
+def test_delete_and_replace_single_source(tmp_path, monkeypatch):
+    monkeypatch.setenv("RAG_HYBRID_SEARCH", "1")
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    rag.ingest_document(io.BytesIO("Ohm yasası gerilim akım".encode("utf-8")), "eski.txt", "source_ops")
+    rag.ingest_document(io.BytesIO("Fotosentez klorofil".encode("utf-8")), "bio.txt", "source_ops")
+    assert rag.search_documents("Ohm yasası", k=1, collection_name="source_ops")[0].metadata["source"] == "eski.txt"
+
+    result = rag.replace_source(
+        "source_ops", "eski.txt", io.BytesIO("Ohm yasası direnç hesabı".encode("utf-8")), "yeni.txt"
+    )
+    assert result["removed"] >= 1
+    assert rag.get_all_sources("source_ops") == ["bio.txt", "yeni.txt"]
+    results = rag.search_documents("Ohm yasası", k=2, collection_name="source_ops")
+    assert "eski.txt" not in {doc.metadata["source"] for doc in results}
+
+    assert rag.delete_source("source_ops", "yeni.txt") >= 1
+    assert rag.get_all_sources("source_ops") == ["bio.txt"]
+    assert rag.get_collection("source_ops").count() == 1
+    assert rag.delete_source("source_ops", "yok.txt") == 0
+
+
+def test_cancelled_ingest_rolls_back_partial_chunks(monkeypatch, tmp_path):
+    monkeypatch.setenv("RAG_CHUNK_SIZE", "12")
+    monkeypatch.setenv("RAG_CHUNK_OVERLAP", "0")
+    monkeypatch.setenv("RAG_EMBED_BATCH_SIZE", "1")
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    rag.ingest_document(io.BytesIO(b"aaaaaaaaaa"), "eski.txt", collection_name="partial_docs")
+
+    def cancel(fraction, message):
+        raise RuntimeError("iptal")
+
+    pages = b"bbbbbbbbbb\n\ncccccccccc"
+    for name in ("yeni.txt", "eski.txt"):
+        with pytest.raises(Exception):
+            rag.ingest_document(
+                io.BytesIO(pages), name, collection_name="partial_docs", progress_callback=cancel
+            )
+    assert rag.get_collection("partial_docs").get()["documents"] == ["aaaaaaaaaa"]
+    assert [item["source"] for item in rag.get_source_stats("partial_docs")] == ["eski.txt"]
@@ -0,0 +1,57 @@
+from langchain_core.documents import Document
+
+from utils.rag_processor import RAGProcessor
+from utils.reranking import adaptive_cut, mmr_select
+
+
+def test_mmr_skips_near_duplicates():
+    query = [1.0, 0.0]
+    candidates = [[1.0, 0.0], [0.999, 0.01], [0.7, 0.7]]
+    assert mmr_select(query, candidates, k=2, lambda_mult=0.9, duplicate_threshold=0.95) == [0, 2]
+
+
+def test_mmr_prefers_diversity_with_low_lambda():
+    query = [1.0, 0.0, 0.0]
+    candidates = [[1.0, 0.0, 0.0], [0.9, 0.3, 0.0], [0.6, 0.0, 0.8]]
+    assert mmr_select(query, candidates, k=2, lambda_mult=0.3, duplicate_threshold=1.1)[1] == 2
+
+
+def test_search_with_mmr_drops_repeated_definitions(tmp_path):
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    text = "Ohm yasası gerilim akım ve direnç arasındaki ilişkidir"
+    docs = [
+        Document(page_content=text, metadata={"source": f"slayt{i}.pdf", "chunk_id": 0})
+        for i in range(3)
+    ]
+    docs.append(Document(page_content="Kirchhoff akım yasası", metadata={"source": "k.pdf", "chunk_id": 0}))
+    rag.add_documents_to_vectorstore(docs, collection_name="mmr_docs")
+    plain = rag.search_documents("Ohm yasası", k=2, collection_name="mmr_docs", mmr=False)
+    diverse = rag.search_documents("Ohm yasası", k=2, collection_name="mmr_docs", mmr=True)
+    assert [doc.page_content for doc in plain] == [text, text]
+    assert {doc.page_content for doc in diverse} == {text, "Kirchhoff akım yasası"}
+
+
+def test_adaptive_cut_uses_threshold_and_largest_gap():
+    assert adaptive_cut([0.1, 0.12, 0.5, 0.55], min_k=1) == 2
+    assert adaptive_cut([0.1, 0.12, 0.5, 0.55], min_k=3) == 3
+    assert adaptive_cut([0.1, 0.2, 0.3], min_k=1, min_gap=0.2) == 3
+    assert adaptive_cut([0.1, 0.15, 0.9], min_k=1, max_distance=0.5, min_gap=0.2) == 2
+
+
+def test_search_returns_distances_and_adaptive_trims(tmp_path):
+    rag = RAGProcessor(persist_directory=str(tmp_path / "chroma"))
+    docs = [
+        Document(page_content="Ohm yasası gerilim akım", metadata={"source": "a.pdf", "chunk_id": 0}),
+        Document(page_content="Ohm yasası gerilim akım direnç", metadata={"source": "a.pdf", "chunk_id": 1}),
+        Document(page_content="Fotosentez klorofil", metadata={"source": "b.pdf", "chunk_id": 0}),
+        Document(page_content="Osmanlı tarihi kuruluş", metadata={"source": "c.pdf", "chunk_id": 0}),
+    ]
+    rag.add_documents_to_vectorstore(docs, collection_name="adaptive_docs")
+    plain = rag.search_documents("Ohm yasası gerilim akım", k=4, collection_name="adaptive_docs")
+    distances = [doc.metadata["distance"] for doc in plain]
+    assert distances == sorted(distances)
+    trimmed = rag.search_documents(
+        "Ohm yasası gerilim akım", k=4, collection_name="adaptive_docs", adaptive=True
+    )
+    assert 2 <= len(trimmed) < 4
+    assert all("Ohm" in doc.page_content for doc in trimmed)
@@ -1,12 +1,17 @@
+import logging
 import os
 import uuid
 import streamlit as st
+from langchain_core.documents import Document
 
 from utils.logging_config import setup_logging
 
 from utils.db import init_db
-from utils.rag_processor import RAGProcessor
+from utils.rag_resources import get_rag_processor
 from utils.groq_client import GroqClient
+from utils.classes import get_user_classes
+from utils.collection_gc import start_sweeper
+from utils.jobs import start_workers
 
 
 def init_app():
@@ -14,7 +19,9 @@ def init_app():
     init_db()
 
     if "rag_processor" not in st.session_state:
-        st.session_state.rag_processor = RAGProcessor()
+        st.session_state.rag_processor = get_rag_processor()
+    start_workers(st.session_state.rag_processor)
+    start_sweeper(st.session_state.rag_processor)
 
     if "user" not in st.session_state:
         st.session_state.user = None
@@ -46,6 +53,27 @@ def get_user_collection_name(user_id: int) -> str:
     return f"ders_notlari_user_{user_id}"
 
 
+def get_class_collection_name(class_id: int) -> str:
+    return f"ders_notlari_class_{class_id}"
+
+
+def get_search_collections():
+    """Kişisel koleksiyon ve kullanıcının kayıtlı olduğu sınıfların koleksiyonları"""
+    names = [get_collection_name()]
+    user = st.session_state.get("user")
+    if user and user.get("id") is not None:
+        names += [get_class_collection_name(cls.id) for cls in get_user_classes(user["id"])]
+    return names
+
+
+def get_search_sources(collection_names):
+    """Aranabilir koleksiyonlardaki kaynak dosyaların birleşimi"""
+    sources = []
+    for name in collection_names:
+        sources += st.session_state.rag_processor.get_all_sources(name)
+    return list(dict.fromkeys(sources))
+
+
 def get_anon_collection_name():
     anon_id = st.session_state.get("anon_collection_id")
     if not anon_id:
@@ -62,39 +90,46 @@ def get_collection_name():
     return get_anon_collection_name()
 
 
-def migrate_anon_collection_to_user(rag_processor, anon_collection_name, user_collection_name):
+def migrate_anon_collection_to_user(rag_processor, anon_collection_name, user_collection_name, batch_size=None):
+    """Anonim koleksiyonu kullanıcı koleksiyonuna taşı; kayıtlı embedding'ler sayfa sayfa kopyalanır"""
     if not anon_collection_name:
         return 0
     source = rag_processor.get_collection(anon_collection_name)
     if source is None:
         return 0
-    data = source.get()
-    docs = data.get("documents") or []
-    if not docs:
-        return 0
-    metadatas = data.get("metadatas")
-    if metadatas and len(metadatas) == len(docs):
-        meta_for_ids = metadatas
-    else:
-        metadatas = None
-        meta_for_ids = [{} for _ in docs]
-    ids = [
-        f"{(meta or {}).get('source', 'unknown')}_{uuid.uuid4().hex}"
-        for meta in meta_for_ids
-    ]
-    target = rag_processor.chroma_client.get_or_create_collection(
-        name=user_collection_name,
-        embedding_function=rag_processor.embedding_function,
-    )
+    batch_size = batch_size or int(os.getenv("RAG_MIGRATE_BATCH_SIZE", "500"))
+    moved = 0
     try:
-        if metadatas is None:
-            target.add(documents=docs, ids=ids)
-        else:
-            target.add(documents=docs, metadatas=metadatas, ids=ids)
+        offset = 0
+        while True:
+            data = source.get(
+                include=["embeddings", "documents", "metadatas"],
+                limit=batch_size,
+                offset=offset,
+            )
+            if not data.get("ids"):
+                break
+            metadatas = data.get("metadatas") or [None] * len(data["ids"])
+            texts = rag_processor.resolve_texts(data.get("documents"), metadatas)
+            docs = [
+                Document(page_content=text, metadata=dict(meta or {}))
+                for text, meta in zip(texts, metadatas)
+            ]
+            # Kimlikler içerik özetinden türetilir; yarıda kalan taşıma tekrar çalıştırılabilir
+            rag_processor.add_documents_to_vectorstore(
+                docs,
+                collection_name=user_collection_name,
+                embeddings=data["embeddings"],
+                update_manifest=False,
+                ids=data["ids"],
+            )
+            moved += len(docs)
+            offset += len(data["ids"])
     except Exception:
-        import logging
-
         logging.getLogger(__name__).exception("Anon koleksiyon tasima hatasi")
         return 0
+    if not moved:
+        return 0
+    rag_processor.rebuild_source_manifest(user_collection_name)
     rag_processor.delete_collection(collection_name=anon_collection_name)
-    return len(docs)
+    return moved
@@ -0,0 +1,90 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List
+
+
+class ChunkStore:
+    """İçerik özetine göre adreslenen, tüm koleksiyonların paylaştığı parça metni deposu (SQLite).
+
+    Aynı parça kaç koleksiyona eklenirse eklensin metni bir kez saklanır; koleksiyonlar yalnızca
+    metadata["chunk_hash"] referansını tutar. Hiçbir koleksiyonun referans vermediği kayıtlar
+    remove_unreferenced ile (temizlik taramasında) silinir.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunk (
+                hash TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def put_many(self, hashes: List[str], texts: List[str]):
+        now = time.time()
+        with self._lock:
+            # created_at her yazımda yenilenir; temizlik yeni referans verilen metni silmez
+            self._conn.executemany(
+                "INSERT INTO chunk (hash, text, created_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(hash) DO UPDATE SET created_at = excluded.created_at",
+                [(hash_value, text, now) for hash_value, text in zip(hashes, texts)],
+            )
+            self._conn.commit()
+
+    def get_many(self, hashes: List[str]) -> Dict[str, str]:
+        unique = list(dict.fromkeys(hashes))
+        found: Dict[str, str] = {}
+        with self._lock:
+            for start in range(0, len(unique), 500):
+                part = unique[start:start + 500]
+                placeholders = ",".join("?" for _ in part)
+                found.update(
+                    self._conn.execute(
+                        f"SELECT hash, text FROM chunk WHERE hash IN ({placeholders})", part
+                    ).fetchall()
+                )
+        return found
+
+    def remove_unreferenced(self, referenced: set, before: float, dry_run: bool = False) -> int:
+        """before'dan önce yazılmış ve referenced içinde olmayan kayıtları sil; sayısını döndür"""
+        with self._lock:
+            stale = [
+                hash_value
+                for (hash_value,) in self._conn.execute(
+                    "SELECT hash FROM chunk WHERE created_at < ?", (before,)
+                )
+                if hash_value not in referenced
+            ]
+            if not dry_run:
+                for start in range(0, len(stale), 500):
+                    part = stale[start:start + 500]
+                    placeholders = ",".join("?" for _ in part)
+                    self._conn.execute(f"DELETE FROM chunk WHERE hash IN ({placeholders})", part)
+                self._conn.commit()
+        return len(stale)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, text_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(CAST(text AS BLOB))), 0) FROM chunk"
+            ).fetchone()
+        return {"entries": entries, "bytes": text_bytes}
+
+    def vacuum(self):
+        """Silinen satırların boşalttığı sayfaları diske geri ver"""
+        with self._lock:
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
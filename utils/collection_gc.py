@@ -0,0 +1,308 @@
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List
+
+from utils.rag_resources import register_shutdown_hook
+
+logger = logging.getLogger(__name__)
+
+ANON_PREFIX = "ders_notlari_anon_"
+
+_sweeper_lock = threading.Lock()
+_sweeper: list = []
+_stop = threading.Event()
+
+
+class CollectionRegistry:
+    """Koleksiyonların son erişim zamanı (SQLite)"""
+
+    def __init__(self, path: str, touch_interval: float = 60.0):
+        self.path = path
+        self.touch_interval = touch_interval
+        self._lock = threading.Lock()
+        self._recent = {}
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS collection_access (
+                collection_name TEXT PRIMARY KEY,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def touch(self, collection_name: str, now: float | None = None):
+        """Erişimi kaydet; aynı koleksiyon için touch_interval içinde tekrar yazılmaz"""
+        now = time.time() if now is None else now
+        with self._lock:
+            if now - self._recent.get(collection_name, float("-inf")) < self.touch_interval:
+                return
+            self._recent[collection_name] = now
+            self._conn.execute(
+                "INSERT INTO collection_access (collection_name, last_access) VALUES (?, ?) "
+                "ON CONFLICT(collection_name) DO UPDATE SET last_access = excluded.last_access",
+                (collection_name, now),
+            )
+            self._conn.commit()
+
+    def last_access(self, collection_name: str) -> float | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_access FROM collection_access WHERE collection_name = ?",
+                (collection_name,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def forget(self, collection_name: str):
+        with self._lock:
+            self._recent.pop(collection_name, None)
+            self._conn.execute(
+                "DELETE FROM collection_access WHERE collection_name = ?", (collection_name,)
+            )
+            self._conn.commit()
+
+    def vacuum(self):
+        """Silinen satırların boşalttığı sayfaları diske geri ver"""
+        with self._lock:
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _is_uuid(name: str) -> bool:
+    try:
+        uuid.UUID(name)
+    except ValueError:
+        return False
+    return True
+
+
+def remove_orphan_segments(persist_directory: str, dry_run: bool = False) -> List[str]:
+    """Chroma'da karşılığı kalmamış segment klasörlerini (UUID adlı) sil.
+
+    Chroma koleksiyon silindiğinde HNSW klasörünü diskte bırakır; canlı segmentler
+    chroma.sqlite3 içindeki segments tablosundan salt okunur olarak okunur.
+    """
+    db_path = os.path.join(persist_directory, "chroma.sqlite3")
+    if not os.path.exists(db_path):
+        return []
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        live = {row[0] for row in conn.execute("SELECT id FROM segments")}
+    finally:
+        conn.close()
+    removed = []
+    for name in os.listdir(persist_directory):
+        path = os.path.join(persist_directory, name)
+        if os.path.isdir(path) and _is_uuid(name) and name not in live:
+            if not dry_run:
+                shutil.rmtree(path, ignore_errors=True)
+            removed.append(name)
+    return removed
+
+
+def sweep_chunk_store(rag_processor, collection_names, dry_run: bool = False, grace_seconds: float = 3600.0) -> int:
+    """Paylaşılan parça deposunda hiçbir koleksiyonun referans vermediği metinleri sil.
+
+    Son grace_seconds içinde yazılan kayıtlara dokunulmaz; depoya yazılıp henüz upsert
+    edilmemiş parçalar böylece korunur.
+    """
+    chunk_store = rag_processor.chunk_store
+    if not chunk_store.stats()["entries"]:
+        return 0
+    before = time.time() - grace_seconds
+    referenced = set()
+    page_size = 1000
+    for name in collection_names:
+        try:
+            collection = rag_processor.chroma_client.get_collection(
+                name=name,
+                embedding_function=rag_processor.embedding_function,
+            )
+        except Exception:
+            logger.exception("Parca deposu taramasinda koleksiyon acilamadi: %s", name)
+            # Referansları okunamayan koleksiyon varken silmek güvenli değil
+            return 0
+        offset = 0
+        while True:
+            data = collection.get(include=["metadatas"], limit=page_size, offset=offset)
+            metadatas = data.get("metadatas") or []
+            referenced.update(
+                (meta or {}).get("chunk_hash") for meta in metadatas if (meta or {}).get("chunk_hash")
+            )
+            if len(metadatas) < page_size:
+                break
+            offset += page_size
+    return chunk_store.remove_unreferenced(referenced, before, dry_run=dry_run)
+
+
+def vacuum_side_stores(rag_processor) -> bool:
+    """Manifest, sözcük indeksi, kayıt defteri ve parça deposu SQLite dosyalarını sıkıştır"""
+    stores = (
+        rag_processor.source_manifest,
+        rag_processor.lexical_index,
+        rag_processor.collection_registry,
+        rag_processor.chunk_store,
+    )
+    vacuumed = True
+    for store in stores:
+        try:
+            store.vacuum()
+        except Exception:
+            logger.exception("SQLite sikistirma hatasi: %s", store.path)
+            vacuumed = False
+    return vacuumed
+
+
+def vacuum_chroma_sqlite(persist_directory: str, timeout: float = 5.0) -> bool:
+    """chroma.sqlite3 dosyasını VACUUM ile sıkıştır.
+
+    VACUUM tüm veritabanını yeniden yazar ve süresince yazmaları kilitler; yalnızca uygulama
+    kapalıyken (başka istemci yazmıyorken) çalıştırılmalıdır. Kilit alınamazsa False döner.
+    """
+    db_path = os.path.join(persist_directory, "chroma.sqlite3")
+    if not os.path.exists(db_path):
+        return False
+    conn = sqlite3.connect(db_path, timeout=timeout, isolation_level=None)
+    try:
+        conn.execute("VACUUM")
+        return True
+    except sqlite3.OperationalError:
+        logger.exception("Chroma SQLite sikistirma hatasi: %s", db_path)
+        return False
+    finally:
+        conn.close()
+
+
+def sweep_collections(
+    rag_processor,
+    ttl_seconds: float | None = None,
+    prefix: str = ANON_PREFIX,
+    dry_run: bool = False,
+    vacuum_chroma: bool = False,
+) -> dict:
+    """Son erişimi ttl_seconds'tan eski anonim koleksiyonları sil ve diski sıkıştır.
+
+    Kayıt defterinde hiç görülmemiş koleksiyonlar (kayıt öncesinden kalanlar) ilk taramada
+    işaretlenir ve ancak TTL dolduktan sonra silinir. Yan SQLite depoları her zaman, chroma.sqlite3
+    ise yalnızca vacuum_chroma verilirse sıkıştırılır (bkz. vacuum_chroma_sqlite).
+    """
+    if ttl_seconds is None:
+        ttl_seconds = float(os.getenv("RAG_ANON_TTL_HOURS", "72")) * 3600
+    persist_directory = rag_processor.persist_directory
+    registry = rag_processor.collection_registry
+    size_before = directory_size(persist_directory)
+    now = time.time()
+
+    expired = []
+    live = set()
+    for item in rag_processor.chroma_client.list_collections():
+        name = getattr(item, "name", item)
+        live.add(name)
+        if not name.startswith(prefix):
+            continue
+        last_access = registry.last_access(name)
+        if last_access is None:
+            if not dry_run:
+                registry.touch(name, now)
+        elif now - last_access > ttl_seconds:
+            expired.append(name)
+
+    deleted = []
+    for name in expired:
+        if dry_run or rag_processor.delete_collection(collection_name=name):
+            deleted.append(name)
+    orphans = remove_orphan_segments(persist_directory, dry_run=dry_run)
+    unreferenced_chunks = sweep_chunk_store(
+        rag_processor, sorted(live - set(deleted)), dry_run=dry_run
+    )
+    # Başka bir süreçte silinen koleksiyonların kesin arama indeksleri bellekten ve diskten atılır
+    exact_index = rag_processor.exact_index
+    orphan_indexes = sorted(
+        (set(exact_index.names()) | set(exact_index.loaded_names())) - live - set(expired)
+    )
+    if not dry_run:
+        for name in orphan_indexes:
+            exact_index.drop(name)
+
+    vacuumed = False
+    if not dry_run and (deleted or orphans or orphan_indexes or unreferenced_chunks):
+        vacuumed = vacuum_side_stores(rag_processor)
+        if vacuum_chroma:
+            vacuumed = vacuum_chroma_sqlite(persist_directory) and vacuumed
+
+    result = {
+        "deleted": deleted,
+        "orphan_segments": orphans,
+        "orphan_exact_indexes": orphan_indexes,
+        "unreferenced_chunks": unreferenced_chunks,
+        "vacuumed": vacuumed,
+        "reclaimed_bytes": max(0, size_before - directory_size(persist_directory)),
+        "dry_run": dry_run,
+    }
+    logger.info(
+        "Koleksiyon temizligi: silinen=%s yetim_segment=%s referanssiz_parca=%s kazanilan_bayt=%s",
+        len(deleted),
+        len(orphans),
+        unreferenced_chunks,
+        result["reclaimed_bytes"],
+    )
+    return result
+
+
+def _sweeper_loop(rag_processor, interval: float):
+    while not _stop.wait(interval):
+        try:
+            sweep_collections(rag_processor)
+        except Exception:
+            logger.exception("Koleksiyon temizleme hatasi")
+
+
+def start_sweeper(rag_processor, interval_seconds: float | None = None):
+    """RAG_GC_INTERVAL_MINUTES > 0 ise süreç başına bir temizlik thread'i başlat"""
+    if interval_seconds is None:
+        interval_seconds = float(os.getenv("RAG_GC_INTERVAL_MINUTES", "0")) * 60
+    if interval_seconds <= 0:
+        return
+    with _sweeper_lock:
+        if _sweeper:
+            return
+        _stop.clear()
+        thread = threading.Thread(
+            target=_sweeper_loop,
+            args=(rag_processor, interval_seconds),
+            name="collection-sweeper",
+            daemon=True,
+        )
+        thread.start()
+        _sweeper.append(thread)
+        register_shutdown_hook(stop_sweeper)
+
+
+def stop_sweeper(timeout: float = 5.0):
+    with _sweeper_lock:
+        _stop.set()
+        for thread in _sweeper:
+            thread.join(timeout)
+        _sweeper.clear()
@@ -0,0 +1,132 @@
+import logging
+import os
+from typing import List
+
+from langchain_core.documents import Document
+
+from utils.rag_resources import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Bu uzunluktan kısa örtüşmeler tesadüfi kabul edilir ve kırpılmaz
+_MIN_OVERLAP_CHARS = 8
+
+
+def _doc_tokens(doc: Document) -> int:
+    token_count = (doc.metadata or {}).get("token_count")
+    if token_count is None:
+        return count_tokens(doc.page_content)
+    return int(token_count)
+
+
+def _overlap_length(left: str, right: str) -> int:
+    """left'in sonu ile right'ın başı arasındaki en uzun ortak parça"""
+    for length in range(min(len(left), len(right)), _MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:length]):
+            return length
+    return 0
+
+
+def _merge_blocks(docs: List[Document], separator: str) -> List[dict]:
+    """(koleksiyon, kaynak, chunk_id) sırasına göre komşu parçaları birleştir ve örtüşmeyi at"""
+    ranked = list(enumerate(docs))
+    ranked.sort(
+        key=lambda item: (
+            str((item[1].metadata or {}).get("collection", "")),
+            str((item[1].metadata or {}).get("source", "")),
+            (item[1].metadata or {}).get("chunk_id") is None,
+            (item[1].metadata or {}).get("chunk_id") or 0,
+            item[0],
+        )
+    )
+    blocks: List[dict] = []
+    for rank, doc in ranked:
+        metadata = doc.metadata or {}
+        chunk_id = metadata.get("chunk_id")
+        source = metadata.get("source")
+        collection = metadata.get("collection")
+        last = blocks[-1] if blocks else None
+        if (
+            last is not None
+            and chunk_id is not None
+            and last["collection"] == collection
+            and last["source"] == source
+            and last["last_chunk_id"] is not None
+            and chunk_id - last["last_chunk_id"] in (0, 1)
+        ):
+            if chunk_id == last["last_chunk_id"]:
+                last["rank"] = min(last["rank"], rank)
+                last["naive_tokens"] += _doc_tokens(doc)
+                continue
+            overlap = _overlap_length(last["text"], doc.page_content)
+            if overlap:
+                last["text"] += doc.page_content[overlap:]
+                last["tokens"] += _doc_tokens(doc) - count_tokens(doc.page_content[:overlap])
+            else:
+                last["text"] += separator + doc.page_content
+                last["tokens"] += _doc_tokens(doc)
+            last["naive_tokens"] += _doc_tokens(doc)
+            last["last_chunk_id"] = chunk_id
+            last["rank"] = min(last["rank"], rank)
+            continue
+        tokens = _doc_tokens(doc)
+        blocks.append({
+            "collection": collection,
+            "source": source,
+            "last_chunk_id": chunk_id,
+            "text": doc.page_content,
+            "tokens": tokens,
+            "naive_tokens": tokens,
+            "rank": rank,
+            "order": len(blocks),
+        })
+    return blocks
+
+
+def pack_context(
+    docs: List[Document],
+    token_budget: int | None = None,
+    separator: str = "\n\n",
+) -> dict:
+    """Arama sonuçlarını LLM bağlamına paketle.
+
+    Komşu parçalar birleştirilip tekrar eden örtüşme atılır, bloklar alaka sırasına göre
+    token bütçesine yerleştirilir ve metin kaynak/parça sırasıyla döndürülür.
+    """
+    if token_budget is None:
+        token_budget = int(os.getenv("RAG_CONTEXT_TOKENS", "3000"))
+    naive_tokens = sum(_doc_tokens(doc) for doc in docs)
+    blocks = _merge_blocks(docs, separator)
+
+    selected = []
+    used = 0
+    for block in sorted(blocks, key=lambda item: item["rank"]):
+        if used + block["tokens"] <= token_budget:
+            selected.append(block)
+            used += block["tokens"]
+    if not selected and blocks:
+        # Tek blok bile sığmıyorsa en alakalı bloğu bütçe oranında kırp
+        top = min(blocks, key=lambda item: item["rank"])
+        ratio = token_budget / max(1, top["tokens"])
+        selected.append({**top, "text": top["text"][: int(len(top["text"]) * ratio)]})
+        used = token_budget
+
+    selected.sort(key=lambda item: item["order"])
+    result = {
+        "context": separator.join(block["text"] for block in selected),
+        "tokens": used,
+        "naive_tokens": naive_tokens,
+        "saved_tokens": max(0, naive_tokens - used),
+        "overlap_saved_tokens": sum(block["naive_tokens"] - block["tokens"] for block in blocks),
+        "blocks": len(selected),
+        "dropped_blocks": len(blocks) - len(selected),
+    }
+    logger.info(
+        "Baglam paketleme: parca=%s blok=%s token=%s tasarruf=%s ortusme=%s",
+        len(docs),
+        result["blocks"],
+        result["tokens"],
+        result["saved_tokens"],
+        result["overlap_saved_tokens"],
+    )
+    return result
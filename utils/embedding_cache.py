@@ -0,0 +1,199 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, List
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: yalnızca süreç içi kilit kullanılır
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """(model, parça özeti) anahtarlı kalıcı embedding önbelleği.
+
+    Satır indeksleri SQLite'ta, vektörler model başına tek bir float32 dosyasında tutulur
+    ve okuma np.memmap ile yapılır; bu sayede önbellek RAM'e tamamen yüklenmez.
+    """
+
+    def __init__(self, directory: str, model_id: str):
+        self.directory = directory
+        self.model_id = model_id
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._dim = None
+        self._matrix = None
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_id) or "model"
+        self.vectors_path = os.path.join(directory, f"embeddings_{slug}.f32")
+        self.lock_path = f"{self.vectors_path}.lock"
+        self._conn = sqlite3.connect(
+            os.path.join(directory, "embeddings.sqlite3"),
+            check_same_thread=False,
+        )
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_model (
+                model_id TEXT PRIMARY KEY,
+                dim INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS embedding_index (
+                model_id TEXT NOT NULL,
+                chunk_hash TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                PRIMARY KEY (model_id, chunk_hash)
+            );
+            """
+        )
+        self._conn.commit()
+        row = self._conn.execute(
+            "SELECT dim FROM embedding_model WHERE model_id = ?", (model_id,)
+        ).fetchone()
+        if row is not None:
+            self._dim = row[0]
+
+    @contextmanager
+    def _file_lock(self):
+        """Aynı önbelleği paylaşan süreçler arasında yazmayı sıraya sok (fcntl.flock)"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _row_count(self) -> int:
+        if self._dim is None or not os.path.exists(self.vectors_path):
+            return 0
+        return os.path.getsize(self.vectors_path) // (self._dim * 4)
+
+    def _get_matrix(self, needed_rows: int):
+        if self._matrix is None or self._matrix.shape[0] < needed_rows:
+            rows = self._row_count()
+            if rows == 0:
+                return None
+            self._matrix = np.memmap(
+                self.vectors_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(rows, self._dim),
+            )
+        return self._matrix
+
+    def _lookup_rows(self, hashes: List[str]) -> Dict[str, int]:
+        rows = {}
+        for start in range(0, len(hashes), 500):
+            part = hashes[start:start + 500]
+            placeholders = ",".join("?" for _ in part)
+            for hash_value, row in self._conn.execute(
+                f"SELECT chunk_hash, row FROM embedding_index "
+                f"WHERE model_id = ? AND chunk_hash IN ({placeholders})",
+                [self.model_id, *part],
+            ):
+                rows[hash_value] = row
+        return rows
+
+    def get_many(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Önbellekte bulunan vektörleri özet -> vektör sözlüğü olarak döndür"""
+        unique = list(dict.fromkeys(hashes))
+        found: Dict[str, np.ndarray] = {}
+        if not unique:
+            return found
+        with self._lock:
+            rows = self._lookup_rows(unique)
+            if rows:
+                matrix = self._get_matrix(max(rows.values()) + 1)
+                if matrix is not None:
+                    for hash_value, row in rows.items():
+                        if row < matrix.shape[0]:
+                            found[hash_value] = np.array(matrix[row])
+            self.hits += len(found)
+            self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, hashes: List[str], vectors) -> None:
+        """Yeni vektörleri dosyanın sonuna ekle ve indekse yaz; ekleme dosya kilidi altında yapılır"""
+        if not hashes:
+            return
+        matrix = np.asarray(vectors, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[0] != len(hashes):
+            raise ValueError("Embedding boyutu uyusmuyor")
+        with self._lock, self._file_lock():
+            # Satır sayısı, indeks ve boyut kilit altında yeniden okunur; başka bir süreç
+            # aynı dosyaya yazmış olabilir
+            row = self._conn.execute(
+                "SELECT dim FROM embedding_model WHERE model_id = ?", (self.model_id,)
+            ).fetchone()
+            if row is not None:
+                self._dim = row[0]
+            if self._dim is None:
+                self._dim = int(matrix.shape[1])
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO embedding_model (model_id, dim) VALUES (?, ?)",
+                    (self.model_id, self._dim),
+                )
+            elif matrix.shape[1] != self._dim:
+                raise ValueError("Embedding boyutu uyusmuyor")
+
+            existing = self._lookup_rows(hashes)
+            new_rows = []
+            seen = set(existing)
+            for index, hash_value in enumerate(hashes):
+                if hash_value not in seen:
+                    seen.add(hash_value)
+                    new_rows.append((hash_value, index))
+            if not new_rows:
+                self._conn.commit()
+                return
+
+            first_row = self._row_count()
+            with open(self.vectors_path, "ab") as fh:
+                # Yarım yazılmış satır kaldıysa dosyayı satır sınırına hizala
+                fh.truncate(first_row * self._dim * 4)
+                fh.seek(0, os.SEEK_END)
+                fh.write(matrix[[index for _, index in new_rows]].tobytes())
+            self._conn.executemany(
+                "INSERT INTO embedding_index (model_id, chunk_hash, row) VALUES (?, ?, ?)",
+                [
+                    (self.model_id, hash_value, first_row + offset)
+                    for offset, (hash_value, _) in enumerate(new_rows)
+                ],
+            )
+            self._conn.commit()
+            self._matrix = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute(
+                "SELECT COUNT(*) FROM embedding_index WHERE model_id = ?",
+                (self.model_id,),
+            ).fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "entries": entries,
+            "bytes": os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._matrix = None
+            self._conn.close()
@@ -0,0 +1,152 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ExactSearchIndex:
+    """Küçük koleksiyonlar için embedding matrisini diskte (np.memmap) tutan kesin arama indeksi.
+
+    Her koleksiyon için <ad>.f32 matris dosyası ve <ad>.json satır bilgisi yazılır; kayıt, koleksiyon
+    sürümüyle etiketlenir ve sürüm değişince yeniden kurulur. Bellekte en fazla max_loaded
+    koleksiyonun indeksi (LRU) açık tutulur.
+    """
+
+    def __init__(self, directory: str, max_loaded: int = 64):
+        self.directory = directory
+        self.max_loaded = max(1, max_loaded)
+        self._lock = threading.Lock()
+        self._loaded: OrderedDict = OrderedDict()
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, collection_name: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, collection_name)
+        return f"{base}.f32", f"{base}.json"
+
+    def get(self, collection_name: str, version: int) -> dict | None:
+        """Verilen sürüm için indeksi döndür; yoksa veya eskiyse None"""
+        with self._lock:
+            entry = self._loaded.get(collection_name)
+            if entry is not None and entry["version"] == version:
+                self._loaded.move_to_end(collection_name)
+                return entry
+            matrix_path, meta_path = self._paths(collection_name)
+            try:
+                with open(meta_path, encoding="utf-8") as fh:
+                    meta = json.load(fh)
+            except (OSError, ValueError):
+                return None
+            if meta.get("version") != version:
+                return None
+            entry = self._load(meta, matrix_path)
+            self._loaded[collection_name] = entry
+            self._loaded.move_to_end(collection_name)
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+            return entry
+
+    @staticmethod
+    def _load(meta: dict, matrix_path: str) -> dict:
+        entry = {"version": meta["version"], "count": meta["count"], "large": meta.get("large", False)}
+        if entry["large"] or not meta["count"]:
+            return entry
+        matrix = np.memmap(matrix_path, dtype=np.float32, mode="r", shape=(meta["count"], meta["dim"]))
+        entry.update(
+            matrix=matrix,
+            norms=np.einsum("ij,ij->i", matrix, matrix),
+            ids=meta["ids"],
+            sources=np.asarray(meta["sources"], dtype=object),
+        )
+        return entry
+
+    def _write(self, collection_name: str, meta: dict, matrix: np.ndarray | None = None):
+        matrix_path, meta_path = self._paths(collection_name)
+        if matrix is not None:
+            with open(f"{matrix_path}.tmp", "wb") as fh:
+                fh.write(np.ascontiguousarray(matrix, dtype=np.float32).tobytes())
+            os.replace(f"{matrix_path}.tmp", matrix_path)
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as fh:
+            json.dump(meta, fh, ensure_ascii=False)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+    def build(self, collection_name: str, version: int, ids: List[str], embeddings, sources: List[str]) -> dict:
+        # Boş koleksiyonda reshape(0, -1) hata verir; boyut ilk vektörden alınır
+        dim = len(embeddings[0]) if len(ids) else 0
+        matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), dim)
+        meta = {
+            "version": version,
+            "count": len(ids),
+            "dim": dim,
+            "ids": list(ids),
+            "sources": list(sources),
+        }
+        with self._lock:
+            self._loaded.pop(collection_name, None)
+            self._write(collection_name, meta, matrix if len(ids) else None)
+        logger.info("Kesin arama indeksi olusturuldu: %s (%s parca)", collection_name, len(ids))
+        return self.get(collection_name, version)
+
+    def mark_large(self, collection_name: str, version: int, count: int) -> dict:
+        """Eşik üstündeki koleksiyonu bu sürüm için Chroma'ya yönlendir"""
+        with self._lock:
+            self._loaded.pop(collection_name, None)
+            self._write(collection_name, {"version": version, "count": count, "large": True})
+        return self.get(collection_name, version)
+
+    def drop(self, collection_name: str):
+        with self._lock:
+            self._loaded.pop(collection_name, None)
+            for path in self._paths(collection_name):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def evict(self, collection_name: str):
+        """İndeksi yalnızca bellekten çıkar; dosyalar diskte kalır"""
+        with self._lock:
+            self._loaded.pop(collection_name, None)
+
+    def names(self) -> List[str]:
+        """Diskte indeksi bulunan koleksiyon adları"""
+        return sorted(
+            name[: -len(".json")] for name in os.listdir(self.directory) if name.endswith(".json")
+        )
+
+    def loaded_names(self) -> List[str]:
+        with self._lock:
+            return list(self._loaded)
+
+    @staticmethod
+    def search(entry: dict, query_embedding, n_results: int, source_filter: List[str] | None = None):
+        """Kare L2 mesafesiyle en yakın n_results satırın (id, mesafe) listesini döndür"""
+        return ExactSearchIndex.search_many(entry, [query_embedding], n_results, source_filter)[0]
+
+    @staticmethod
+    def search_many(entry: dict, query_embeddings, n_results: int, source_filter: List[str] | None = None):
+        """Birden çok sorguyu tek matris çarpımıyla ara; sorgu başına (id, mesafe) listesi döndür"""
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(len(query_embeddings), -1)
+        if not entry.get("count") or entry.get("large"):
+            return [[] for _ in range(len(queries))]
+        distances = (
+            entry["norms"][None, :]
+            - 2.0 * (queries @ entry["matrix"].T)
+            + np.einsum("ij,ij->i", queries, queries)[:, None]
+        )
+        if source_filter:
+            distances = np.where(np.isin(entry["sources"], source_filter)[None, :], distances, np.inf)
+        n_results = min(n_results, distances.shape[1])
+        top = np.argpartition(distances, n_results - 1, axis=1)[:, :n_results]
+        results = []
+        for row, indexes in zip(distances, top):
+            indexes = indexes[np.argsort(row[indexes])]
+            results.append([
+                (entry["ids"][index], float(row[index]))
+                for index in indexes
+                if np.isfinite(row[index])
+            ])
+        return results
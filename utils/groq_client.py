@@ -8,6 +8,8 @@ from langchain_groq import ChatGroq
 from langchain_core.prompts import PromptTemplate
 from langchain_core.documents import Document
 
+from utils.context_packing import pack_context
+
 logger = logging.getLogger(__name__)
 
 
@@ -621,7 +623,7 @@ SORU 2:
     ) -> str:
         """Kullanici sorusuna ders notlarindan yararlanarak cevap ver"""
 
-        context = "\n\n".join([doc.page_content for doc in context_docs])
+        context = pack_context(context_docs)["context"]
 
         prompt_template = """Asagidaki ders notlarini kullanarak soruya Turkce cevap ver.
 
@@ -0,0 +1,323 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# Yazılmakta olan dosyanın satırları "<anahtar>.tmp.<zaman>.<rastgele>" geçici anahtarıyla tutulur
+_STAGING_MARK = ".tmp."
+_STAGING_MAX_AGE = 24 * 3600
+
+
+def file_digest(file, block_size: int = 1024 * 1024) -> str:
+    """Dosyanın SHA-256 özetini blok blok hesapla ve konumu başa al"""
+    digest = hashlib.sha256()
+    file.seek(0)
+    while True:
+        block = file.read(block_size)
+        if not block:
+            break
+        digest.update(block)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+class IngestCache:
+    """Dosya içeriğine göre adreslenen kalıcı ingest önbelleği (SQLite, LRU tahliye)"""
+
+    def __init__(self, path: str, max_bytes: int | None = None):
+        if max_bytes is None:
+            max_bytes = int(os.getenv("RAG_INGEST_CACHE_MB", "512")) * 1024 * 1024
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL: okuma anlık görüntüleri yazıcıları bekletmez, yazıcılar da okuyucuları bozmaz
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS ingest_entry (
+                key TEXT PRIMARY KEY,
+                size_bytes INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS ingest_page (
+                key TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                PRIMARY KEY (key, idx)
+            );
+            CREATE TABLE IF NOT EXISTS ingest_chunk (
+                key TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                embedding BLOB,
+                PRIMARY KEY (key, idx)
+            );
+            CREATE INDEX IF NOT EXISTS ix_ingest_entry_last_access
+                ON ingest_entry (last_access);
+            """
+        )
+        self._conn.commit()
+        self._remove_stale_staging()
+
+    @staticmethod
+    def make_key(digest: str, settings: str) -> str:
+        return hashlib.sha256(f"{digest}|{settings}".encode("utf-8")).hexdigest()
+
+    def lookup(self, key: str) -> int | None:
+        """Kayıt varsa parça sayısını döndür ve erişim zamanını güncelle"""
+        with self.snapshot(key) as cached:
+            return None if cached is None else cached.count
+
+    @contextmanager
+    def snapshot(self, key: str) -> Iterator["IngestSnapshot | None"]:
+        """Kaydı tek bir okuma işleminde aç; kayıt yoksa None verir.
+
+        Okuma boyunca başka bir yazıcının commit'i veya tahliye görülmez.
+        """
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        try:
+            conn.execute("BEGIN")
+            row = conn.execute(
+                "SELECT 1 FROM ingest_entry WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                yield None
+                return
+            count = conn.execute(
+                "SELECT COUNT(*) FROM ingest_chunk WHERE key = ?", (key,)
+            ).fetchone()[0]
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE ingest_entry SET last_access = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+                self._conn.commit()
+            self.hits += 1
+            yield IngestSnapshot(conn, key, count)
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> dict | None:
+        """Önbellekteki metni, parçaları ve embedding'leri tek seferde döndür"""
+        with self.snapshot(key) as cached:
+            if cached is None:
+                return None
+            documents = []
+            embeddings = []
+            for batch, batch_embeddings in cached.iter_batches(512):
+                documents.extend(batch)
+                embeddings.extend(batch_embeddings)
+            return {
+                "text": "\n".join(text for text in cached.page_texts() if text),
+                "documents": documents,
+                "embeddings": embeddings,
+            }
+
+    def writer(self, key: str) -> "IngestCacheWriter":
+        return IngestCacheWriter(self, key)
+
+    def put(self, key: str, text: str, documents: List[Document], embeddings=None):
+        """İşlenmiş dosyayı tek seferde önbelleğe yaz"""
+        writer = self.writer(key)
+        writer.add_page_text(text)
+        writer.add_chunks(documents, embeddings)
+        writer.commit()
+
+    def _evict(self):
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size_bytes), 0) FROM ingest_entry"
+        ).fetchone()[0]
+        while total > self.max_bytes:
+            row = self._conn.execute(
+                "SELECT key, size_bytes FROM ingest_entry ORDER BY last_access LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            self._delete_rows(row[0])
+            total -= row[1]
+            logger.info("Ingest onbelleginden tahliye edildi: %s", row[0][:12])
+        self._conn.commit()
+
+    def _remove_stale_staging(self):
+        """Yarıda kalan yazıcılardan kalan eski geçici satırları sil"""
+        cutoff = time.time() - _STAGING_MAX_AGE
+        with self._lock:
+            keys = [
+                key
+                for (key,) in self._conn.execute(
+                    "SELECT DISTINCT key FROM ingest_chunk WHERE instr(key, ?) > 0 "
+                    "UNION SELECT DISTINCT key FROM ingest_page WHERE instr(key, ?) > 0",
+                    (_STAGING_MARK, _STAGING_MARK),
+                )
+            ]
+            for key in keys:
+                try:
+                    started = float(key.split(_STAGING_MARK, 1)[1].split(".", 1)[0])
+                except ValueError:
+                    started = 0.0
+                if started < cutoff:
+                    self._delete_rows(key)
+            self._conn.commit()
+
+    def _delete_rows(self, key: str):
+        self._conn.execute("DELETE FROM ingest_chunk WHERE key = ?", (key,))
+        self._conn.execute("DELETE FROM ingest_page WHERE key = ?", (key,))
+        self._conn.execute("DELETE FROM ingest_entry WHERE key = ?", (key,))
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size_bytes), 0) FROM ingest_entry"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "entries": entries,
+            "bytes": total,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class IngestSnapshot:
+    """Tek bir okuma işlemine bağlı önbellek kaydı; satırlar okunurken değişmez"""
+
+    def __init__(self, conn: sqlite3.Connection, key: str, count: int):
+        self._conn = conn
+        self.key = key
+        self.count = count
+
+    def page_texts(self) -> List[str]:
+        return [
+            text
+            for (text,) in self._conn.execute(
+                "SELECT text FROM ingest_page WHERE key = ? ORDER BY idx", (self.key,)
+            )
+        ]
+
+    def iter_batches(self, batch_size: int) -> Iterator[Tuple[List[Document], list]]:
+        """Parçaları ve embedding'leri (yoksa None) sınırlı bellekle parti parti üret"""
+        start = 0
+        while True:
+            rows = self._conn.execute(
+                "SELECT content, metadata, embedding FROM ingest_chunk "
+                "WHERE key = ? AND idx >= ? ORDER BY idx LIMIT ?",
+                (self.key, start, batch_size),
+            ).fetchall()
+            if not rows:
+                return
+            documents = [
+                Document(page_content=content, metadata=json.loads(metadata))
+                for content, metadata, _ in rows
+            ]
+            embeddings = [
+                np.frombuffer(embedding, dtype=np.float32) if embedding is not None else None
+                for _, _, embedding in rows
+            ]
+            yield documents, embeddings
+            start += len(rows)
+
+
+class IngestCacheWriter:
+    """Akış halinde işlenen dosyayı geçici anahtarla önbelleğe yazar; commit edilene kadar görünmez.
+
+    Aynı anahtara yazan iki yazıcı birbirinin satırlarına dokunmaz; son commit eden kazanır.
+    """
+
+    def __init__(self, cache: IngestCache, key: str):
+        self.cache = cache
+        self.key = key
+        self.staging_key = f"{key}{_STAGING_MARK}{int(time.time())}.{uuid.uuid4().hex[:8]}"
+        self.size_bytes = 0
+        self.page_count = 0
+        self.chunk_count = 0
+        self.active = True
+
+    def _check_size(self):
+        if self.size_bytes > self.cache.max_bytes:
+            logger.info("Ingest onbellegi icin dosya cok buyuk: %s", self.key[:12])
+            self.abort()
+
+    def add_page_text(self, text: str):
+        if not self.active:
+            return
+        self.size_bytes += len(text.encode("utf-8"))
+        with self.cache._lock:
+            self.cache._conn.execute(
+                "INSERT INTO ingest_page (key, idx, text) VALUES (?, ?, ?)",
+                (self.staging_key, self.page_count, text),
+            )
+            self.cache._conn.commit()
+        self.page_count += 1
+        self._check_size()
+
+    def add_chunks(self, documents: List[Document], embeddings=None):
+        if not self.active:
+            return
+        rows = []
+        for offset, doc in enumerate(documents):
+            metadata = json.dumps(doc.metadata, ensure_ascii=False)
+            blob = None
+            if embeddings is not None and embeddings[offset] is not None:
+                blob = np.asarray(embeddings[offset], dtype=np.float32).tobytes()
+            self.size_bytes += len(doc.page_content.encode("utf-8")) + len(metadata) + len(blob or b"")
+            rows.append((self.staging_key, self.chunk_count + offset, doc.page_content, metadata, blob))
+        with self.cache._lock:
+            self.cache._conn.executemany(
+                "INSERT INTO ingest_chunk (key, idx, content, metadata, embedding) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.cache._conn.commit()
+        self.chunk_count += len(rows)
+        self._check_size()
+
+    def commit(self):
+        if not self.active:
+            return
+        now = time.time()
+        with self.cache._lock:
+            # Eski kaydı silip geçici satırları asıl anahtara taşımak tek işlemde olur
+            self.cache._delete_rows(self.key)
+            for table in ("ingest_page", "ingest_chunk"):
+                self.cache._conn.execute(
+                    f"UPDATE {table} SET key = ? WHERE key = ?", (self.key, self.staging_key)
+                )
+            self.cache._conn.execute(
+                "INSERT OR REPLACE INTO ingest_entry "
+                "(key, size_bytes, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (self.key, self.size_bytes, now, now),
+            )
+            self.cache._conn.commit()
+            self.cache._evict()
+        self.active = False
+
+    def abort(self):
+        if not self.active:
+            return
+        with self.cache._lock:
+            self.cache._delete_rows(self.staging_key)
+            self.cache._conn.commit()
+        self.active = False
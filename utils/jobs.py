@@ -0,0 +1,437 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from datetime import timedelta, timezone
+
+from sqlalchemy import update
+from sqlmodel import select
+
+from utils.db import get_session
+from utils.models import IngestJob, now_utc
+from utils.rag_processor import expand_uploads, unique_upload_names
+from utils.rag_resources import register_shutdown_hook
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_worker_lock = threading.Lock()
+_workers: list = []
+_wakeup = threading.Event()
+_stop = threading.Event()
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _lease_seconds() -> float:
+    return float(os.getenv("INGEST_LEASE_SECONDS", "120"))
+
+
+def _upload_dir() -> str:
+    return os.getenv("INGEST_JOB_DIR", "./ingest_jobs")
+
+
+def _remove_payload(payload_path: str):
+    try:
+        shutil.rmtree(os.path.dirname(payload_path), ignore_errors=True)
+    except Exception:
+        logger.exception("Is dosyasi silinemedi")
+
+
+def enqueue_ingest_job(
+    collection_name: str,
+    filename: str,
+    data: bytes,
+    user_id: int | None = None,
+    max_attempts: int = 3,
+) -> IngestJob:
+    """Yüklenen dosyayı diske yaz ve işleme kuyruğuna ekle"""
+    job_dir = os.path.join(_upload_dir(), uuid.uuid4().hex)
+    os.makedirs(job_dir, exist_ok=True)
+    payload_path = os.path.join(job_dir, os.path.basename(filename))
+    with open(payload_path, "wb") as fh:
+        fh.write(data)
+
+    with get_session() as session:
+        job = IngestJob(
+            user_id=user_id,
+            collection_name=collection_name,
+            filename=filename,
+            payload_path=payload_path,
+            max_attempts=max_attempts,
+            message="Kuyrukta",
+        )
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+    _wakeup.set()
+    return job
+
+
+def enqueue_bulk_ingest_job(
+    collection_name: str,
+    files,
+    user_id: int | None = None,
+    max_attempts: int = 3,
+) -> IngestJob:
+    """Birden çok dosyayı tek iş olarak kuyruğa ekle; dosyalar iş dizininde saklanır.
+
+    İçerik bytes veya okunabilir dosya nesnesi olabilir; dosya nesneleri parça parça kopyalanır.
+    Aynı adlı dosyalar birbirinin üzerine yazılmaz, "ad (2).pdf" biçiminde saklanır.
+    """
+    job_dir = os.path.join(_upload_dir(), uuid.uuid4().hex)
+    payload_path = os.path.join(job_dir, "files")
+    os.makedirs(payload_path, exist_ok=True)
+    names = []
+    files = unique_upload_names([(os.path.basename(filename), data) for filename, data in files])
+    for name, data in files:
+        with open(os.path.join(payload_path, name), "wb") as fh:
+            if isinstance(data, (bytes, bytearray)):
+                fh.write(data)
+            else:
+                data.seek(0)
+                shutil.copyfileobj(data, fh, 1024 * 1024)
+        names.append(name)
+
+    with get_session() as session:
+        job = IngestJob(
+            user_id=user_id,
+            collection_name=collection_name,
+            filename=f"{len(names)} dosya",
+            payload_path=payload_path,
+            max_attempts=max_attempts,
+            message="Kuyrukta",
+        )
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+    _wakeup.set()
+    return job
+
+
+def get_job(job_id: int) -> IngestJob | None:
+    with get_session() as session:
+        return session.get(IngestJob, job_id)
+
+
+def get_jobs_for_collection(collection_name: str, limit: int = 10):
+    with get_session() as session:
+        q = (
+            select(IngestJob)
+            .where(IngestJob.collection_name == collection_name)
+            .order_by(IngestJob.id.desc())
+            .limit(limit)
+        )
+        return list(session.exec(q))
+
+
+def cancel_job(job_id: int) -> IngestJob:
+    """Kuyruktaki işi hemen, çalışan işi bir sonraki ilerleme adımında iptal et"""
+    with get_session() as session:
+        job = session.get(IngestJob, job_id)
+        if not job:
+            raise ValueError("Job not found")
+        if job.status == "queued":
+            job.status = "cancelled"
+            job.message = "İptal edildi"
+            job.finished_at = now_utc()
+            _remove_payload(job.payload_path)
+        elif job.status == "running":
+            job.cancel_requested = True
+            job.message = "İptal isteniyor"
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        return job
+
+
+def retry_job(job_id: int) -> IngestJob:
+    with get_session() as session:
+        job = session.get(IngestJob, job_id)
+        if not job:
+            raise ValueError("Job not found")
+        if job.status != "failed":
+            raise ValueError("Only failed jobs can be retried")
+        if not os.path.exists(job.payload_path):
+            raise ValueError("Job payload missing")
+        job.status = "queued"
+        job.attempts = 0
+        job.progress = 0.0
+        job.error = None
+        job.message = "Kuyrukta"
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+    _wakeup.set()
+    return job
+
+
+def claim_next_job() -> IngestJob | None:
+    """Kuyruktaki en eski işi atomik olarak 'running' durumuna al"""
+    with get_session() as session:
+        q = (
+            select(IngestJob.id)
+            .where(IngestJob.status == "queued")
+            .order_by(IngestJob.id)
+            .limit(5)
+        )
+        for job_id in list(session.exec(q)):
+            claimed = session.execute(
+                update(IngestJob)
+                .where(IngestJob.id == job_id, IngestJob.status == "queued")
+                .values(
+                    status="running",
+                    attempts=IngestJob.attempts + 1,
+                    progress=0.0,
+                    message="İşleniyor",
+                    started_at=now_utc(),
+                    heartbeat_at=now_utc(),
+                )
+            )
+            session.commit()
+            if claimed.rowcount == 1:
+                return session.get(IngestJob, job_id)
+    return None
+
+
+def _update_job(job_id: int, **values) -> IngestJob | None:
+    with get_session() as session:
+        job = session.get(IngestJob, job_id)
+        if not job:
+            return None
+        for key, value in values.items():
+            setattr(job, key, value)
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        return job
+
+
+def _heartbeat_loop(job_id: int, stop: threading.Event, interval: float):
+    """Çalışan işin heartbeat_at alanını düzenli yenile; uzun OCR/embedding adımlarında da iş canlı görünür"""
+    while not stop.wait(interval):
+        try:
+            with get_session() as session:
+                session.execute(
+                    update(IngestJob)
+                    .where(IngestJob.id == job_id, IngestJob.status == "running")
+                    .values(heartbeat_at=now_utc())
+                )
+                session.commit()
+        except Exception:
+            logger.exception("Is heartbeat yazilamadi: %s", job_id)
+
+
+def _is_bulk_job(job: IngestJob) -> bool:
+    return os.path.isdir(job.payload_path) or job.filename.lower().endswith(".zip")
+
+
+def _read_bulk_payload(job: IngestJob):
+    """İşin dosyalarını (ad, yol) çiftleri olarak döndür; içerik ingest sırasında okunur"""
+    if os.path.isdir(job.payload_path):
+        return [
+            (name, os.path.join(job.payload_path, name))
+            for name in sorted(os.listdir(job.payload_path))
+        ]
+    return [(job.filename, job.payload_path)]
+
+
+def _run_bulk(job: IngestJob, rag_processor, progress) -> dict:
+    files = expand_uploads(_read_bulk_payload(job))
+    if not files:
+        raise ValueError("Desteklenen dosya bulunamadı")
+    summary = rag_processor.ingest_files(
+        files,
+        collection_name=job.collection_name,
+        progress_callback=progress,
+    )
+    succeeded = [item for item in summary if item["status"] == "ok"]
+    if not succeeded:
+        raise ValueError("; ".join(f"{item['source']}: {item.get('error')}" for item in summary))
+    return {
+        "files": summary,
+        "chunks": sum(item["chunks"] for item in succeeded),
+        "added": sum(item["added"] for item in succeeded),
+        "kept": sum(item["kept"] for item in succeeded),
+        "removed": sum(item["removed"] for item in succeeded),
+    }
+
+
+def run_job(job: IngestJob, rag_processor):
+    last_write = [0.0]
+
+    def progress(fraction: float, message: str):
+        now = time.monotonic()
+        if fraction < 1.0 and now - last_write[0] < 0.5:
+            return
+        last_write[0] = now
+        updated = _update_job(job.id, progress=fraction, message=message)
+        if updated is None or updated.cancel_requested:
+            raise JobCancelled()
+
+    stop_heartbeat = threading.Event()
+    heartbeat = threading.Thread(
+        target=_heartbeat_loop,
+        args=(job.id, stop_heartbeat, max(1.0, _lease_seconds() / 4)),
+        name=f"ingest-heartbeat-{job.id}",
+        daemon=True,
+    )
+    heartbeat.start()
+    try:
+        # Yarıda kalan ingest kendi eklediği parçaları geri alır; manifest tutarlı kalır
+        if _is_bulk_job(job):
+            result = _run_bulk(job, rag_processor, progress)
+        else:
+            with open(job.payload_path, "rb") as fh:
+                result = rag_processor.ingest_document(
+                    fh,
+                    job.filename,
+                    collection_name=job.collection_name,
+                    progress_callback=progress,
+                )
+    except JobCancelled:
+        logger.info("Ingest isi iptal edildi: %s", job.id)
+        _update_job(
+            job.id,
+            status="cancelled",
+            message="İptal edildi",
+            finished_at=now_utc(),
+        )
+        _remove_payload(job.payload_path)
+        return
+    except Exception as exc:
+        logger.exception("Ingest isi hatasi: %s", job.id)
+        retryable = not isinstance(exc, ValueError) and job.attempts < job.max_attempts
+        if retryable:
+            _update_job(
+                job.id,
+                status="queued",
+                error=str(exc),
+                message=f"Yeniden denenecek ({job.attempts}/{job.max_attempts})",
+            )
+        else:
+            _update_job(
+                job.id,
+                status="failed",
+                error=str(exc),
+                message="Başarısız",
+                finished_at=now_utc(),
+            )
+        return
+    finally:
+        stop_heartbeat.set()
+        heartbeat.join()
+
+    message = (
+        f"{result.get('added', result['chunks'])} yeni, "
+        f"{result.get('kept', 0)} değişmedi, "
+        f"{result.get('removed', 0)} silindi"
+    )
+    if "files" in result:
+        ok_count = sum(1 for item in result["files"] if item["status"] == "ok")
+        message = f"{ok_count}/{len(result['files'])} dosya; {message}"
+    _update_job(
+        job.id,
+        status="done",
+        progress=1.0,
+        message=message,
+        result=json.dumps(result, ensure_ascii=False),
+        finished_at=now_utc(),
+    )
+    _remove_payload(job.payload_path)
+
+
+def process_next_job(rag_processor) -> bool:
+    """Kuyruktan bir iş al ve işle; iş yoksa False döner"""
+    job = claim_next_job()
+    if job is None:
+        return False
+    run_job(job, rag_processor)
+    return True
+
+
+def _as_utc(value):
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+
+def recover_interrupted_jobs(lease_seconds: float | None = None) -> int:
+    """Heartbeat'i lease süresinden eski 'running' işleri yeniden kuyruğa al.
+
+    Başka bir süreçte hâlâ çalışan işler heartbeat yenilediği için dokunulmaz.
+    """
+    if lease_seconds is None:
+        lease_seconds = _lease_seconds()
+    cutoff = now_utc() - timedelta(seconds=lease_seconds)
+    with get_session() as session:
+        jobs = [
+            job
+            for job in session.exec(select(IngestJob).where(IngestJob.status == "running"))
+            if (_as_utc(job.heartbeat_at or job.started_at) or cutoff) <= cutoff
+        ]
+        for job in jobs:
+            job.status = "queued"
+            job.message = "Yeniden başlatılacak"
+            session.add(job)
+        session.commit()
+        return len(jobs)
+
+
+def _worker_loop(rag_processor):
+    poll_seconds = float(os.getenv("INGEST_POLL_SECONDS", "2"))
+    next_recovery = time.monotonic() + _lease_seconds()
+    while not _stop.is_set():
+        try:
+            processed = process_next_job(rag_processor)
+        except Exception:
+            logger.exception("Ingest iscisi hatasi")
+            processed = False
+        if not processed:
+            if time.monotonic() >= next_recovery:
+                # Çöken başka bir sürecin işleri lease dolunca devralınır
+                next_recovery = time.monotonic() + _lease_seconds()
+                try:
+                    recover_interrupted_jobs()
+                except Exception:
+                    logger.exception("Yarim kalan isler kurtarilamadi")
+            _wakeup.wait(poll_seconds)
+            _wakeup.clear()
+
+
+def start_workers(rag_processor, count: int | None = None):
+    """Süreç başına bir kez ingest işçi thread'lerini başlat"""
+    with _worker_lock:
+        if _workers:
+            return
+        if count is None:
+            count = int(os.getenv("INGEST_WORKERS", "2"))
+        recovered = recover_interrupted_jobs()
+        if recovered:
+            logger.info("Yarim kalan ingest isleri kuyruga alindi: %s", recovered)
+        _stop.clear()
+        for index in range(max(1, count)):
+            thread = threading.Thread(
+                target=_worker_loop,
+                args=(rag_processor,),
+                name=f"ingest-worker-{index + 1}",
+                daemon=True,
+            )
+            thread.start()
+            _workers.append(thread)
+        register_shutdown_hook(stop_workers)
+
+
+def stop_workers(timeout: float = 5.0):
+    with _worker_lock:
+        _stop.set()
+        _wakeup.set()
+        for thread in _workers:
+            thread.join(timeout)
+        _workers.clear()
@@ -0,0 +1,224 @@
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Katlanmış (ASCII) biçimde yaygın çoğul ve hal ekleri; en uzun olan önce denenir.
+_SUFFIXES = sorted(
+    [
+        "lerinden", "larindan", "lerinde", "larinda", "lerine", "larina",
+        "lerini", "larini", "lerin", "larin", "leri", "lari", "ler", "lar",
+        "inden", "indan", "nden", "ndan", "inde", "inda", "ine", "ina",
+        "nin", "nun", "den", "dan", "ten", "tan", "de", "da", "te", "ta",
+        "ye", "ya", "yi", "yu", "in", "un", "i", "u",
+    ],
+    key=len,
+    reverse=True,
+)
+_MIN_STEM = 4
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def fold(text: str) -> str:
+    """Türkçe karakterleri ASCII'ye katla ve küçük harfe çevir (İ/I/ı -> i)"""
+    text = (text or "").replace("İ", "i").replace("I", "i").replace("ı", "i").lower()
+    return "".join(
+        ch for ch in unicodedata.normalize("NFKD", text)
+        if not unicodedata.combining(ch)
+    )
+
+
+def stem(token: str) -> str:
+    for _ in range(2):
+        for suffix in _SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= _MIN_STEM:
+                token = token[: -len(suffix)]
+                break
+        else:
+            break
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    return [stem(token) for token in _TOKEN_RE.findall(fold(text)) if len(token) > 1]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60) -> List[str]:
+    """Sıralı kimlik listelerini RRF ile birleştir"""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
+
+
+class LexicalIndex:
+    """Koleksiyon başına BM25 ters indeksi (SQLite)"""
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS lex_doc (
+                collection_name TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                source TEXT,
+                length INTEGER NOT NULL,
+                PRIMARY KEY (collection_name, doc_id)
+            );
+            CREATE TABLE IF NOT EXISTS lex_posting (
+                collection_name TEXT NOT NULL,
+                term TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (collection_name, term, doc_id)
+            );
+            CREATE INDEX IF NOT EXISTS ix_lex_posting_doc
+                ON lex_posting (collection_name, doc_id);
+            CREATE TABLE IF NOT EXISTS lex_collection (
+                collection_name TEXT PRIMARY KEY,
+                built_at REAL NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def is_built(self, collection_name: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM lex_collection WHERE collection_name = ?", (collection_name,)
+            ).fetchone()
+        return row is not None
+
+    def mark_built(self, collection_name: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO lex_collection (collection_name, built_at) VALUES (?, ?)",
+                (collection_name, time.time()),
+            )
+            self._conn.commit()
+
+    def invalidate(self, collection_name: str):
+        """İndeks güncel tutulmadığında bir sonraki aramada yeniden kurulmasını sağla"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM lex_collection WHERE collection_name = ?", (collection_name,)
+            )
+            self._conn.commit()
+
+    def _delete_ids(self, collection_name: str, ids: List[str]):
+        for start in range(0, len(ids), 500):
+            part = ids[start:start + 500]
+            placeholders = ",".join("?" for _ in part)
+            for table in ("lex_posting", "lex_doc"):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE collection_name = ? AND doc_id IN ({placeholders})",
+                    [collection_name, *part],
+                )
+
+    def add(self, collection_name: str, ids: List[str], texts: List[str], sources: List[str]):
+        docs = []
+        postings = []
+        for doc_id, text, source in zip(ids, texts, sources):
+            terms = Counter(tokenize(text))
+            docs.append((collection_name, doc_id, source, sum(terms.values())))
+            postings.extend((collection_name, term, doc_id, tf) for term, tf in terms.items())
+        with self._lock:
+            self._delete_ids(collection_name, list(ids))
+            self._conn.executemany(
+                "INSERT INTO lex_doc (collection_name, doc_id, source, length) VALUES (?, ?, ?, ?)",
+                docs,
+            )
+            self._conn.executemany(
+                "INSERT INTO lex_posting (collection_name, term, doc_id, tf) VALUES (?, ?, ?, ?)",
+                postings,
+            )
+            self._conn.commit()
+
+    def remove(self, collection_name: str, ids: List[str]):
+        with self._lock:
+            self._delete_ids(collection_name, list(ids))
+            self._conn.commit()
+
+    def drop_collection(self, collection_name: str):
+        with self._lock:
+            for table in ("lex_posting", "lex_doc", "lex_collection"):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE collection_name = ?", (collection_name,)
+                )
+            self._conn.commit()
+
+    def rebuild(self, collection_name: str, ids: List[str], texts: List[str], sources: List[str]):
+        with self._lock:
+            for table in ("lex_posting", "lex_doc"):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE collection_name = ?", (collection_name,)
+                )
+            self._conn.commit()
+        self.add(collection_name, ids, texts, sources)
+        self.mark_built(collection_name)
+        logger.info("Sozcuk indeksi olusturuldu: %s (%s parca)", collection_name, len(ids))
+
+    def search(
+        self,
+        collection_name: str,
+        query: str,
+        k: int = 10,
+        source_filter: List[str] | None = None,
+    ) -> List[Tuple[str, float]]:
+        """BM25 puanına göre (doc_id, puan) listesi döndür"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        source_sql = ""
+        source_args: list = []
+        if source_filter:
+            source_sql = f" AND d.source IN ({','.join('?' for _ in source_filter)})"
+            source_args = list(source_filter)
+        term_sql = ",".join("?" for _ in terms)
+        with self._lock:
+            count, avg_length = self._conn.execute(
+                f"SELECT COUNT(*), AVG(d.length) FROM lex_doc d WHERE d.collection_name = ?{source_sql}",
+                [collection_name, *source_args],
+            ).fetchone()
+            if not count:
+                return []
+            rows = self._conn.execute(
+                f"SELECT p.term, p.doc_id, p.tf, d.length FROM lex_posting p "
+                f"JOIN lex_doc d ON d.collection_name = p.collection_name AND d.doc_id = p.doc_id "
+                f"WHERE p.collection_name = ? AND p.term IN ({term_sql}){source_sql}",
+                [collection_name, *terms, *source_args],
+            ).fetchall()
+        document_frequency = Counter(term for term, _, _, _ in rows)
+        avg_length = avg_length or 1.0
+        scores: Dict[str, float] = {}
+        for term, doc_id, tf, length in rows:
+            df = document_frequency[term]
+            idf = math.log(1.0 + (count - df + 0.5) / (df + 0.5))
+            norm = tf + self.k1 * (1.0 - self.b + self.b * length / avg_length)
+            scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1.0) / norm
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:k]
+
+    def vacuum(self):
+        """Silinen satırların boşalttığı sayfaları diske geri ver"""
+        with self._lock:
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -186,3 +186,42 @@ class Summary(SQLModel, table=True):
     def _reconcilation_set_created_at(self):
         if getattr(self, 'created_at', None) is not None and self.created_at.tzinfo is None:
             self.created_at = self.created_at.replace(tzinfo=timezone.utc)
+
+
+class IngestJob(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: Optional[int] = Field(default=None, foreign_key="user.id")
+    collection_name: str = Field(index=True)
+    filename: str
+    payload_path: str
+    status: str = Field(default="queued", index=True)  # queued|running|done|failed|cancelled
+    progress: float = Field(default=0.0)
+    message: Optional[str] = None
+    attempts: int = Field(default=0)
+    max_attempts: int = Field(default=3)
+    cancel_requested: bool = Field(default=False)
+    error: Optional[str] = None
+    result: Optional[str] = None  # JSON
+    created_at: datetime = Field(
+        default_factory=now_utc,
+        sa_column=Column(
+            SA_DateTime(timezone=True),
+            default=now_utc,
+        ),
+    )
+    started_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None  # çalışan işin son canlılık sinyali (lease)
+    finished_at: Optional[datetime] = None
+
+    @field_validator('created_at', mode='before')
+    def _ensure_created_at_tz(cls, v):
+        if v is None:
+            return now_utc()
+        if v.tzinfo is None:
+            return v.replace(tzinfo=timezone.utc)
+        return v
+
+    @reconstructor
+    def _reconcilation_set_created_at(self):
+        if getattr(self, 'created_at', None) is not None and self.created_at.tzinfo is None:
+            self.created_at = self.created_at.replace(tzinfo=timezone.utc)
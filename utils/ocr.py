@@ -0,0 +1,75 @@
+import time
+
+from collections import OrderedDict
+
+# Süreç havuzu işlemci başına bir kez açılır ve belgeler arasında paylaşılır. Görevler PDF'in
+# dosya yolunu taşır; her işçi son açtığı birkaç belgeyi açık tutar.
+_worker_state = {}
+_OPEN_DOCS_LIMIT = 4
+
+
+def _page_to_text(page, dpi: int, lang: str | None) -> str:
+    import pytesseract
+    from PIL import Image
+
+    pix = page.get_pixmap(dpi=dpi)
+    mode = "RGB" if pix.alpha == 0 else "RGBA"
+    image = Image.frombytes(mode, [pix.width, pix.height], pix.samples)
+    if mode == "RGBA":
+        image = image.convert("RGB")
+
+    if lang:
+        try:
+            return pytesseract.image_to_string(image, lang=lang)
+        except Exception:
+            return pytesseract.image_to_string(image)
+    return pytesseract.image_to_string(image)
+
+
+def init_worker(tesseract_cmd: str | None):
+    import pytesseract
+
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    _worker_state["docs"] = OrderedDict()
+
+
+def _open_doc(pdf_path: str):
+    import fitz
+
+    docs = _worker_state.setdefault("docs", OrderedDict())
+    doc = docs.get(pdf_path)
+    if doc is None:
+        doc = fitz.open(pdf_path)
+        docs[pdf_path] = doc
+        while len(docs) > _OPEN_DOCS_LIMIT:
+            _, old = docs.popitem(last=False)
+            old.close()
+    else:
+        docs.move_to_end(pdf_path)
+    return doc
+
+
+def ocr_page(pdf_path: str, page_index: int, dpi: int, lang: str | None) -> dict:
+    """İşçi sürecinde tek sayfayı render edip OCR uygula"""
+    started = time.perf_counter()
+    doc = _open_doc(pdf_path)
+    text = _page_to_text(doc[page_index], dpi, lang)
+    return {
+        "page": page_index + 1,
+        "text": text or "",
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def ocr_pages_serial(doc, page_indexes, dpi: int, lang: str | None) -> list:
+    results = []
+    for page_index in page_indexes:
+        started = time.perf_counter()
+        text = _page_to_text(doc[page_index], dpi, lang)
+        results.append({
+            "page": page_index + 1,
+            "text": text or "",
+            "seconds": time.perf_counter() - started,
+        })
+    return results
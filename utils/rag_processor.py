@@ -1,47 +1,364 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from io import BytesIO
+from itertools import islice
 import logging
+import multiprocessing
 import os
-from typing import List
+import tempfile
+import threading
+import time
+from typing import BinaryIO, Callable, Iterator, List, Tuple
 import uuid
-import hashlib
+import zipfile
 
-import chromadb
-from chromadb.utils import embedding_functions
 from chromadb.errors import NotFoundError
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import numpy as np
 from langchain_core.documents import Document
 from pypdf import PdfReader
 from docx import Document as DocxDocument
 
+from utils import ocr
+from utils.chunk_store import ChunkStore
+from utils.collection_gc import CollectionRegistry
+from utils.embedding_cache import EmbeddingCache, chunk_hash
+from utils.exact_search import ExactSearchIndex
+from utils.ingest_cache import IngestCache, file_digest
+from utils.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from utils.reranking import adaptive_cut, mmr_select
+from utils.query_cache import QueryEmbeddingCache, SearchResultCache
+from utils.source_manifest import SourceManifest
+from utils.rag_resources import (
+    DEFAULT_TOKEN_ENCODING,
+    get_chroma_client,
+    get_embedding_function,
+    get_text_splitter,
+    get_token_encoder,
+    register_shutdown_hook,
+)
+
 logger = logging.getLogger(__name__)
 
+SUPPORTED_EXTENSIONS = ("pdf", "docx", "txt")
+
+
+def open_upload(data) -> BinaryIO:
+    """Yükleme içeriğini dosya nesnesi olarak aç: bytes, disk yolu veya açıcı fonksiyon"""
+    if isinstance(data, (bytes, bytearray)):
+        return BytesIO(data)
+    if isinstance(data, (str, os.PathLike)):
+        return open(data, "rb")
+    return data()
+
+
+def _zip_member_opener(source, member: str) -> Callable[[], BinaryIO]:
+    def opener():
+        # Üye dosyası arşiv kapatıldıktan sonra da okunabilir; alttaki dosya üye kapanınca kapanır
+        with zipfile.ZipFile(BytesIO(source) if isinstance(source, (bytes, bytearray)) else source) as archive:
+            return archive.open(member)
+
+    return opener
+
+
+def expand_uploads(files: List[Tuple[str, object]], max_bytes: int | None = None) -> List[Tuple[str, object]]:
+    """ZIP arşivlerini açıp (dosya adı, içerik) listesi döndür; desteklenmeyen üyeleri atla.
+
+    İçerik bytes veya disk yolu olabilir. ZIP üyeleri belleğe okunmaz; yerlerine üyeyi
+    açan bir fonksiyon döner (bkz. open_upload).
+    """
+    if max_bytes is None:
+        max_bytes = int(os.getenv("RAG_ZIP_MAX_MB", "500")) * 1024 * 1024
+    expanded = []
+    for name, data in files:
+        if name.lower().split(".")[-1] != "zip":
+            expanded.append((name, data))
+            continue
+        total = 0
+        with zipfile.ZipFile(BytesIO(data) if isinstance(data, (bytes, bytearray)) else data) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or info.filename.startswith("__MACOSX/"):
+                    continue
+                if info.filename.lower().split(".")[-1] not in SUPPORTED_EXTENSIONS:
+                    continue
+                total += info.file_size
+                if total > max_bytes:
+                    raise ValueError(f"ZIP arşivi çok büyük: {name}")
+                expanded.append((info.filename, _zip_member_opener(data, info.filename)))
+    return expanded
+
+
+def unique_upload_names(files: List[Tuple[str, object]]) -> List[Tuple[str, object]]:
+    """Aynı adla gelen dosyaları "ad (2).uzantı" biçiminde yeniden adlandır"""
+    used = {name for name, _ in files}
+    seen = set()
+    renamed = []
+    for name, data in files:
+        if name in seen:
+            stem, dot, extension = name.rpartition(".")
+            if not dot:
+                stem, extension = name, ""
+            counter = 2
+            while True:
+                candidate = f"{stem} ({counter}){dot}{extension}"
+                if candidate not in used:
+                    break
+                counter += 1
+            logger.warning("Ayni adli dosya yeniden adlandirildi: %s -> %s", name, candidate)
+            used.add(candidate)
+            name = candidate
+        seen.add(name)
+        renamed.append((name, data))
+    return renamed
+
+
+# Kimlik yalnızca kaynak ve metin özetinden türetilir; bu alanlar değişirse parça yeniden
+# embed edilmez, yalnızca metadata'sı güncellenir
+_POSITION_FIELDS = ("chunk_id", "page")
+
+
+class _SourceSync:
+    """Bir kaynağın parçalarını koleksiyondaki mevcut haliyle fark alarak yazar.
+
+    Yeni parçalar eklenir, yeri değişen parçaların yalnızca metadata'sı güncellenir; kaybolan
+    parçalar finish() ile, yeni parçalar yazıldıktan sonra silinir.
+    """
+
+    def __init__(self, rag, collection_name: str, source: str, reingest: bool = True):
+        self.rag = rag
+        self.collection_name = collection_name
+        self.source = source
+        self.reingest = reingest
+        self.existing = rag._get_source_metadatas(collection_name, source) if reingest else {}
+        self.seen = set()
+        self.occurrences = {}
+        self.counts = {"added": 0, "kept": 0, "pages": 1}
+
+    def store(self, documents: List[Document], embeddings: list | None = None) -> list:
+        """Partiyi yaz; yeni eklenen parçaların embedding'lerini (diğerleri için None) döndür"""
+        ids = self.rag._document_ids(documents, self.occurrences)
+        self.seen.update(ids)
+        for doc in documents:
+            self.counts["pages"] = max(self.counts["pages"], int(doc.metadata.get("page") or 1))
+        fresh = [index for index, doc_id in enumerate(ids) if doc_id not in self.existing]
+        moved = [
+            index
+            for index, doc_id in enumerate(ids)
+            if doc_id in self.existing
+            and any(
+                (self.existing[doc_id] or {}).get(field) != documents[index].metadata.get(field)
+                for field in _POSITION_FIELDS
+            )
+        ]
+        self.counts["kept"] += len(documents) - len(fresh)
+        self.counts["added"] += len(fresh)
+        if moved:
+            self.rag._update_metadatas(
+                self.collection_name,
+                [ids[index] for index in moved],
+                [documents[index] for index in moved],
+            )
+        stored = [None] * len(documents)
+        if not fresh:
+            return stored
+        fresh_docs = [documents[index] for index in fresh]
+        fresh_embeddings = [
+            embeddings[index] if embeddings is not None else None for index in fresh
+        ]
+        missing = [offset for offset, vector in enumerate(fresh_embeddings) if vector is None]
+        if missing:
+            computed = self.rag._embed_texts([fresh_docs[offset].page_content for offset in missing])
+            for offset, vector in zip(missing, computed):
+                fresh_embeddings[offset] = vector
+        self.rag.add_documents_to_vectorstore(
+            fresh_docs,
+            collection_name=self.collection_name,
+            embeddings=fresh_embeddings,
+            update_manifest=False,
+            ids=[ids[index] for index in fresh],
+        )
+        for index, vector in zip(fresh, fresh_embeddings):
+            stored[index] = vector
+        return stored
+
+    def finish(self) -> int:
+        """Bu çalıştırmada görülmeyen eski parçaları sil; silinen sayıyı döndür"""
+        removed = sorted(set(self.existing) - self.seen)
+        if removed:
+            collection = self.rag.get_collection(self.collection_name)
+            collection.delete(ids=removed, where={"source": self.source})
+            self.rag._index_removed(self.collection_name, removed)
+            self.rag._collection_changed(self.collection_name)
+        return len(removed)
+
+    def abort(self):
+        """Yarıda kalan çalıştırmanın eklediği parçaları geri al; kaynağın önceki hali kalır.
+
+        Mevcut parçalar bilinmiyorsa (reingest kapalı) manifest satırı koleksiyondan yeniden sayılır.
+        """
+        try:
+            collection = self.rag.get_collection(self.collection_name)
+            if collection is None:
+                return
+            if not self.reingest:
+                self.rag._refresh_manifest_sources(collection, self.collection_name, {self.source})
+                return
+            added = sorted(self.seen - set(self.existing))
+            if added:
+                collection.delete(ids=added, where={"source": self.source})
+                self.rag._index_removed(self.collection_name, added)
+                self.rag._collection_changed(self.collection_name)
+            logger.info("Yarim kalan ingest geri alindi: %s (%s parca)", self.source, len(added))
+        except Exception:
+            logger.exception("Yarim kalan ingest geri alinamadi: %s", self.source)
+
+
 class RAGProcessor:
     """RAG işleme sınıfı - yerel ChromaDB vektör veritabanı"""
 
     def __init__(self, persist_directory: str = "./chroma_db"):
         self.persist_directory = persist_directory
 
-        self.embedding_function = embedding_functions.DefaultEmbeddingFunction()
-        self.chroma_client = chromadb.PersistentClient(path=persist_directory)
-
-        chunk_size = int(os.getenv("RAG_CHUNK_SIZE", "1000"))
-        chunk_overlap = int(os.getenv("RAG_CHUNK_OVERLAP", "200"))
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            separators=[
-                "\n\n",
-                "\n",
-                " ",
-                "",
-            ],
+        self.embedding_function = get_embedding_function()
+        self.chroma_client = get_chroma_client(persist_directory)
+
+        self.chunk_size = int(os.getenv("RAG_CHUNK_SIZE", "1000"))
+        self.chunk_overlap = int(os.getenv("RAG_CHUNK_OVERLAP", "200"))
+        self.token_encoding = os.getenv("RAG_TOKEN_ENCODING", DEFAULT_TOKEN_ENCODING)
+        self.token_encoder = get_token_encoder(self.token_encoding)
+        self.chunk_unit = os.getenv("RAG_CHUNK_UNIT", "chars").lower()
+        if self.chunk_unit == "tokens" and self.token_encoder is None:
+            logger.warning("Token kodlayici yok, karakter bazli bolmeye donuluyor")
+            self.chunk_unit = "chars"
+        self.text_splitter = get_text_splitter(
+            self.chunk_size,
+            self.chunk_overlap,
+            unit=self.chunk_unit,
+            encoding_name=self.token_encoding,
+        )
+
+        self.cache_directory = os.getenv("RAG_CACHE_DIR") or os.path.join(
+            persist_directory, "cache"
+        )
+        self.ingest_cache = IngestCache(
+            os.path.join(self.cache_directory, "ingest_cache.sqlite3")
+        )
+        self.shared_chunks = os.getenv("RAG_SHARED_CHUNKS", "0") == "1"
+        self.chunk_store = ChunkStore(os.path.join(self.cache_directory, "chunk_store.sqlite3"))
+        self.embedding_cache = EmbeddingCache(
+            self.cache_directory,
+            self._embedding_model_id(),
+        )
+        self.source_manifest = SourceManifest(
+            os.path.join(persist_directory, "source_manifest.sqlite3")
+        )
+        self.query_cache = QueryEmbeddingCache()
+        self.result_cache = SearchResultCache()
+        self.hybrid_search = os.getenv("RAG_HYBRID_SEARCH", "0") == "1"
+        self.mmr_search = os.getenv("RAG_MMR", "0") == "1"
+        self.mmr_lambda = float(os.getenv("RAG_MMR_LAMBDA", "0.7"))
+        self.mmr_duplicate_threshold = float(os.getenv("RAG_MMR_DUP_THRESHOLD", "0.95"))
+        self.adaptive_k = os.getenv("RAG_ADAPTIVE_K", "0") == "1"
+        max_distance = os.getenv("RAG_MAX_DISTANCE")
+        self.max_distance = float(max_distance) if max_distance else None
+        self.min_distance_gap = float(os.getenv("RAG_MIN_GAP", "0.1"))
+        self.adaptive_min_k = int(os.getenv("RAG_ADAPTIVE_MIN_K", "2"))
+        self.lexical_index = LexicalIndex(
+            os.path.join(persist_directory, "lexical_index.sqlite3")
+        )
+        self.exact_search_max = int(os.getenv("RAG_EXACT_SEARCH_MAX", "2000"))
+        self.exact_index = ExactSearchIndex(
+            os.path.join(persist_directory, "exact_index"),
+            max_loaded=int(os.getenv("RAG_EXACT_CACHE_SIZE", "64")),
+        )
+        # Koleksiyon tutamaçları ilk kullanımda açılır ve ada göre önbelleklenir
+        self._collections: OrderedDict = OrderedDict()
+        self._collections_lock = threading.Lock()
+        self.collection_cache_size = int(os.getenv("RAG_COLLECTION_CACHE_SIZE", "256"))
+        self.collection_registry = CollectionRegistry(
+            os.path.join(persist_directory, "collection_registry.sqlite3")
+        )
+        # OCR süreç havuzu ilk taranmış sayfada açılır; tüm belgeler ve dosya thread'leri paylaşır
+        self._ocr_executor = None
+        self._ocr_executor_lock = threading.Lock()
+
+    def _embedding_model_id(self) -> str:
+        try:
+            return str(self.embedding_function.name())
+        except Exception:
+            return type(self.embedding_function).__name__
+
+    def _ingest_settings(self) -> str:
+        unit = self.chunk_unit if self.chunk_unit == "chars" else f"tokens:{self.token_encoding}"
+        counted = self.token_encoding if self.token_encoder is not None else "-"
+        return f"{self._embedding_model_id()}|{self.chunk_size}|{self.chunk_overlap}|{unit}|{counted}"
+
+    def _embed_texts(self, texts: List[str]) -> list:
+        """Metinleri embedding'e çevir; önbellekte olan parçalar modele gönderilmez"""
+        if not texts:
+            return []
+        hashes = [chunk_hash(text) for text in texts]
+        vectors = self.embedding_cache.get_many(hashes)
+        missing = {}
+        for hash_value, text in zip(hashes, texts):
+            if hash_value not in vectors:
+                missing.setdefault(hash_value, text)
+        if missing:
+            computed = self.embedding_function(list(missing.values()))
+            self.embedding_cache.put_many(list(missing.keys()), computed)
+            vectors.update(
+                (hash_value, np.asarray(vector, dtype=np.float32))
+                for hash_value, vector in zip(missing.keys(), computed)
+            )
+        logger.debug(
+            "Embedding: toplam=%s onbellek=%s model=%s",
+            len(texts),
+            len(texts) - len(missing),
+            len(missing),
         )
+        return [vectors[hash_value] for hash_value in hashes]
+
+    def embed_query(self, query: str) -> np.ndarray:
+        """Sorgu embedding'ini LRU önbellekten al; yoksa hesapla ve ekle"""
+        return self.embed_queries([query])[0]
 
+    def embed_queries(self, queries: List[str]) -> List[np.ndarray]:
+        """Önbellekte olmayan sorguları modele tek partide gönder"""
+        model_id = self._embedding_model_id()
+        keys = [f"{model_id}|{QueryEmbeddingCache.normalize(query)}" for query in queries]
+        vectors = {}
+        missing = {}
+        for key, query in zip(keys, queries):
+            if key in vectors or key in missing:
+                continue
+            vector = self.query_cache.get(key)
+            if vector is None:
+                missing[key] = query
+            else:
+                vectors[key] = vector
+        if missing:
+            computed = self.embedding_function(list(missing.values()))
+            for key, vector in zip(missing.keys(), computed):
+                vectors[key] = np.asarray(vector, dtype=np.float32)
+                self.query_cache.put(key, vectors[key])
+        return [vectors[key] for key in keys]
+
+    def cache_stats(self) -> dict:
+        """Ingest, parça embedding ve sorgu önbelleklerinin isabet istatistikleri"""
+        return {
+            "ingest": self.ingest_cache.stats(),
+            "embedding": self.embedding_cache.stats(),
+            "query": self.query_cache.stats(),
+            "result": self.result_cache.stats(),
+            "chunks": self.chunk_store.stats(),
+        }
 
     def get_dynamic_k(self, query: str, sources_count: int = 0) -> int:
-        min_k = int(os.getenv("RAG_MIN_K", "4"))
+        min_k = int(os.getenv("RAG_MIN_K", "3" if self.mmr_search else "4"))
         max_k = int(os.getenv("RAG_MAX_K", "8"))
+        if self.adaptive_k:
+            # Uyarlanır modda k üst sınırdır; asıl kesimi search_documents mesafeye göre yapar
+            return max_k
         words = len((query or "").split())
         if words >= 20:
             base_k = 8
@@ -51,6 +368,9 @@ class RAGProcessor:
             base_k = 4
         if sources_count > 0:
             base_k = base_k + min(4, sources_count // 3)
+        if self.mmr_search:
+            # MMR yakın kopyaları elediği için aynı kapsama daha az parçayla ulaşılır
+            base_k = max(1, base_k * 3 // 4)
         return max(min_k, min(max_k, base_k))
 
     def _resolve_tesseract_cmd(self, pytesseract):
@@ -68,7 +388,70 @@ class RAGProcessor:
                 pytesseract.pytesseract.tesseract_cmd = path
                 return
 
-    def _extract_text_from_pdf_ocr(self, pdf_bytes: bytes) -> str:
+    def _get_ocr_workers(self, page_count: int) -> int:
+        configured = os.getenv("OCR_WORKERS")
+        workers = int(configured) if configured else (os.cpu_count() or 1)
+        return max(1, min(workers, page_count))
+
+    def _get_ocr_executor(self, tesseract_cmd: str | None):
+        """İşlemci başına tek OCR süreç havuzu; boyutu OCR_WORKERS ile sınırlıdır"""
+        with self._ocr_executor_lock:
+            if self._ocr_executor is None:
+                self._ocr_executor = ProcessPoolExecutor(
+                    max_workers=self._get_ocr_workers(os.cpu_count() or 1),
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=ocr.init_worker,
+                    initargs=(tesseract_cmd,),
+                )
+                register_shutdown_hook(self.close_ocr_executor)
+            return self._ocr_executor
+
+    def close_ocr_executor(self):
+        with self._ocr_executor_lock:
+            executor, self._ocr_executor = self._ocr_executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _discard_ocr_executor(self, executor):
+        with self._ocr_executor_lock:
+            if self._ocr_executor is executor:
+                self._ocr_executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    @contextmanager
+    def _pdf_path(self, file) -> Iterator[str]:
+        """PDF'in diskteki yolunu ver; yüklemeler parça parça geçici dosyaya akıtılır.
+
+        Diskte zaten bir dosya olan girdiler (iş kuyruğundaki yüklemeler) kopyalanmaz.
+        pypdf, PyMuPDF ve OCR işçileri aynı dosyadan okur; PDF belleğe tek parça alınmaz.
+        """
+        try:
+            file.fileno()
+            name = getattr(file, "name", None)
+            if isinstance(name, str) and os.path.isfile(name):
+                yield name
+                return
+        except (AttributeError, OSError, ValueError):
+            pass
+        directory = os.path.join(self.cache_directory, "pdf_tmp")
+        os.makedirs(directory, exist_ok=True)
+        handle, path = tempfile.mkstemp(suffix=".pdf", dir=directory)
+        try:
+            with os.fdopen(handle, "wb") as target:
+                while True:
+                    block = file.read(1024 * 1024)
+                    if not block:
+                        break
+                    target.write(block)
+            yield path
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _ocr_pdf_pages(self, pdf_path: str, page_indexes: List[int] | None = None) -> List[dict]:
+        """Sayfaları OCR ile oku; sayfa sırası korunur, her sayfa için süre döner"""
         try:
             import fitz
         except ImportError as exc:
@@ -80,7 +463,7 @@ class RAGProcessor:
             raise Exception("OCR için pytesseract kurulu değil.") from exc
 
         try:
-            from PIL import Image
+            from PIL import Image  # noqa: F401
         except ImportError as exc:
             raise Exception("OCR için Pillow kurulu değil.") from exc
 
@@ -95,53 +478,124 @@ class RAGProcessor:
 
         ocr_dpi = int(os.getenv("OCR_DPI", "150"))
         lang = os.getenv("TESSERACT_LANG")
-        texts = []
+        started = time.perf_counter()
 
-        with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
-            for page in doc:
-                pix = page.get_pixmap(dpi=ocr_dpi)
-                mode = "RGB" if pix.alpha == 0 else "RGBA"
-                image = Image.frombytes(mode, [pix.width, pix.height], pix.samples)
-                if mode == "RGBA":
-                    image = image.convert("RGB")
-
-                if lang:
-                    try:
-                        page_text = pytesseract.image_to_string(image, lang=lang)
-                    except Exception:
-                        page_text = pytesseract.image_to_string(image)
-                else:
-                    page_text = pytesseract.image_to_string(image)
+        with fitz.open(pdf_path) as doc:
+            if page_indexes is None:
+                page_indexes = list(range(doc.page_count))
+            workers = self._get_ocr_workers(len(page_indexes))
+            if self._get_ocr_workers(os.cpu_count() or 1) <= 1:
+                results = ocr.ocr_pages_serial(doc, page_indexes, ocr_dpi, lang)
+            else:
+                results = None
 
-                if page_text:
-                    texts.append(page_text)
+        if results is None:
+            executor = self._get_ocr_executor(pytesseract.pytesseract.tesseract_cmd)
+            try:
+                futures = [
+                    executor.submit(ocr.ocr_page, pdf_path, index, ocr_dpi, lang)
+                    for index in page_indexes
+                ]
+                results = [future.result() for future in futures]
+            except Exception:
+                logger.exception("Paralel OCR hatasi, seri moda geciliyor")
+                self._discard_ocr_executor(executor)
+                workers = 1
+                with fitz.open(pdf_path) as doc:
+                    results = ocr.ocr_pages_serial(doc, page_indexes, ocr_dpi, lang)
 
-        return "\n".join(texts)
+        for item in results:
+            logger.debug("OCR sayfa %s: %.2f sn", item["page"], item["seconds"])
+        logger.info(
+            "OCR tamamlandi: sayfa=%s isci=%s sure=%.2f sn",
+            len(results),
+            workers,
+            time.perf_counter() - started,
+        )
+        return results
 
-    def extract_text_from_pdf(self, pdf_file) -> str:
-        """PDF dosyasından metin çıkar. Metin yoksa OCR dener."""
+    def iter_pdf_pages(self, pdf_path: str) -> Iterator[dict]:
+        """PDF sayfalarını pencere pencere üret; yalnızca metin katmanı olmayan sayfalara OCR uygula"""
         try:
-            pdf_bytes = pdf_file.read()
-            if not pdf_bytes:
-                return ""
+            min_chars = int(os.getenv("OCR_MIN_PAGE_CHARS", "20"))
+            window_size = max(1, int(os.getenv("RAG_PAGE_WINDOW", "32")))
+            with open(pdf_path, "rb") as pdf_stream:
+                try:
+                    pdf_reader = PdfReader(pdf_stream)
+                    page_count = len(pdf_reader.pages)
+                except Exception:
+                    logger.exception("PDF metin cikarma hatasi")
+                    ocr_pages = self._ocr_pdf_pages(pdf_path)
+                    for item in ocr_pages:
+                        item["method"] = "ocr" if item["text"].strip() else "empty"
+                        item["page_count"] = len(ocr_pages)
+                        yield item
+                    return
 
-            text_parts = []
-            try:
-                pdf_reader = PdfReader(BytesIO(pdf_bytes))
-                for page in pdf_reader.pages:
-                    text_parts.append(page.extract_text() or "")
-            except Exception:
-                logger.exception("PDF metin cikarma hatasi")
-                text_parts = []
+                had_text = False
+                ocr_error = None
+                ocr_count = 0
+                for start in range(0, page_count, window_size):
+                    window = []
+                    for index in range(start, min(start + window_size, page_count)):
+                        started = time.perf_counter()
+                        try:
+                            page_text = pdf_reader.pages[index].extract_text() or ""
+                        except Exception:
+                            logger.exception("PDF sayfa metni okunamadi: %s", index + 1)
+                            page_text = ""
+                        window.append({
+                            "page": index + 1,
+                            "page_count": page_count,
+                            "text": page_text,
+                            "method": "text",
+                            "seconds": time.perf_counter() - started,
+                        })
 
-            text = "\n".join(text_parts).strip()
-            if len(text) >= 50:
-                return text
+                    image_only = [
+                        item["page"] - 1 for item in window
+                        if len(item["text"].strip()) < min_chars
+                    ]
+                    if image_only and ocr_error is None:
+                        try:
+                            ocr_pages = self._ocr_pdf_pages(pdf_path, image_only)
+                        except Exception as exc:
+                            logger.exception("OCR yapilamadi, metin katmani kullaniliyor")
+                            ocr_error = exc
+                            ocr_pages = []
+                        for item in ocr_pages:
+                            target = window[item["page"] - 1 - start]
+                            if item["text"].strip():
+                                target["text"] = item["text"]
+                                target["method"] = "ocr"
+                                ocr_count += 1
+                            target["seconds"] += item["seconds"]
 
-            return self._extract_text_from_pdf_ocr(pdf_bytes)
+                    for item in window:
+                        if item["text"].strip():
+                            had_text = True
+                        else:
+                            item["method"] = "empty"
+                        yield item
+
+            if ocr_error is not None and not had_text:
+                raise ocr_error
+            logger.info("PDF sayfalari: toplam=%s ocr=%s", page_count, ocr_count)
         except Exception as exc:
             raise Exception(f"PDF okuma hatası: {str(exc)}") from exc
 
+    def extract_pdf_pages(self, pdf_file) -> List[dict]:
+        """PDF'i sayfa sayfa oku; yalnızca metin katmanı olmayan sayfalara OCR uygula"""
+        with self._pdf_path(pdf_file) as pdf_path:
+            if not os.path.getsize(pdf_path):
+                return []
+            return list(self.iter_pdf_pages(pdf_path))
+
+    def extract_text_from_pdf(self, pdf_file) -> str:
+        """PDF dosyasından metin çıkar. Metin katmanı olmayan sayfalarda OCR dener."""
+        pages = self.extract_pdf_pages(pdf_file)
+        return "\n".join(item["text"] for item in pages if item["text"]).strip()
+
     def extract_text_from_docx(self, docx_file) -> str:
         """DOCX dosyasından metin çıkar"""
         try:
@@ -161,68 +615,548 @@ class RAGProcessor:
         except Exception as exc:
             raise Exception(f"TXT okuma hatası: {str(exc)}") from exc
 
-    def process_document(self, file, filename: str) -> List[Document]:
-        """Dosyayı işle ve parçalara ayır"""
+    def iter_pages(self, file, filename: str) -> Iterator[dict]:
+        """Dosyayı sayfa sayfa üret (DOCX/TXT tek sayfa sayılır)"""
         file_extension = filename.lower().split(".")[-1]
 
         if file_extension == "pdf":
-            text = self.extract_text_from_pdf(file)
+            with self._pdf_path(file) as pdf_path:
+                if os.path.getsize(pdf_path):
+                    yield from self.iter_pdf_pages(pdf_path)
         elif file_extension == "docx":
-            text = self.extract_text_from_docx(file)
+            yield {"page_count": 1, "text": self.extract_text_from_docx(file)}
         elif file_extension == "txt":
-            text = self.extract_text_from_txt(file)
+            yield {"page_count": 1, "text": self.extract_text_from_txt(file)}
         else:
             raise ValueError(f"Desteklenmeyen dosya türü: {file_extension}")
 
-        chunks = self.text_splitter.split_text(text)
+    def _page_documents(self, page: dict, filename: str, first_chunk_id: int) -> List[Document]:
+        metadata = {"source": filename}
+        if "page" in page:
+            metadata["page"] = page["page"]
+            metadata["extraction_method"] = page["method"]
+            metadata["extraction_seconds"] = round(page["seconds"], 4)
+        documents = []
+        for offset, chunk in enumerate(self.text_splitter.split_text(page["text"])):
+            chunk_metadata = {**metadata, "chunk_id": first_chunk_id + offset}
+            if self.token_encoder is not None:
+                chunk_metadata["token_count"] = len(
+                    self.token_encoder.encode(chunk, disallowed_special=())
+                )
+            documents.append(Document(page_content=chunk, metadata=chunk_metadata))
+        return documents
+
+    def iter_documents(self, file, filename: str) -> Iterator[Document]:
+        """Sayfaları geldikçe parçalara ayır"""
+        chunk_id = 0
+        for page in self.iter_pages(file, filename):
+            documents = self._page_documents(page, filename, chunk_id)
+            chunk_id += len(documents)
+            yield from documents
+
+    def process_document(self, file, filename: str) -> List[Document]:
+        """Dosyayı işle ve parçalara ayır"""
+        return list(self.iter_documents(file, filename))
+
+    def _document_ids(self, documents: List[Document], occurrences: dict | None = None) -> List[str]:
+        """Kaynak ve metin özetinden kimlik üret; aynı kaynakta tekrar eden metne sıra eki ver.
+
+        Kimlik parçanın dosyadaki konumuna bağlı değildir; başa paragraf eklemek diğer parçaların
+        kimliğini değiştirmez. occurrences partiler arasında paylaşılırsa sayaç kaynak boyunca sürer.
+        """
+        occurrences = {} if occurrences is None else occurrences
+        ids = []
+        for doc in documents:
+            key = (doc.metadata.get("source", "unknown"), chunk_hash(doc.page_content)[:16])
+            seen = occurrences.get(key, 0)
+            occurrences[key] = seen + 1
+            ids.append(f"{key[0]}_{key[1]}" + (f"_{seen}" if seen else ""))
+        return ids
 
-        documents = [
-            Document(
-                page_content=chunk,
-                metadata={"source": filename, "chunk_id": i},
+    def _get_source_ids(self, collection_name: str, source: str) -> set:
+        return set(self._get_source_metadatas(collection_name, source))
+
+    def _get_source_metadatas(self, collection_name: str, source: str) -> dict:
+        collection = self.get_collection(collection_name)
+        if collection is None:
+            return {}
+        data = collection.get(where={"source": source}, include=["metadatas"])
+        return dict(zip(data.get("ids") or [], data.get("metadatas") or []))
+
+    def _stored_metadatas(self, documents: List[Document]) -> list:
+        """Chroma'ya yazılacak metadata; paylaşılan depo açıksa metin özeti referansı eklenir"""
+        if not self.shared_chunks:
+            return [doc.metadata for doc in documents]
+        return [{**doc.metadata, "chunk_hash": chunk_hash(doc.page_content)} for doc in documents]
+
+    def _update_metadatas(self, collection_name: str, ids: List[str], documents: List[Document]):
+        """Değişmeyen parçaların konum bilgisini embedding'e dokunmadan güncelle"""
+        metadatas = self._stored_metadatas(documents)
+        self._write_collection(
+            collection_name,
+            lambda collection: collection.update(ids=ids, metadatas=metadatas),
+        )
+        self._collection_changed(collection_name)
+
+    def _write_collection(self, collection_name: str, write: Callable):
+        """Yazmayı önbellekteki tutamaçla dene; koleksiyon başka bir süreçte silinmişse
+        tutamacı atıp yeni tutamaçla bir kez tekrarla"""
+        collection = self.get_or_create_collection(collection_name)
+        try:
+            write(collection)
+        except NotFoundError:
+            logger.info("Eski koleksiyon tutamaci yenileniyor: %s", collection_name)
+            self.forget_collection(collection_name)
+            collection = self.get_or_create_collection(collection_name)
+            write(collection)
+        return collection
+
+    def ingest_document(
+        self,
+        file,
+        filename: str,
+        collection_name: str = "ders_notlari",
+        progress_callback: Callable[[float, str], None] | None = None,
+        reingest: bool = True,
+    ) -> dict:
+        """Dosyayı akış halinde işle ve koleksiyona parti parti ekle.
+
+        Sayfa -> parça -> embedding mikro-partisi -> upsert zinciri sayesinde bellek
+        kullanımı belge uzunluğundan bağımsız kalır ve eklenen parçalar hemen aranabilir.
+        Aynı içerik daha önce işlendiyse önbellekteki parçalar ve embedding'ler kullanılır.
+        reingest açıkken aynı kaynağın mevcut parçalarıyla fark alınır: değişmeyen parçalara
+        dokunulmaz, yalnızca yeni parçalar eklenir, kaybolanlar tek seferde silinir.
+        """
+        batch_size = max(1, int(os.getenv("RAG_EMBED_BATCH_SIZE", "64")))
+        key = IngestCache.make_key(file_digest(file), self._ingest_settings())
+        file.seek(0, os.SEEK_END)
+        size_bytes = file.tell()
+        file.seek(0)
+        sync = _SourceSync(self, collection_name, filename, reingest)
+        store = sync.store
+
+        def report(fraction: float, message: str):
+            if progress_callback is not None:
+                progress_callback(min(1.0, fraction), message)
+
+        def finish(chunks: int, cached: bool) -> dict:
+            removed = sync.finish()
+            self._record_source(collection_name, filename, chunks, size_bytes, sync.counts["pages"])
+            result = {
+                "source": filename,
+                "chunks": chunks,
+                "cached": cached,
+                "added": sync.counts["added"],
+                "kept": sync.counts["kept"],
+                "removed": removed,
+            }
+            logger.info("Ingest tamamlandi: %s", result)
+            return result
+
+        with self.ingest_cache.snapshot(key) as cached:
+            if cached is not None:
+                logger.info("Ingest onbellek isabeti: %s", filename)
+                done = 0
+                try:
+                    for documents, embeddings in cached.iter_batches(batch_size):
+                        for doc in documents:
+                            doc.metadata["source"] = filename
+                        store(documents, embeddings)
+                        done += len(documents)
+                        report(done / max(1, cached.count), f"{done}/{cached.count} parça")
+                except Exception:
+                    sync.abort()
+                    raise
+                return finish(done, True)
+
+        writer = self.ingest_cache.writer(key)
+        batch: List[Document] = []
+        chunk_count = 0
+
+        def flush():
+            writer.add_chunks(batch, store(batch))
+            batch.clear()
+
+        try:
+            for page_number, page in enumerate(self.iter_pages(file, filename), start=1):
+                writer.add_page_text(page["text"])
+                documents = self._page_documents(page, filename, chunk_count)
+                chunk_count += len(documents)
+                for doc in documents:
+                    batch.append(doc)
+                    if len(batch) >= batch_size:
+                        flush()
+                page_count = page.get("page_count") or page_number
+                report(page_number / page_count, f"{page_number}/{page_count} sayfa")
+            if batch:
+                flush()
+        except Exception:
+            writer.abort()
+            sync.abort()
+            raise
+
+        writer.commit()
+        report(1.0, f"{chunk_count} parça")
+        return finish(chunk_count, False)
+
+    def ingest_files(
+        self,
+        files: List[Tuple[str, object]],
+        collection_name: str = "ders_notlari",
+        progress_callback: Callable[[float, str], None] | None = None,
+        max_workers: int | None = None,
+    ) -> List[dict]:
+        """Birden çok dosyayı paralel çıkar, ortak partilerde embed et ve dosya dosya upsert et.
+
+        İçerik bytes, disk yolu veya açıcı fonksiyon olabilir (bkz. open_upload); her dosya
+        yalnızca çıkarılırken okunur. Hazır dosyaların yeni parçaları RAG_EMBED_BATCH_SIZE'lık
+        ortak partilerde embed edilir, ardından her dosya kendi parçaları yazılınca eski
+        parçalarından arındırılır. Bellekte en fazla bir partilik bekleyen parça (ve son eklenen
+        dosya) ile işçi sayısı kadar çıkarılmakta olan dosya bulunur. Aynı adlı dosyalar yeniden adlandırılır.
+        Her dosya için eklenen/değişmeyen/silinen parça sayılarını ve hata durumunu döndürür.
+        """
+        batch_size = max(1, int(os.getenv("RAG_EMBED_BATCH_SIZE", "64")))
+        if max_workers is None:
+            max_workers = int(os.getenv("RAG_BULK_WORKERS", str(min(4, os.cpu_count() or 1))))
+        files = unique_upload_names(files)
+        summaries = {
+            name: {
+                "source": name,
+                "status": "ok",
+                "chunks": 0,
+                "cached": False,
+                "added": 0,
+                "kept": 0,
+                "removed": 0,
+            }
+            for name, _ in files
+        }
+
+        def extract(name: str, data) -> dict:
+            with open_upload(data) as file:
+                key = IngestCache.make_key(file_digest(file), self._ingest_settings())
+                file.seek(0, os.SEEK_END)
+                size_bytes = file.tell()
+                file.seek(0)
+                cached = self.ingest_cache.get(key)
+                if cached is not None:
+                    return {
+                        "key": key,
+                        "text": cached["text"],
+                        "documents": [
+                            Document(
+                                page_content=doc.page_content,
+                                metadata={**doc.metadata, "source": name},
+                            )
+                            for doc in cached["documents"]
+                        ],
+                        "embeddings": cached["embeddings"],
+                        "cached": True,
+                        "size_bytes": size_bytes,
+                    }
+                texts = []
+                documents: List[Document] = []
+                for page in self.iter_pages(file, name):
+                    texts.append(page["text"])
+                    documents.extend(self._page_documents(page, name, len(documents)))
+            return {
+                "key": key,
+                "text": "\n".join(text for text in texts if text),
+                "documents": documents,
+                "embeddings": [None] * len(documents),
+                "cached": False,
+                "size_bytes": size_bytes,
+            }
+
+        def prepare(name: str, entry: dict) -> dict:
+            """Koleksiyonda olmayan ve vektörü bilinmeyen parçaları ortak partiye işaretle"""
+            entry["sync"] = _SourceSync(self, collection_name, name)
+            ids = self._document_ids(entry["documents"])
+            entry["missing"] = [
+                index
+                for index, doc_id in enumerate(ids)
+                if doc_id not in entry["sync"].existing and entry["embeddings"][index] is None
+            ]
+            return entry
+
+        def store(name: str, entry: dict):
+            documents = entry["documents"]
+            embeddings = entry["embeddings"]
+            sync = entry["sync"]
+            try:
+                for start in range(0, len(documents), batch_size):
+                    stored = sync.store(
+                        documents[start:start + batch_size],
+                        embeddings[start:start + batch_size],
+                    )
+                    for offset, vector in enumerate(stored):
+                        if vector is not None:
+                            embeddings[start + offset] = vector
+            except Exception:
+                sync.abort()
+                raise
+            removed = sync.finish()
+            self._record_source(
+                collection_name,
+                name,
+                len(documents),
+                entry["size_bytes"],
+                sync.counts["pages"],
+            )
+            if not entry["cached"]:
+                self.ingest_cache.put(entry["key"], entry["text"], documents, embeddings)
+            summaries[name].update(
+                chunks=len(documents),
+                cached=entry["cached"],
+                added=sync.counts["added"],
+                kept=sync.counts["kept"],
+                removed=removed,
             )
-            for i, chunk in enumerate(chunks)
-        ]
 
-        return documents
+        def fail(name: str, exc: Exception):
+            logger.error("Toplu ingest dosya hatasi: %s: %s", name, exc)
+            summaries[name]["status"] = "error"
+            summaries[name]["error"] = str(exc)
+
+        ready: List[Tuple[str, dict]] = []
+        done = 0
+
+        def flush_ready():
+            """Bekleyen dosyaların eksik vektörlerini ortak partilerde hesapla, dosyaları yaz"""
+            nonlocal done
+            slots = [(entry, index) for _, entry in ready for index in entry["missing"]]
+            try:
+                for start in range(0, len(slots), batch_size):
+                    part = slots[start:start + batch_size]
+                    computed = self._embed_texts(
+                        [entry["documents"][index].page_content for entry, index in part]
+                    )
+                    for (entry, index), vector in zip(part, computed):
+                        entry["embeddings"][index] = vector
+            except Exception as exc:
+                logger.exception("Toplu ingest embedding partisi hatasi")
+                for name, _ in ready:
+                    fail(name, exc)
+            else:
+                for name, entry in ready:
+                    try:
+                        store(name, entry)
+                    except Exception as exc:
+                        logger.exception("Toplu ingest dosya hatasi: %s", name)
+                        fail(name, exc)
+            finished = len(ready)
+            ready.clear()
+            for _ in range(finished):
+                done += 1
+                if progress_callback is not None:
+                    progress_callback(done / len(files), f"{done}/{len(files)} dosya")
+
+        max_workers = max(1, max_workers)
+        queued = iter(files)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Çıkarılmakta olan dosya sayısı işçi sayısıyla sınırlı kalır
+            futures = {
+                executor.submit(extract, name, data): name
+                for name, data in islice(queued, max_workers)
+            }
+            while futures:
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = futures.pop(future)
+                    try:
+                        ready.append((name, prepare(name, future.result())))
+                    except Exception as exc:
+                        logger.exception("Toplu ingest dosya hatasi: %s", name)
+                        fail(name, exc)
+                        done += 1
+                        if progress_callback is not None:
+                            progress_callback(done / len(files), f"{done}/{len(files)} dosya")
+                    for next_name, data in islice(queued, 1):
+                        futures[executor.submit(extract, next_name, data)] = next_name
+                # Bekleyen parçalar bir partiyi doldurunca yaz; bellekte en fazla bir parti kalır
+                if sum(len(entry["documents"]) for _, entry in ready) >= batch_size:
+                    flush_ready()
+            if ready:
+                flush_ready()
+
+        results = list(summaries.values())
+        logger.info(
+            "Toplu ingest: dosya=%s basarili=%s",
+            len(results),
+            sum(1 for item in results if item["status"] == "ok"),
+        )
+        return results
 
     def add_documents_to_vectorstore(
         self,
         documents: List[Document],
         collection_name: str = "ders_notlari",
+        embeddings: list | None = None,
+        update_manifest: bool = True,
+        ids: List[str] | None = None,
     ):
-        """Dokümanları vektör veritabanına ekle"""
+        """Dokümanları vektör veritabanına ekle; embedding'ler önbellek üzerinden hesaplanır"""
         try:
-            collection = self.chroma_client.get_or_create_collection(
-                name=collection_name,
-                embedding_function=self.embedding_function,
-            )
-
             texts = [doc.page_content for doc in documents]
             metadatas = [doc.metadata for doc in documents]
-            ids = [
-                f"{doc.metadata.get('source', 'unknown')}_{doc.metadata.get('chunk_id', '0')}_{hashlib.sha256(doc.page_content.encode('utf-8')).hexdigest()[:12]}"
-                for doc in documents
-            ]
+            if ids is None:
+                ids = self._document_ids(documents)
+            if embeddings is None:
+                embeddings = self._embed_texts(texts)
+            if self.shared_chunks:
+                # Metin paylaşılan depoya bir kez yazılır; koleksiyon yalnızca özet referansını tutar
+                stored_metadatas = self._stored_metadatas(documents)
+                self.chunk_store.put_many([meta["chunk_hash"] for meta in stored_metadatas], texts)
+                payload = {"metadatas": stored_metadatas}
+            else:
+                payload = {"documents": texts, "metadatas": metadatas}
 
-            collection.upsert(
-                documents=texts,
-                metadatas=metadatas,
-                ids=ids,
-            )
+            def write(collection):
+                needs_manifest = not self.source_manifest.is_built(collection_name)
+                needs_lexical = self.hybrid_search and not self.lexical_index.is_built(collection_name)
+                if (needs_manifest or needs_lexical) and collection.count() == 0:
+                    if needs_manifest:
+                        self.source_manifest.mark_built(collection_name)
+                    if needs_lexical:
+                        self.lexical_index.mark_built(collection_name)
+                collection.upsert(ids=ids, embeddings=embeddings, **payload)
+
+            collection = self._write_collection(collection_name, write)
+            self._index_added(collection_name, ids, texts, metadatas)
+            self._collection_changed(collection_name)
+            if update_manifest:
+                self._refresh_manifest_sources(
+                    collection,
+                    collection_name,
+                    {meta.get("source", "unknown") for meta in metadatas},
+                )
 
             return collection
         except Exception as exc:
             raise Exception(f"Vektör veritabanına ekleme hatası: {str(exc)}") from exc
 
+    def _index_added(self, collection_name: str, ids: List[str], texts: List[str], metadatas: list):
+        if not self.hybrid_search:
+            self.lexical_index.invalidate(collection_name)
+        elif self.lexical_index.is_built(collection_name):
+            sources = [(meta or {}).get("source") for meta in metadatas]
+            self.lexical_index.add(collection_name, ids, texts, sources)
+
+    def _index_removed(self, collection_name: str, ids: List[str]):
+        if not self.hybrid_search:
+            self.lexical_index.invalidate(collection_name)
+        elif self.lexical_index.is_built(collection_name):
+            self.lexical_index.remove(collection_name, ids)
+
+    def _lexical_search(self, collection, collection_name: str, query: str, k: int, source_filter):
+        if not self.lexical_index.is_built(collection_name):
+            data = collection.get(include=["documents", "metadatas"])
+            self.lexical_index.rebuild(
+                collection_name,
+                data.get("ids") or [],
+                self.resolve_texts(data.get("documents"), data.get("metadatas")),
+                [(meta or {}).get("source") for meta in data.get("metadatas") or []],
+            )
+        return [doc_id for doc_id, _ in self.lexical_index.search(collection_name, query, k, source_filter)]
+
+    def _collection_changed(self, collection_name: str):
+        self.source_manifest.bump_version(collection_name)
+
+    def _record_source(self, collection_name: str, source: str, chunks: int, size_bytes: int, pages: int):
+        if chunks:
+            self.source_manifest.upsert(collection_name, source, chunks, size_bytes, pages)
+        else:
+            self.source_manifest.remove_source(collection_name, source)
+
+    def resolve_texts(self, texts, metadatas) -> List[str]:
+        """Chroma'dan okunan metinlerde eksik olanları metadata["chunk_hash"] ile paylaşılan depodan tamamla"""
+        texts = list(texts or [])
+        metadatas = list(metadatas or [])
+        texts += [None] * (len(metadatas) - len(texts))
+        missing = {
+            index: (metadatas[index] or {}).get("chunk_hash")
+            for index, text in enumerate(texts)
+            if not text and index < len(metadatas)
+        }
+        missing = {index: hash_value for index, hash_value in missing.items() if hash_value}
+        if missing:
+            found = self.chunk_store.get_many(list(missing.values()))
+            for index, hash_value in missing.items():
+                texts[index] = found.get(hash_value, "")
+        return [text or "" for text in texts]
+
+    def _refresh_manifest_sources(self, collection, collection_name: str, sources: set):
+        """Ingest dışından eklenen kaynakların manifest satırlarını koleksiyondan yeniden say.
+
+        Kayıtlı dosya boyutu korunur; bilinmiyorsa parça metinlerinin bayt toplamı yazılır.
+        """
+        sizes = self.source_manifest.get_sizes(collection_name)
+        for source in sources:
+            data = collection.get(where={"source": source}, include=["metadatas", "documents"])
+            documents = self.resolve_texts(data.get("documents"), data.get("metadatas"))
+            size_bytes = sizes.get(source)
+            if size_bytes is None:
+                size_bytes = sum(len(text.encode("utf-8")) for text in documents)
+            self._record_source(
+                collection_name,
+                source,
+                len(documents),
+                size_bytes,
+                max([int((meta or {}).get("page") or 1) for meta in data.get("metadatas") or []] or [1]),
+            )
+
+    def rebuild_source_manifest(self, collection_name: str = "ders_notlari") -> bool:
+        """Koleksiyonu bir kez tarayarak kaynak manifestini yeniden oluştur"""
+        collection = self.get_collection(collection_name)
+        if collection is None:
+            return False
+        data = collection.get(include=["metadatas", "documents"])
+        texts = self.resolve_texts(data.get("documents"), data.get("metadatas"))
+        self.source_manifest.rebuild(collection_name, zip(data.get("metadatas") or [], texts))
+        # Koleksiyon ingest yolu dışında değişti; sözcük indeksi sonraki aramada yeniden kurulur
+        self.lexical_index.invalidate(collection_name)
+        self._collection_changed(collection_name)
+        return True
+
+    def get_source_stats(self, collection_name: str = "ders_notlari") -> List[dict]:
+        """Kaynak başına parça, boyut, sayfa ve ingest zamanı bilgisi"""
+        try:
+            if not self.source_manifest.is_built(collection_name):
+                self.rebuild_source_manifest(collection_name)
+            return self.source_manifest.list_sources(collection_name)
+        except Exception:
+            logger.exception("Kaynak manifesti okuma hatasi")
+            return []
+
+    def _cache_collection(self, collection_name: str, collection):
+        self.collection_registry.touch(collection_name)
+        with self._collections_lock:
+            self._collections[collection_name] = collection
+            self._collections.move_to_end(collection_name)
+            while len(self._collections) > self.collection_cache_size:
+                self._collections.popitem(last=False)
+        return collection
+
+    def forget_collection(self, collection_name: str):
+        """Önbellekteki koleksiyon tutamacını at; sonraki erişim yeniden açar"""
+        with self._collections_lock:
+            self._collections.pop(collection_name, None)
+
     def get_collection(self, collection_name: str = "ders_notlari"):
-        """Mevcut koleksiyonu al"""
+        """Mevcut koleksiyonu al; tutamaç önbellekteyse Chroma'ya gidilmez"""
+        with self._collections_lock:
+            collection = self._collections.get(collection_name)
+            if collection is not None:
+                self._collections.move_to_end(collection_name)
+        if collection is not None:
+            self.collection_registry.touch(collection_name)
+            return collection
         try:
             collection = self.chroma_client.get_collection(
                 name=collection_name,
                 embedding_function=self.embedding_function,
             )
-            return collection
+            return self._cache_collection(collection_name, collection)
         except Exception as exc:
             if isinstance(exc, NotFoundError):
                 logger.info("Chroma koleksiyon bulunamadi: %s", collection_name)
@@ -230,78 +1164,415 @@ class RAGProcessor:
                 logger.exception("Chroma koleksiyon alma hatasi")
             return None
 
+    def get_or_create_collection(self, collection_name: str = "ders_notlari"):
+        """Koleksiyonu al, yoksa oluştur"""
+        with self._collections_lock:
+            collection = self._collections.get(collection_name)
+            if collection is not None:
+                self._collections.move_to_end(collection_name)
+        if collection is not None:
+            self.collection_registry.touch(collection_name)
+            return collection
+        collection = self.chroma_client.get_or_create_collection(
+            name=collection_name,
+            embedding_function=self.embedding_function,
+        )
+        return self._cache_collection(collection_name, collection)
+
     def search_documents(
         self,
         query: str,
         k: int = 4,
         collection_name: str = "ders_notlari",
         source_filter: List[str] | None = None,
+        hybrid: bool | None = None,
+        mmr: bool | None = None,
+        adaptive: bool | None = None,
     ) -> List[Document]:
-        """Sorguya göre en ilgili dokümanları bul"""
+        """Sorguya göre en ilgili dokümanları bul; sonuçlar koleksiyon sürümüyle önbelleklenir.
+
+        hybrid açıkken (varsayılan RAG_HYBRID_SEARCH) vektör ve BM25 sıralamaları RRF ile birleştirilir.
+        mmr açıkken (varsayılan RAG_MMR) aday havuzu MMR ile çeşitlendirilir, yakın kopyalar atılır.
+        adaptive açıkken (varsayılan RAG_ADAPTIVE_K) k üst sınırdır; sonuçlar mesafe eşiğinde veya
+        en büyük mesafe boşluğunda kesilir. Vektör sonuçlarının mesafesi metadata["distance"] alanındadır.
+        RAG_EXACT_SEARCH_MAX parçaya kadar olan koleksiyonlarda vektör araması NumPy ile kesin yapılır.
+        """
+        use_hybrid = self.hybrid_search if hybrid is None else hybrid
+        use_mmr = self.mmr_search if mmr is None else mmr
+        use_adaptive = self.adaptive_k if adaptive is None else adaptive
+        version = self.source_manifest.get_version(collection_name)
+        cache_key = (
+            collection_name,
+            version,
+            QueryEmbeddingCache.normalize(query),
+            k,
+            tuple(sorted(source_filter or [])),
+            use_hybrid,
+            use_mmr,
+            use_adaptive,
+        )
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            return [Document(page_content=text, metadata=dict(metadata)) for text, metadata in cached]
+
         collection = self.get_collection(collection_name)
         if collection is None:
             return []
 
         try:
-            where = None
-            if source_filter:
-                if len(source_filter) == 1:
-                    where = {"source": source_filter[0]}
-                else:
-                    where = {"source": {"$in": source_filter}}
-
-            if where is None:
-                results = collection.query(
-                    query_texts=[query],
-                    n_results=k,
-                )
+            if use_mmr:
+                # MMR yakın kopyaları eler; çeşitli parça kalabilmesi için aday havuzu geniş tutulur
+                n_results = max(k * 4, 20)
+            elif use_hybrid:
+                n_results = max(k * 3, 10)
             else:
-                results = collection.query(
-                    query_texts=[query],
-                    n_results=k,
-                    where=where,
+                n_results = k
+            include = ["documents", "metadatas", "distances"]
+            if use_mmr:
+                include.append("embeddings")
+            query_embedding = self.embed_query(query)
+            results = self._vector_query(
+                collection, collection_name, version, [query_embedding], n_results, source_filter, include
+            )
+
+            candidates = {}
+            vectors = {}
+            ranking = self._collect_candidates(results, candidates, vectors, nested=True)
+            if use_adaptive and ranking:
+                k = adaptive_cut(
+                    [candidates[doc_id].metadata["distance"] for doc_id in ranking[:k]],
+                    min_k=self.adaptive_min_k,
+                    max_distance=self.max_distance,
+                    min_gap=self.min_distance_gap,
                 )
 
-            docs = []
-            if results and "documents" in results and results["documents"]:
-                for i, doc_text in enumerate(results["documents"][0]):
-                    metadatas = results.get("metadatas")
-                    metadata = metadatas[0][i] if metadatas else {}
-                    docs.append(Document(page_content=doc_text, metadata=metadata))
+            if use_hybrid:
+                lexical_ids = self._lexical_search(
+                    collection, collection_name, query, n_results, source_filter
+                )
+                ranking = reciprocal_rank_fusion([ranking, lexical_ids])[:n_results]
+                missing = [doc_id for doc_id in ranking if doc_id not in candidates]
+                if missing:
+                    extra = collection.get(ids=missing, include=[name for name in include if name != "distances"])
+                    self._collect_candidates(extra, candidates, vectors, nested=False)
+                ranking = [doc_id for doc_id in ranking if doc_id in candidates]
+
+            if use_mmr and ranking:
+                picked = mmr_select(
+                    query_embedding,
+                    [vectors[doc_id] for doc_id in ranking],
+                    k,
+                    lambda_mult=self.mmr_lambda,
+                    duplicate_threshold=self.mmr_duplicate_threshold,
+                )
+                ranking = [ranking[index] for index in picked]
+
+            docs = [candidates[doc_id] for doc_id in ranking[:k]]
 
             source_label = "all" if not source_filter else ",".join(source_filter)
-            logger.info(f"RAG search: k={k} sources={source_label} results={len(docs)}")
+            logger.info(
+                f"RAG search: k={k} sources={source_label} hybrid={use_hybrid} "
+                f"mmr={use_mmr} adaptive={use_adaptive} results={len(docs)}"
+            )
+            self.result_cache.put(
+                cache_key,
+                [(doc.page_content, dict(doc.metadata or {})) for doc in docs],
+            )
 
             return docs
         except Exception:
             logger.exception("Chroma sorgu hatasi")
+            # Koleksiyon başka bir süreçte silinmiş olabilir; tutamaç bir sonraki aramada yeniden açılır
+            self.forget_collection(collection_name)
+            return []
+
+    def search_documents_batch(
+        self,
+        queries: List[str],
+        k: int = 4,
+        collection_name: str = "ders_notlari",
+        source_filter: List[str] | None = None,
+        adaptive: bool | None = None,
+    ) -> List[List[Document]]:
+        """Birden çok sorguyu tek embedding partisi ve tek vektör sorgusuyla ara.
+
+        Sorgu başına metadata["distance"] içeren doküman listesi döner. Yalnızca vektör araması
+        yapılır; sonuçlar search_documents(hybrid=False, mmr=False) ile aynı önbelleği paylaşır.
+        """
+        if not queries:
             return []
+        use_adaptive = self.adaptive_k if adaptive is None else adaptive
+        version = self.source_manifest.get_version(collection_name)
+        keys = [
+            (
+                collection_name,
+                version,
+                QueryEmbeddingCache.normalize(query),
+                k,
+                tuple(sorted(source_filter or [])),
+                False,
+                False,
+                use_adaptive,
+            )
+            for query in queries
+        ]
+        output: List[List[Document] | None] = []
+        pending = {}
+        for index, key in enumerate(keys):
+            cached = self.result_cache.get(key)
+            if cached is None:
+                output.append(None)
+                pending.setdefault(key, []).append(index)
+            else:
+                output.append([Document(page_content=text, metadata=dict(metadata)) for text, metadata in cached])
+        if not pending:
+            return output
+
+        collection = self.get_collection(collection_name)
+        if collection is None:
+            return [docs or [] for docs in output]
+
+        try:
+            batch = [queries[indexes[0]] for indexes in pending.values()]
+            results = self._vector_query(
+                collection,
+                collection_name,
+                version,
+                self.embed_queries(batch),
+                k,
+                source_filter,
+                ["documents", "metadatas", "distances"],
+            )
+            for row, (key, indexes) in enumerate(pending.items()):
+                candidates = {}
+                ranking = self._collect_candidates(results, candidates, {}, nested=True, row=row)
+                limit = k
+                if use_adaptive and ranking:
+                    limit = adaptive_cut(
+                        [candidates[doc_id].metadata["distance"] for doc_id in ranking[:k]],
+                        min_k=self.adaptive_min_k,
+                        max_distance=self.max_distance,
+                        min_gap=self.min_distance_gap,
+                    )
+                docs = [candidates[doc_id] for doc_id in ranking[:limit]]
+                self.result_cache.put(key, [(doc.page_content, dict(doc.metadata or {})) for doc in docs])
+                for index in indexes:
+                    output[index] = [
+                        Document(page_content=doc.page_content, metadata=dict(doc.metadata)) for doc in docs
+                    ]
+            logger.info(f"RAG batch search: queries={len(queries)} uncached={len(pending)} k={k}")
+            return output
+        except Exception:
+            logger.exception("Chroma toplu sorgu hatasi")
+            self.forget_collection(collection_name)
+            return [docs or [] for docs in output]
+
+    def search_collections(
+        self,
+        query: str,
+        k: int = 4,
+        collection_names: List[str] | None = None,
+        source_filter: List[str] | None = None,
+        **search_kwargs,
+    ) -> List[Document]:
+        """Birden çok koleksiyonu paralel ara ve sonuçları mesafeye göre birleştir.
+
+        Her dokümanın geldiği koleksiyon metadata["collection"] alanına yazılır; aynı metin
+        birden çok koleksiyonda varsa en yakın olanı tutulur.
+        """
+        names = list(dict.fromkeys(collection_names or ["ders_notlari"]))
+        if len(names) == 1:
+            per_collection = [self.search_documents(query, k, names[0], source_filter, **search_kwargs)]
+        else:
+            with ThreadPoolExecutor(max_workers=len(names)) as executor:
+                per_collection = list(
+                    executor.map(
+                        lambda name: self.search_documents(query, k, name, source_filter, **search_kwargs),
+                        names,
+                    )
+                )
+
+        ranked = []
+        for name, docs in zip(names, per_collection):
+            for rank, doc in enumerate(docs):
+                doc.metadata["collection"] = name
+                # Sözcük aramasından gelen parçaların mesafesi yoktur; koleksiyon sırasını korurlar
+                ranked.append((doc.metadata.get("distance", float("inf")), rank, doc))
+        ranked.sort(key=lambda item: (item[0], item[1]))
+
+        merged = []
+        seen = set()
+        for _, _, doc in ranked:
+            if doc.page_content in seen:
+                continue
+            seen.add(doc.page_content)
+            merged.append(doc)
+        return merged[:k]
+
+    def _exact_entry(self, collection, collection_name: str, version: int) -> dict | None:
+        """Eşik altındaki koleksiyonun güncel kesin arama indeksini döndür; gerekirse yeniden kur"""
+        if self.exact_search_max <= 0:
+            return None
+        entry = self.exact_index.get(collection_name, version)
+        if entry is None:
+            count = collection.count()
+            if count > self.exact_search_max:
+                entry = self.exact_index.mark_large(collection_name, version, count)
+            else:
+                data = collection.get(include=["embeddings", "metadatas"])
+                entry = self.exact_index.build(
+                    collection_name,
+                    version,
+                    data.get("ids") or [],
+                    data.get("embeddings") if data.get("embeddings") is not None else [],
+                    [(metadata or {}).get("source") for metadata in data.get("metadatas") or []],
+                )
+        if entry is None or entry.get("large"):
+            return None
+        return entry
+
+    def _vector_query(
+        self,
+        collection,
+        collection_name: str,
+        version: int,
+        query_embeddings: list,
+        n_results: int,
+        source_filter: List[str] | None,
+        include: List[str],
+        exact: bool | None = None,
+    ) -> dict:
+        """Vektör araması; küçük koleksiyonlarda NumPy ile kesin arama, diğerlerinde Chroma.
+
+        Her iki yol da Chroma query biçiminde (sorgu başına bir liste) sonuç döndürür.
+        """
+        entry = None
+        if exact is not False:
+            entry = self._exact_entry(collection, collection_name, version)
+            if entry is None and exact:
+                raise ValueError(f"Kesin arama kullanilamiyor: {collection_name}")
+        if entry is not None:
+            hits = ExactSearchIndex.search_many(entry, query_embeddings, n_results, source_filter)
+            ids = list(dict.fromkeys(doc_id for row in hits for doc_id, _ in row))
+            if not ids:
+                # Filtre hiçbir parçayla eşleşmedi; Chroma get(ids=[]) hata verir
+                return {name: [[] for _ in hits] for name in ["ids", *include]}
+            data = collection.get(ids=ids, include=[name for name in include if name != "distances"])
+            position = {doc_id: index for index, doc_id in enumerate(data.get("ids") or [])}
+            results = {
+                "ids": [[doc_id for doc_id, _ in row] for row in hits],
+                "distances": [[distance for _, distance in row] for row in hits],
+            }
+            for name in include:
+                if name != "distances":
+                    column = data.get(name)
+                    results[name] = (
+                        [[column[position[doc_id]] for doc_id, _ in row] for row in hits]
+                        if column is not None
+                        else None
+                    )
+            return results
+
+        where = None
+        if source_filter:
+            if len(source_filter) == 1:
+                where = {"source": source_filter[0]}
+            else:
+                where = {"source": {"$in": source_filter}}
+        if where is None:
+            return collection.query(
+                query_embeddings=list(query_embeddings),
+                n_results=n_results,
+                include=include,
+            )
+        return collection.query(
+            query_embeddings=list(query_embeddings),
+            n_results=n_results,
+            where=where,
+            include=include,
+        )
+
+    def _collect_candidates(
+        self, results, candidates: dict, vectors: dict, nested: bool, row: int = 0
+    ) -> List[str]:
+        """Chroma query/get sonucunu id -> Document ve id -> embedding sözlüklerine aktar"""
+
+        def column(name):
+            value = results.get(name) if results else None
+            if value is None:
+                return []
+            return value[row] if nested else value
+
+        ids = list(column("ids"))
+        metadatas = column("metadatas")
+        texts = self.resolve_texts(column("documents"), metadatas)
+        embeddings = column("embeddings")
+        distances = column("distances")
+        for index, doc_id in enumerate(ids):
+            metadata = dict((metadatas[index] if len(metadatas) > index else None) or {})
+            if len(distances) > index:
+                metadata["distance"] = float(distances[index])
+            candidates[doc_id] = Document(page_content=texts[index], metadata=metadata)
+            if len(embeddings) > index:
+                vectors[doc_id] = embeddings[index]
+        return ids
 
     def get_all_sources(self, collection_name: str = "ders_notlari") -> List[str]:
         """Veritabanındaki tüm kaynak dosyaları listele"""
+        return [item["source"] for item in self.get_source_stats(collection_name)]
+
+    def delete_source(self, collection_name: str, source: str) -> int:
+        """Tek bir kaynağın parçalarını metadata filtresiyle sil; silinen parça sayısını döndür.
+
+        Manifest satırı, sözcük indeksi ve koleksiyon sürümü aynı adımda güncellenir; sürüme bağlı
+        arama sonucu önbelleği ve kesin arama indeksi böylece kendiliğinden geçersiz olur.
+        """
         collection = self.get_collection(collection_name)
         if collection is None:
-            return []
-
+            return 0
         try:
-            all_data = collection.get()
+            ids = sorted(self._get_source_ids(collection_name, source))
+            if ids:
+                collection.delete(where={"source": source})
+                self._index_removed(collection_name, ids)
+                self._collection_changed(collection_name)
+            self._record_source(collection_name, source, 0, 0, 0)
+            logger.info("Kaynak silindi: %s/%s (%s parca)", collection_name, source, len(ids))
+            return len(ids)
+        except Exception as exc:
+            raise Exception(f"Kaynak silme hatası: {str(exc)}") from exc
 
-            sources = set()
-            if all_data and "metadatas" in all_data:
-                for metadata in all_data["metadatas"]:
-                    if metadata and "source" in metadata:
-                        sources.add(metadata["source"])
+    def replace_source(
+        self,
+        collection_name: str,
+        source: str,
+        file,
+        filename: str | None = None,
+        progress_callback: Callable[[float, str], None] | None = None,
+    ) -> dict:
+        """Kaynağı yeni dosyayla değiştir.
 
-            return sorted(list(sources))
-        except Exception:
-            logger.exception("Chroma kaynak listeleme hatasi")
-            return []
+        Ad aynıysa ingest_document mevcut parçalarla fark alır ve yalnızca değişen parçaları
+        embed eder; ad farklıysa yeni dosya eklendikten sonra eski kaynak silinir.
+        """
+        filename = filename or source
+        result = self.ingest_document(file, filename, collection_name, progress_callback=progress_callback)
+        if filename != source:
+            result["removed"] = result.get("removed", 0) + self.delete_source(collection_name, source)
+        return result
 
     def delete_collection(self, collection_name: str = "ders_notlari"):
         """Koleksiyonu sil"""
         try:
+            self.source_manifest.drop_collection(collection_name)
+            self.lexical_index.drop_collection(collection_name)
+            self.exact_index.drop(collection_name)
             self.chroma_client.delete_collection(name=collection_name)
             return True
         except Exception:
             logger.exception("Chroma koleksiyon silme hatasi")
             return False
+        finally:
+            self.forget_collection(collection_name)
+            self.collection_registry.forget(collection_name)
+            self._collection_changed(collection_name)
@@ -0,0 +1,193 @@
+import atexit
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Tuple
+
+import chromadb
+from chromadb.utils import embedding_functions
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PERSIST_DIRECTORY = "./chroma_db"
+DEFAULT_TOKEN_ENCODING = "cl100k_base"
+
+_lock = threading.RLock()
+_chroma_clients: Dict[str, object] = {}
+_embedding_function = None
+_text_splitters: Dict[Tuple[int, int, str], RecursiveCharacterTextSplitter] = {}
+_token_encoders: Dict[str, object] = {}
+_processors: Dict[str, object] = {}
+_shutdown_hooks: List[Callable[[], None]] = []
+
+
+def _normalize_path(persist_directory: str) -> str:
+    return os.path.abspath(persist_directory or DEFAULT_PERSIST_DIRECTORY)
+
+
+def get_chroma_client(persist_directory: str = DEFAULT_PERSIST_DIRECTORY):
+    """Dizin başına tek bir Chroma PersistentClient döndür"""
+    key = _normalize_path(persist_directory)
+    with _lock:
+        client = _chroma_clients.get(key)
+        if client is None:
+            client = chromadb.PersistentClient(path=persist_directory)
+            _chroma_clients[key] = client
+            logger.info("Chroma istemcisi olusturuldu: %s", key)
+        return client
+
+
+class SharedMiniLMEmbeddingFunction(embedding_functions.DefaultEmbeddingFunction):
+    """Chroma'nın varsayılan MiniLM modeli; ONNX oturumu bir kez yüklenip tüm çağrılarda kullanılır.
+
+    DefaultEmbeddingFunction her çağrıda yeni bir ONNXMiniLM_L6_V2 oluşturur ve modeli yeniden
+    yükler. Ad ve yapılandırma aynı kaldığı için mevcut koleksiyonlarla uyumludur.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    @property
+    def model(self):
+        with self._model_lock:
+            if self._model is None:
+                from chromadb.utils.embedding_functions.onnx_mini_lm_l6_v2 import ONNXMiniLM_L6_V2
+
+                self._model = ONNXMiniLM_L6_V2()
+            return self._model
+
+    def __call__(self, input):
+        return self.model(input)
+
+
+def get_embedding_function():
+    """Süreçteki tüm oturumların paylaştığı embedding modelini döndür"""
+    global _embedding_function
+    with _lock:
+        if _embedding_function is None:
+            _embedding_function = SharedMiniLMEmbeddingFunction()
+            logger.info("Embedding modeli olusturuldu")
+        return _embedding_function
+
+
+def get_token_encoder(encoding_name: str = DEFAULT_TOKEN_ENCODING):
+    """tiktoken kodlayıcısını süreç başına bir kez yükle; yüklenemezse None döndür"""
+    with _lock:
+        if encoding_name not in _token_encoders:
+            try:
+                import tiktoken
+
+                _token_encoders[encoding_name] = tiktoken.get_encoding(encoding_name)
+                logger.info("Token kodlayici yuklendi: %s", encoding_name)
+            except Exception:
+                logger.warning("Token kodlayici yuklenemedi: %s", encoding_name)
+                _token_encoders[encoding_name] = None
+        return _token_encoders[encoding_name]
+
+
+def count_tokens(text: str, encoding_name: str = DEFAULT_TOKEN_ENCODING) -> int:
+    """Metnin token sayısı; kodlayıcı yoksa karakter/4 yaklaşımı kullanılır"""
+    encoder = get_token_encoder(encoding_name)
+    if encoder is None:
+        return (len(text) + 3) // 4
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def get_text_splitter(
+    chunk_size: int,
+    chunk_overlap: int,
+    unit: str = "chars",
+    encoding_name: str = DEFAULT_TOKEN_ENCODING,
+) -> RecursiveCharacterTextSplitter:
+    """Aynı ayarlar için tek bir metin bölücü döndür; unit="tokens" ise boyut token cinsindendir"""
+    key = (int(chunk_size), int(chunk_overlap), unit if unit == "chars" else f"tokens:{encoding_name}")
+    with _lock:
+        splitter = _text_splitters.get(key)
+        if splitter is None:
+            if unit == "chars":
+                length_function = len
+            else:
+                encoder = get_token_encoder(encoding_name)
+                if encoder is None:
+                    raise ValueError(f"Token kodlayici kullanilamiyor: {encoding_name}")
+
+                def length_function(text: str) -> int:
+                    return len(encoder.encode(text, disallowed_special=()))
+
+            splitter = RecursiveCharacterTextSplitter(
+                chunk_size=key[0],
+                chunk_overlap=key[1],
+                length_function=length_function,
+                separators=[
+                    "\n\n",
+                    "\n",
+                    " ",
+                    "",
+                ],
+            )
+            _text_splitters[key] = splitter
+        return splitter
+
+
+def get_rag_processor(persist_directory: str = DEFAULT_PERSIST_DIRECTORY):
+    """Dizin başına paylaşılan RAGProcessor örneğini döndür"""
+    from utils.rag_processor import RAGProcessor
+
+    key = _normalize_path(persist_directory)
+    with _lock:
+        processor = _processors.get(key)
+        if processor is None:
+            processor = RAGProcessor(persist_directory=persist_directory)
+            _processors[key] = processor
+        return processor
+
+
+def warm_up(persist_directory: str = DEFAULT_PERSIST_DIRECTORY):
+    """Modeli ve istemciyi ilk istekten önce yükle"""
+    processor = get_rag_processor(persist_directory)
+    try:
+        processor.embedding_function(["warm up"])
+    except Exception:
+        logger.exception("Embedding modeli isitilamadi")
+    return processor
+
+
+def register_shutdown_hook(hook: Callable[[], None]):
+    """Kaynaklar kapatılırken çağrılacak fonksiyonu kaydet"""
+    with _lock:
+        _shutdown_hooks.append(hook)
+
+
+def reset_resources():
+    """Paylaşılan kaynakları bırak; sonraki çağrılar yeniden oluşturur"""
+    global _embedding_function
+    with _lock:
+        hooks = list(_shutdown_hooks)
+        _shutdown_hooks.clear()
+        for hook in hooks:
+            try:
+                hook()
+            except Exception:
+                logger.exception("Kaynak kapatma kancasi hatasi")
+        _processors.clear()
+        _text_splitters.clear()
+        _token_encoders.clear()
+        _chroma_clients.clear()
+        _embedding_function = None
+
+
+def resource_stats() -> dict:
+    with _lock:
+        return {
+            "chroma_clients": len(_chroma_clients),
+            "embedding_function_loaded": _embedding_function is not None,
+            "text_splitters": len(_text_splitters),
+            "token_encoders": len(_token_encoders),
+            "processors": len(_processors),
+        }
+
+
+atexit.register(reset_resources)
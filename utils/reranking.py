@@ -0,0 +1,66 @@
+from typing import List
+
+import numpy as np
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def mmr_select(
+    query_embedding,
+    candidate_embeddings,
+    k: int,
+    lambda_mult: float = 0.7,
+    duplicate_threshold: float = 0.95,
+) -> List[int]:
+    """Maximal marginal relevance ile aday indekslerini seç.
+
+    Seçilmiş bir adaya kosinüs benzerliği duplicate_threshold ve üstünde olan adaylar
+    yakın kopya sayılır ve hiç seçilmez.
+    """
+    candidates = np.asarray(candidate_embeddings, dtype=np.float32)
+    if candidates.ndim != 2 or candidates.shape[0] == 0 or k <= 0:
+        return []
+    candidates = _normalize_rows(candidates)
+    query = _normalize_rows(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+    relevance = candidates @ query
+    pairwise = candidates @ candidates.T
+
+    selected: List[int] = []
+    available = np.ones(len(candidates), dtype=bool)
+    max_similarity = np.full(len(candidates), -np.inf, dtype=np.float32)
+    while len(selected) < k and available.any():
+        redundancy = np.where(np.isfinite(max_similarity), max_similarity, 0.0)
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        max_similarity = np.maximum(max_similarity, pairwise[best])
+        available &= max_similarity < duplicate_threshold
+    return selected
+
+
+def adaptive_cut(
+    distances,
+    min_k: int = 1,
+    max_distance: float | None = None,
+    min_gap: float = 0.0,
+) -> int:
+    """Artan sıralı mesafelerde eşik ve en büyük boşluğa göre tutulacak sonuç sayısını döndür"""
+    values = [float(value) for value in distances]
+    if not values:
+        return 0
+    min_k = max(1, min(min_k, len(values)))
+    keep = len(values)
+    if max_distance is not None:
+        keep = max(min_k, sum(1 for value in values if value <= max_distance))
+    if keep > min_k:
+        gaps = [values[index + 1] - values[index] for index in range(min_k - 1, keep - 1)]
+        largest = max(gaps)
+        if largest > 0 and largest >= min_gap:
+            keep = min_k + gaps.index(largest)
+    return keep
@@ -0,0 +1,193 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, List
+
+logger = logging.getLogger(__name__)
+
+
+class SourceManifest:
+    """Koleksiyon başına kaynak dosya özeti (SQLite).
+
+    Kaynak listesi ve istatistikler Chroma'daki parça sayısından bağımsız olarak buradan okunur;
+    ingest ve silme işlemleri satırları günceller. Manifest'i olmayan eski koleksiyonlar ilk
+    okumada bir kez taranarak doldurulur.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS manifest_source (
+                collection_name TEXT NOT NULL,
+                source TEXT NOT NULL,
+                chunks INTEGER NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                pages INTEGER NOT NULL,
+                ingested_at REAL NOT NULL,
+                PRIMARY KEY (collection_name, source)
+            );
+            CREATE TABLE IF NOT EXISTS manifest_collection (
+                collection_name TEXT PRIMARY KEY,
+                built_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS collection_version (
+                collection_name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    def is_built(self, collection_name: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM manifest_collection WHERE collection_name = ?",
+                (collection_name,),
+            ).fetchone()
+        return row is not None
+
+    def get_version(self, collection_name: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT version FROM collection_version WHERE collection_name = ?",
+                (collection_name,),
+            ).fetchone()
+        return row[0] if row else 0
+
+    def bump_version(self, collection_name: str) -> int:
+        """Koleksiyon her değiştiğinde artan sayaç; sonuç önbelleği anahtarının parçasıdır"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO collection_version (collection_name, version) VALUES (?, 1) "
+                "ON CONFLICT(collection_name) DO UPDATE SET version = version + 1",
+                (collection_name,),
+            )
+            self._conn.commit()
+            return self._conn.execute(
+                "SELECT version FROM collection_version WHERE collection_name = ?",
+                (collection_name,),
+            ).fetchone()[0]
+
+    def mark_built(self, collection_name: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO manifest_collection (collection_name, built_at) VALUES (?, ?)",
+                (collection_name, time.time()),
+            )
+            self._conn.commit()
+
+    def upsert(self, collection_name: str, source: str, chunks: int, size_bytes: int, pages: int):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO manifest_source "
+                "(collection_name, source, chunks, size_bytes, pages, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (collection_name, source, int(chunks), int(size_bytes), int(pages), time.time()),
+            )
+            self._conn.commit()
+
+    def remove_source(self, collection_name: str, source: str):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM manifest_source WHERE collection_name = ? AND source = ?",
+                (collection_name, source),
+            )
+            self._conn.commit()
+
+    def drop_collection(self, collection_name: str):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM manifest_source WHERE collection_name = ?", (collection_name,)
+            )
+            self._conn.execute(
+                "DELETE FROM manifest_collection WHERE collection_name = ?", (collection_name,)
+            )
+            self._conn.commit()
+
+    def get_sizes(self, collection_name: str) -> dict:
+        """Kaynak -> kayıtlı dosya boyutu (bayt)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source, size_bytes FROM manifest_source WHERE collection_name = ?",
+                (collection_name,),
+            ).fetchall()
+        return dict(rows)
+
+    def rebuild(self, collection_name: str, rows: Iterable[tuple]):
+        """(metadata, metin) satırlarından koleksiyonun manifest'ini yeniden oluştur.
+
+        size_bytes her zaman yüklenen dosyanın boyutudur; kayıtlı kaynaklarda önceki değer
+        korunur, dosya boyutu bilinmeyen kaynaklarda parça metinlerinin bayt toplamı yazılır.
+        """
+        summary = {}
+        for metadata, text in rows:
+            source = (metadata or {}).get("source")
+            if not source:
+                continue
+            entry = summary.setdefault(source, {"chunks": 0, "size_bytes": 0, "pages": 1})
+            entry["chunks"] += 1
+            entry["size_bytes"] += len((text or "").encode("utf-8"))
+            entry["pages"] = max(entry["pages"], int(metadata.get("page") or 1))
+        now = time.time()
+        with self._lock:
+            previous = dict(
+                self._conn.execute(
+                    "SELECT source, size_bytes FROM manifest_source WHERE collection_name = ?",
+                    (collection_name,),
+                ).fetchall()
+            )
+            for source, entry in summary.items():
+                if source in previous:
+                    entry["size_bytes"] = previous[source]
+            self._conn.execute(
+                "DELETE FROM manifest_source WHERE collection_name = ?", (collection_name,)
+            )
+            self._conn.executemany(
+                "INSERT INTO manifest_source "
+                "(collection_name, source, chunks, size_bytes, pages, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (collection_name, source, e["chunks"], e["size_bytes"], e["pages"], now)
+                    for source, e in summary.items()
+                ],
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO manifest_collection (collection_name, built_at) VALUES (?, ?)",
+                (collection_name, now),
+            )
+            self._conn.commit()
+        logger.info("Kaynak manifesti olusturuldu: %s (%s kaynak)", collection_name, len(summary))
+
+    def list_sources(self, collection_name: str) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source, chunks, size_bytes, pages, ingested_at FROM manifest_source "
+                "WHERE collection_name = ? ORDER BY source",
+                (collection_name,),
+            ).fetchall()
+        return [
+            {
+                "source": source,
+                "chunks": chunks,
+                "size_bytes": size_bytes,
+                "pages": pages,
+                "ingested_at": ingested_at,
+            }
+            for source, chunks, size_bytes, pages, ingested_at in rows
+        ]
+
+    def vacuum(self):
+        """Silinen satırların boşalttığı sayfaları diske geri ver"""
+        with self._lock:
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,3 +1,4 @@
+import json
 import logging
 import os
 import streamlit as st
@@ -9,6 +10,12 @@ from utils.app_state import (
     migrate_anon_collection_to_user,
 )
 from utils.groq_client import GroqClient
+from utils.jobs import (
+    ACTIVE_STATUSES,
+    cancel_job,
+    get_jobs_for_collection,
+    retry_job,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -217,3 +224,63 @@ def render_nav():
         st.page_link("pages/5_Siniflar.py", label="Sınıflar", icon="🏫")
     else:
         st.page_link("pages/5_Siniflar.py", label="Sınıflarım", icon="🏫")
+
+
+JOB_STATUS_LABELS = {
+    "queued": "Kuyrukta",
+    "running": "İşleniyor",
+    "done": "Tamamlandı",
+    "failed": "Başarısız",
+    "cancelled": "İptal edildi",
+}
+
+
+def render_ingest_jobs(collection_name):
+    jobs = get_jobs_for_collection(collection_name)
+    active = any(job.status in ACTIVE_STATUSES for job in jobs)
+
+    def _panel():
+        current = get_jobs_for_collection(collection_name)
+        active_ids = {job.id for job in current if job.status in ACTIVE_STATUSES}
+        previous_ids = st.session_state.get("active_ingest_jobs", set())
+        st.session_state.active_ingest_jobs = active_ids
+        if previous_ids - active_ids:
+            st.rerun(scope="app")
+
+        st.subheader("İşleme Kuyruğu")
+        if not current:
+            st.caption("Kuyrukta iş yok.")
+            return
+        for job in current:
+            label = JOB_STATUS_LABELS.get(job.status, job.status)
+            col_a, col_b = st.columns([0.8, 0.2])
+            with col_a:
+                st.write(f"**{job.filename}** — {label}")
+                if job.status in ACTIVE_STATUSES:
+                    st.progress(min(1.0, job.progress or 0.0), text=job.message or "")
+                elif job.message:
+                    st.caption(job.message)
+                if job.status == "failed" and job.error:
+                    st.caption(f"Hata: {job.error}")
+                files = json.loads(job.result).get("files") if job.result else None
+                if files:
+                    with st.expander("Dosya özeti"):
+                        for item in files:
+                            if item["status"] == "ok":
+                                st.caption(f"✅ {item['source']}: {item['chunks']} parça")
+                            else:
+                                st.caption(f"❌ {item['source']}: {item.get('error')}")
+            with col_b:
+                if job.status in ACTIVE_STATUSES:
+                    if st.button("İptal", key=f"cancel_job_{job.id}"):
+                        cancel_job(job.id)
+                        st.rerun(scope="fragment")
+                elif job.status == "failed":
+                    if st.button("Tekrar Dene", key=f"retry_job_{job.id}"):
+                        try:
+                            retry_job(job.id)
+                        except ValueError:
+                            st.error("İş yeniden denenemedi.")
+                        st.rerun(scope="fragment")
+
+    st.fragment(run_every=2 if active else None)(_panel)()